@@ -12,3 +12,5 @@ CREATE TABLE IF NOT EXISTS record_works (
   created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
   updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
+
+-- インデックス・制約・以降のスキーマ変更は record-service/app/migrations で管理（起動時に適用）
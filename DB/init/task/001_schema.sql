@@ -15,9 +15,7 @@ CREATE TABLE IF NOT EXISTS tasks (
   updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
--- パフォーマンス向上のためのインデックス
--- CREATE INDEX IF NOT EXISTS idx_tasks_status_created_by ON tasks(status, created_by);
--- CREATE INDEX IF NOT EXISTS idx_tasks_created_by ON tasks(created_by);
+-- インデックス・制約・以降のスキーマ変更は task-service/app/migrations で管理（起動時に適用）
 
 CREATE TABLE IF NOT EXISTS daily_plans (
   daily_time_plan_id SERIAL PRIMARY KEY,
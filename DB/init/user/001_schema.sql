@@ -19,3 +19,5 @@ CREATE TABLE IF NOT EXISTS task_auths (
   created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
   updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
+
+-- インデックス・制約・以降のスキーマ変更は user-service/app/migrations で管理（起動時に適用）
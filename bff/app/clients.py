@@ -0,0 +1,62 @@
+import os
+from typing import Dict
+
+import httpx
+
+# 下流サービスのベースURL（環境変数で上書き可能）
+USER_SVC_BASE = os.getenv("USER_SVC_BASE", "http://user-service/v1")
+TASK_SVC_BASE = os.getenv("TASK_SVC_BASE", "http://task-service/v1")
+RECORD_SVC_BASE = os.getenv("RECORD_SVC_BASE", "http://record-service/v1")
+
+# サービスごとのタイムアウト（秒）
+USER_SVC_TIMEOUT = float(os.getenv("USER_SVC_TIMEOUT", "10"))
+TASK_SVC_TIMEOUT = float(os.getenv("TASK_SVC_TIMEOUT", "10"))
+RECORD_SVC_TIMEOUT = float(os.getenv("RECORD_SVC_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+
+# コネクション上限と keep-alive（サービスごとに適用）
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+# lifespan で生成し、プロセス内の全リクエストで使い回す
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _build_client(base_url: str, timeout: float) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=base_url,
+        timeout=httpx.Timeout(timeout, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+async def open_clients() -> None:
+    _clients["user"] = _build_client(USER_SVC_BASE, USER_SVC_TIMEOUT)
+    _clients["task"] = _build_client(TASK_SVC_BASE, TASK_SVC_TIMEOUT)
+    _clients["record"] = _build_client(RECORD_SVC_BASE, RECORD_SVC_TIMEOUT)
+
+
+async def close_clients() -> None:
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
+
+
+def user_client() -> httpx.AsyncClient:
+    """user-service 用の共有クライアント（パスは /v1 からの相対で指定）"""
+    return _clients["user"]
+
+
+def task_client() -> httpx.AsyncClient:
+    """task-service 用の共有クライアント"""
+    return _clients["task"]
+
+
+def record_client() -> httpx.AsyncClient:
+    """record-service 用の共有クライアント"""
+    return _clients["record"]
@@ -0,0 +1,125 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+from fastapi import Request
+from jose import jwt, JWTError
+
+# JWT 設定（全サービスで同一シークレット/アルゴリズム）。キャッシュのユーザー判定にだけ使う
+JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret")
+JWT_ALG = "HS256"
+
+# ダッシュボード応答キャッシュ設定
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "60"))  # 秒
+DASHBOARD_CACHE_MAX_ENTRIES = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "10000"))
+
+CacheKey = Tuple[int, str, Hashable]
+
+
+class DashboardCache:
+    """(user_id, エンドポイント名, パラメータ) -> 応答 を保持する TTL 付き LRU キャッシュ
+
+    BFF 経由の書き込み（実績・タスク・計画）があったらそのユーザーの分を invalidate() で破棄する。
+    TTL は他ユーザーの書き込みや BFF を通らない更新に対する保険。
+    計算中に invalidate されたユーザーの結果は世代番号で弾き、古い値を入れ直さない。
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[CacheKey]] = {}
+        self._generations: Dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int, name: str, params: Hashable) -> Optional[Any]:
+        key = (user_id, name, params)
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def generation(self, user_id: int) -> int:
+        return self._generations.get(user_id, 0)
+
+    def set(self, user_id: int, name: str, params: Hashable, value: Any, generation: int) -> None:
+        # 計算を始めてから書き込みがあった場合は保存しない
+        if generation != self.generation(user_id):
+            return
+        key = (user_id, name, params)
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        self._keys_by_user.setdefault(user_id, set()).add(key)
+        while len(self._data) > self.maxsize:
+            oldest, _ = self._data.popitem(last=False)
+            self._discard_user_key(oldest)
+
+    def invalidate(self, user_id: int) -> None:
+        self.invalidations += 1
+        self._generations[user_id] = self.generation(user_id) + 1
+        for key in self._keys_by_user.pop(user_id, ()):
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self.invalidations += 1
+        for user_id in list(self._generations) + list(self._keys_by_user):
+            self._generations[user_id] = self.generation(user_id) + 1
+        self._data.clear()
+        self._keys_by_user.clear()
+
+    def _remove(self, key: CacheKey) -> None:
+        self._data.pop(key, None)
+        self._discard_user_key(key)
+
+    def _discard_user_key(self, key: CacheKey) -> None:
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "users": len(self._keys_by_user),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+dashboard_cache = DashboardCache(maxsize=DASHBOARD_CACHE_MAX_ENTRIES, ttl=DASHBOARD_CACHE_TTL)
+
+
+def user_id_from_authorization(authorization: Optional[str]) -> Optional[int]:
+    """Authorization ヘッダーの JWT を検証して user_id を返す（未認証・不正なら None = キャッシュしない）"""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(authorization[7:].strip(), JWT_SECRET, algorithms=[JWT_ALG])
+        return int(payload["sub"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        return None
+
+
+async def invalidate_dashboard_cache(request: Request):
+    """書き込み系エンドポイント用の依存関係。処理の成否にかかわらず、終了後に呼び出しユーザーのキャッシュを破棄する"""
+    try:
+        yield
+    finally:
+        user_id = user_id_from_authorization(request.headers.get("authorization"))
+        if user_id is not None:
+            dashboard_cache.invalidate(user_id)
@@ -0,0 +1,91 @@
+"""BFF の ETag / 条件付き GET
+
+下流サービスの ETag を連結した合成 ETag（W/"<tag1>.<tag2>"）をブラウザに返す。
+ブラウザから If-None-Match が来たら分解して各サービスへそのまま転送し、全て 304 なら BFF も 304 を返す
+（下流では検証用の集計クエリだけで済む）。
+下流の ETag で表せないビュー（include 付きのタスク一覧など）は本文のハッシュを ETag にする。
+"""
+import asyncio
+import hashlib
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+import httpx
+from fastapi import Request, Response
+
+# ブラウザには毎回再検証させる（ユーザーごとの応答なので共有キャッシュには載せない）
+CACHE_CONTROL = "private, no-cache"
+
+DownstreamGet = Tuple[httpx.AsyncClient, str, Optional[dict]]
+
+
+def _opaque(tag: str) -> str:
+    return tag.strip().removeprefix("W/").strip('"')
+
+
+def _downstream_tags(request: Request, count: int) -> List[Optional[str]]:
+    """BFF の合成 ETag を下流ごとの ETag に分解する（形式が合わなければ条件なし）"""
+    header = request.headers.get("if-none-match")
+    if header and "," not in header:
+        parts = _opaque(header).split(".")
+        if len(parts) == count and all(parts):
+            return [f'W/"{part}"' for part in parts]
+    return [None] * count
+
+
+def _compose_etag(responses: Sequence[httpx.Response]) -> Optional[str]:
+    parts = []
+    for response in responses:
+        tag = response.headers.get("etag")
+        if not tag:
+            return None
+        parts.append(_opaque(tag))
+    return f'W/"{".".join(parts)}"'
+
+
+async def conditional_get_all(
+    request: Request, headers: dict, gets: Sequence[DownstreamGet]
+) -> Tuple[Optional[List[httpx.Response]], Optional[str]]:
+    """下流への GET を並行して発行し (レスポンス一覧, 合成 ETag) を返す
+
+    全ての下流が 304 を返した場合はレスポンス一覧を None にする（呼び出し側は not_modified を返す）。
+    一部だけ 304 の場合は本文が無いので、その下流だけ条件なしで取り直す。
+    """
+    tags = _downstream_tags(request, len(gets))
+    responses = list(
+        await asyncio.gather(
+            *(
+                client.get(path, params=params, headers={**headers, "if-none-match": tag} if tag else headers)
+                for (client, path, params), tag in zip(gets, tags)
+            )
+        )
+    )
+    if all(response.status_code == 304 for response in responses):
+        return None, _compose_etag(responses)
+    for i, response in enumerate(responses):
+        if response.status_code == 304:
+            client, path, params = gets[i]
+            responses[i] = await client.get(path, params=params, headers=headers)
+    return responses, _compose_etag(responses)
+
+
+def body_etag(payload: Any) -> str:
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return _opaque(etag) in {_opaque(tag) for tag in header.split(",")}
+
+
+def set_etag(response: Response, etag: Optional[str]) -> None:
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
@@ -1,7 +1,22 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from .clients import open_clients, close_clients
+from .dashboard_cache import dashboard_cache
 from .routers import auth, users, dashboard, tasks, records
 
-app = FastAPI(title="Climbly BFF", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 下流サービスへの HTTP クライアントは起動時に生成して keep-alive で使い回す
+    await open_clients()
+    try:
+        yield
+    finally:
+        await close_clients()
+
+
+app = FastAPI(title="Climbly BFF", version="1.0.0", lifespan=lifespan)
 
 # Prefix: /bff/v1
 app.include_router(auth.router, prefix="/bff/v1")
@@ -14,3 +29,8 @@ app.include_router(records.router, prefix="/bff/v1")
 @app.get("/healthz")
 def healthz():
     return {"status": "ok"}
+
+
+@app.get("/metrics/dashboard_cache")
+def dashboard_cache_metrics():
+    return dashboard_cache.stats()
@@ -2,6 +2,8 @@ from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, EmailStr
 import httpx
 
+from ..clients import user_client
+
 router = APIRouter(tags=["auth"])
 
 
@@ -16,14 +18,10 @@ class RegisterReq(BaseModel):
     password: str
 
 
-USER_SVC_BASE = "http://user-service/v1"
-
-
 @router.post("/auth/login")
-def login(req: LoginReq):
+async def login(req: LoginReq):
     try:
-        with httpx.Client(timeout=10.0) as client:
-            resp = client.post(f"{USER_SVC_BASE}/auth/login", json=req.model_dump())
+        resp = await user_client().post("/auth/login", json=req.model_dump())
         if resp.is_success:
             return resp.json()
         # エラーレスポンスの処理
@@ -37,10 +35,9 @@ def login(req: LoginReq):
 
 
 @router.post("/auth/register")
-def register(req: RegisterReq):
+async def register(req: RegisterReq):
     try:
-        with httpx.Client(timeout=10.0) as client:
-            resp = client.post(f"{USER_SVC_BASE}/auth/register", json=req.model_dump())
+        resp = await user_client().post("/auth/register", json=req.model_dump())
         if resp.is_success:
             return resp.json()
         # エラーレスポンスの処理
@@ -54,10 +51,9 @@ def register(req: RegisterReq):
 
 
 @router.post("/auth/logout")
-def logout():
+async def logout():
     try:
-        with httpx.Client(timeout=5.0) as client:
-            resp = client.post(f"{USER_SVC_BASE}/auth/logout")
+        resp = await user_client().post("/auth/logout", timeout=5.0)
         if resp.is_success:
             return resp.json()
         # エラーレスポンスの処理
@@ -1,10 +1,15 @@
 import asyncio
-import httpx
 from datetime import datetime
+from typing import Any, Awaitable, Callable, Hashable, Tuple
 from fastapi import APIRouter, Depends, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+from ..clients import task_client, record_client
+from ..dashboard_cache import dashboard_cache, user_id_from_authorization
+
 router = APIRouter(tags=["dashboard"])
+
+LATEST_PROGRESS_BATCH_SIZE = 1000  # 進捗の一括取得 API 1回あたりの task_id 数（各サービスの上限）
 auth_scheme = HTTPBearer(auto_error=False)
 
 
@@ -15,102 +20,117 @@ async def get_auth_header(creds: HTTPAuthorizationCredentials = Depends(auth_sch
     return {"Authorization": f"Bearer {creds.credentials}"}
 
 
+async def _cached(
+    auth_header: dict,
+    name: str,
+    params: Hashable,
+    compute: Callable[[], Awaitable[Tuple[Any, bool]]],
+) -> Tuple[Any, bool]:
+    """ユーザー単位のキャッシュを引き、無ければ compute() -> (値, 完全に取得できたか) で作って保存する
+
+    下流の一部が失敗した応答（0 や空配列で埋めたもの）はキャッシュしない。
+    """
+    user_id = user_id_from_authorization(auth_header.get("Authorization"))
+    if user_id is None:
+        return await compute()
+    cached = dashboard_cache.get(user_id, name, params)
+    if cached is not None:
+        return cached, True
+    generation = dashboard_cache.generation(user_id)
+    value, complete = await compute()
+    if complete:
+        dashboard_cache.set(user_id, name, params, value, generation)
+    return value, complete
+
+
+def _ok(response) -> bool:
+    return not isinstance(response, Exception) and response.status_code == 200
+
+
 @router.get("/dashboard/summary")
 async def summary(auth_header: dict = Depends(get_auth_header)):
     """ダッシュボードサマリを取得"""
+    # 今月の開始日を計算（月が変わればキャッシュキーも変わる）
+    now = datetime.now()
+    month_start_str = f"{now.year}-{now.month:02d}-01"
+    value, _ = await _cached(
+        auth_header, "summary", month_start_str, lambda: _compute_summary(auth_header, month_start_str)
+    )
+    return value
+
+
+async def _compute_summary(auth_header: dict, month_start_str: str) -> Tuple[dict, bool]:
+    complete = True
     active_tasks = 0
     completed_tasks_total = 0
     completed_tasks_this_month = 0
     work_time_this_month = 0
     work_time_total = 0
-    
-    # 今月の開始日を計算
-    now = datetime.now()
-    current_month_start = datetime(now.year, now.month, 1)
-    month_start_str = f"{now.year}-{now.month:02d}-01"
+    lagging_tasks_count = 0
     
     # 各サービスから並列取得
     try:
-        async with httpx.AsyncClient() as client:
-            # 並列実行で高速化
-            results = await asyncio.gather(
-                # タスク: 進行中
-                client.get(
-                    "http://task-service/v1/tasks",
-                    params={"mine": "true", "status": "active"},
-                    headers=auth_header,
-                    timeout=10.0
-                ),
-                # タスク: 完了（累計）
-                client.get(
-                    "http://task-service/v1/tasks",
-                    params={"mine": "true", "status": "completed"},
-                    headers=auth_header,
-                    timeout=10.0
-                ),
-                # 作業時間: 今月
-                client.get(
-                    "http://record-service/v1/metrics/work_time/summary",
-                    params={"from": month_start_str},
-                    headers=auth_header,
-                    timeout=10.0
-                ),
-                # 作業時間: 累計
-                client.get(
-                    "http://record-service/v1/metrics/work_time/summary",
-                    headers=auth_header,
-                    timeout=10.0
-                ),
-                return_exceptions=True  # エラーでも継続
-            )
-            
-            # 進行中タスク数
-            active_response = results[0]
-            if not isinstance(active_response, Exception) and active_response.status_code == 200:
-                active_tasks = len(active_response.json())
-            
-            # 完了タスク数（累計・今月）
-            completed_response = results[1]
-            if not isinstance(completed_response, Exception) and completed_response.status_code == 200:
-                completed_tasks = completed_response.json()
-                completed_tasks_total = len(completed_tasks)
-                
-                # 今月完了数を計算
-                for task in completed_tasks:
-                    updated_at_str = task.get("updated_at")
-                    if updated_at_str:
-                        try:
-                            # ISO 8601形式をパース（"2025-10-26T10:30:00" or "2025-10-26T10:30:00Z"）
-                            # タイムゾーン情報を削除してnaiveなdatetimeとして比較
-                            updated_at = datetime.fromisoformat(updated_at_str.replace("Z", "").split("+")[0])
-                            if updated_at >= current_month_start:
-                                completed_tasks_this_month += 1
-                        except (ValueError, AttributeError):
-                            # パースエラーは無視
-                            pass
-            
-            # 今月作業時間
-            work_time_this_month_response = results[2]
-            if not isinstance(work_time_this_month_response, Exception) and work_time_this_month_response.status_code == 200:
-                work_time_this_month = work_time_this_month_response.json().get("total_work_time", 0)
-            
-            # 累計作業時間
-            work_time_total_response = results[3]
-            if not isinstance(work_time_total_response, Exception) and work_time_total_response.status_code == 200:
-                work_time_total = work_time_total_response.json().get("total_work_time", 0)
+        # 並列実行で高速化
+        results = await asyncio.gather(
+            # タスク: ステータス別件数と今月の完了数（一覧は取らず件数だけ集計してもらう）
+            task_client().get(
+                "/tasks/stats",
+                params={"mine": "true", "from": month_start_str},
+                headers=auth_header
+            ),
+            # 作業時間: 今月
+            record_client().get(
+                "/metrics/work_time/summary",
+                params={"from": month_start_str},
+                headers=auth_header
+            ),
+            # 作業時間: 累計
+            record_client().get(
+                "/metrics/work_time/summary",
+                headers=auth_header
+            ),
+            # 遅延タスク（lagging_tasks と同じキャッシュを使う）
+            _cached(auth_header, "lagging_tasks", None, lambda: _compute_lagging_tasks(auth_header)),
+            return_exceptions=True  # エラーでも継続
+        )
+        
+        # 進行中・完了タスク数（累計・今月）
+        stats_response = results[0]
+        if _ok(stats_response):
+            stats = stats_response.json()
+            by_status = stats.get("by_status", {})
+            active_tasks = by_status.get("active", 0)
+            completed_tasks_total = by_status.get("completed", 0)
+            completed_tasks_this_month = stats.get("completed_in_range", 0)
+        else:
+            complete = False
+        
+        # 今月作業時間
+        work_time_this_month_response = results[1]
+        if _ok(work_time_this_month_response):
+            work_time_this_month = work_time_this_month_response.json().get("total_work_time", 0)
+        else:
+            complete = False
+        
+        # 累計作業時間
+        work_time_total_response = results[2]
+        if _ok(work_time_total_response):
+            work_time_total = work_time_total_response.json().get("total_work_time", 0)
+        else:
+            complete = False
+        
+        # 遅延タスク数
+        lagging_result = results[3]
+        if isinstance(lagging_result, Exception):
+            complete = False
+        else:
+            lagging_data, lagging_complete = lagging_result
+            lagging_tasks_count = len(lagging_data) if lagging_data else 0
+            complete = complete and lagging_complete
                 
     except Exception:
         # 予期しないエラーの場合は0を返す
-        pass
-    
-    # 遅延タスク数を取得
-    lagging_tasks_count = 0
-    try:
-        # lagging_tasksエンドポイントから遅延数を取得
-        lagging_data = await lagging_tasks(auth_header)
-        lagging_tasks_count = len(lagging_data) if lagging_data else 0
-    except Exception:
-        pass
+        complete = False
     
     return {
         "active_tasks": active_tasks,
@@ -119,87 +139,109 @@ async def summary(auth_header: dict = Depends(get_auth_header)):
         "work_time_this_month": work_time_this_month,
         "work_time_total": work_time_total,
         "lagging_tasks_count": lagging_tasks_count,
-    }
+    }, complete
 
 
 @router.get("/dashboard/lagging_tasks")
 async def lagging_tasks(auth_header: dict = Depends(get_auth_header)):
     """遅延タスクを取得"""
+    value, _ = await _cached(auth_header, "lagging_tasks", None, lambda: _compute_lagging_tasks(auth_header))
+    return value
+
+
+async def _compute_lagging_tasks(auth_header: dict) -> Tuple[list, bool]:
     lagging = []
     
     try:
-        async with httpx.AsyncClient() as client:
-            # 1. 進行中タスクを取得
-            tasks_response = await client.get(
-                "http://task-service/v1/tasks",
-                params={"mine": "true", "status": "active"},
-                headers=auth_header,
-                timeout=10.0
-            )
-            
-            if tasks_response.status_code != 200:
-                return []
-            
-            tasks = tasks_response.json()
-            
-            # 2. 各タスクの遅延を並列で計算
-            async def check_task_lag(task):
-                task_id = task["task_id"]
-                task_name = task.get("task_name", "")
-                
-                # 計画進捗と実績進捗を並列取得
-                plan_response, record_response = await asyncio.gather(
-                    client.get(
-                        "http://task-service/v1/daily_plans/latest_progress",
-                        params={"task_id": task_id},
-                        headers=auth_header,
-                        timeout=10.0
-                    ),
-                    client.get(
-                        "http://record-service/v1/records/latest_progress",
-                        params={"task_id": task_id},
-                        headers=auth_header,
-                        timeout=10.0
-                    ),
-                    return_exceptions=True
-                )
-                
-                # デフォルト値
-                work_plan_value = 0
-                progress_value = 0
-                
-                if not isinstance(plan_response, Exception) and plan_response.status_code == 200:
-                    work_plan_value = plan_response.json().get("work_plan_value", 0)
-                
-                if not isinstance(record_response, Exception) and record_response.status_code == 200:
-                    progress_value = record_response.json().get("progress_value", 0)
-                
-                # 遅延判定: work_plan_value > progress_value
-                progress_gap = progress_value - work_plan_value
-                
-                if work_plan_value > progress_value:
-                    return {
-                        "task_id": task_id,
-                        "task_name": task_name,
-                        "progress_gap": progress_gap,
-                        "work_plan_value": work_plan_value,
-                        "progress_value": progress_value
-                    }
-                return None
-            
-            # 全タスクを並列処理
-            results = await asyncio.gather(
-                *[check_task_lag(task) for task in tasks],
-                return_exceptions=True
-            )
-            
-            # 遅延タスクのみフィルタ
-            lagging = [r for r in results if r is not None and not isinstance(r, Exception)]
+        # 1. 進行中タスクを取得
+        tasks_response = await task_client().get(
+            "/tasks",
+            params={"mine": "true", "status": "active"},
+            headers=auth_header
+        )
+        
+        if tasks_response.status_code != 200:
+            return [], False
+        
+        tasks = tasks_response.json()
+        
+        if not tasks:
+            return [], True
+        task_ids = [task["task_id"] for task in tasks]
+        
+        # 2. 計画進捗と実績進捗を並列取得（各サービスの上限件数ごとに分割）
+        (work_plan_values, plan_complete), (progress_values, record_complete) = await asyncio.gather(
+            _fetch_latest_progress(
+                task_client(), "/daily_plans/latest_progress/batch", task_ids, "work_plan_value", auth_header
+            ),
+            _fetch_latest_progress(
+                record_client(), "/records/latest_progress/batch", task_ids, "progress_value", auth_header
+            ),
+        )
+        complete = plan_complete and record_complete
+        
+        # 3. 遅延判定: work_plan_value > progress_value
+        for task in tasks:
+            task_id = task["task_id"]
+            work_plan_value = work_plan_values.get(task_id, 0)
+            progress_value = progress_values.get(task_id, 0)
+            if work_plan_value > progress_value:
+                lagging.append({
+                    "task_id": task_id,
+                    "task_name": task.get("task_name", ""),
+                    "progress_gap": progress_value - work_plan_value,
+                    "work_plan_value": work_plan_value,
+                    "progress_value": progress_value
+                })
     
     except Exception:
-        return []
+        return [], False
+    
+    return lagging, complete
+
+
+async def _fetch_latest_progress(client, path: str, task_ids: list, field: str, auth_header: dict) -> Tuple[dict, bool]:
+    """task_id -> field の値 を返す（取得できなかった分割は 0 扱いになるよう含めない）"""
+    responses = await asyncio.gather(
+        *(
+            client.get(
+                path,
+                params={"task_ids": task_ids[start:start + LATEST_PROGRESS_BATCH_SIZE]},
+                headers=auth_header
+            )
+            for start in range(0, len(task_ids), LATEST_PROGRESS_BATCH_SIZE)
+        ),
+        return_exceptions=True
+    )
+    values = {}
+    complete = True
+    for response in responses:
+        if _ok(response):
+            values.update({item["task_id"]: item.get(field, 0) for item in response.json()})
+        else:
+            complete = False
+    return values, complete
+
+
+async def _fetch_aggregate(client, path: str, from_date: str, to_date: str, auth_header: dict) -> Tuple[list, bool]:
+    try:
+        params = {}
+        if from_date:
+            params["from"] = from_date
+        if to_date:
+            params["to"] = to_date
+        
+        response = await client.get(
+            path,
+            params=params,
+            headers=auth_header
+        )
+        if response.status_code == 200:
+            return response.json(), True
+    except Exception:
+        pass
     
-    return lagging
+    return [], False
 
 
 @router.get("/dashboard/daily_plan_aggregate")
@@ -209,26 +251,13 @@ async def daily_plan_aggregate(
     auth_header: dict = Depends(get_auth_header)
 ):
     """日次計画の集計を取得（ダッシュボード用）"""
-    try:
-        async with httpx.AsyncClient() as client:
-            params = {}
-            if from_date:
-                params["from"] = from_date
-            if to_date:
-                params["to"] = to_date
-            
-            response = await client.get(
-                "http://task-service/v1/daily_plans/aggregate",
-                params=params,
-                headers=auth_header,
-                timeout=10.0
-            )
-            if response.status_code == 200:
-                return response.json()
-    except Exception:
-        pass
-    
-    return []
+    value, _ = await _cached(
+        auth_header,
+        "daily_plan_aggregate",
+        (from_date, to_date),
+        lambda: _fetch_aggregate(task_client(), "/daily_plans/aggregate", from_date, to_date, auth_header),
+    )
+    return value
 
 
 @router.get("/dashboard/daily_record_aggregate")
@@ -238,23 +267,10 @@ async def daily_record_aggregate(
     auth_header: dict = Depends(get_auth_header)
 ):
     """日次実績の集計を取得（ダッシュボード用）"""
-    try:
-        async with httpx.AsyncClient() as client:
-            params = {}
-            if from_date:
-                params["from"] = from_date
-            if to_date:
-                params["to"] = to_date
-            
-            response = await client.get(
-                "http://record-service/v1/records/daily_aggregate",
-                params=params,
-                headers=auth_header,
-                timeout=10.0
-            )
-            if response.status_code == 200:
-                return response.json()
-    except Exception:
-        pass
-    
-    return []
+    value, _ = await _cached(
+        auth_header,
+        "daily_record_aggregate",
+        (from_date, to_date),
+        lambda: _fetch_aggregate(record_client(), "/records/daily_aggregate", from_date, to_date, auth_header),
+    )
+    return value
@@ -1,10 +1,13 @@
 import httpx
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.background import BackgroundTask
 from typing import Optional
 
-# record-service URL (既存パターンに合わせてハードコード)
-RECORD_SVC_BASE = "http://record-service/v1"
+from ..clients import task_client, record_client
+from ..dashboard_cache import invalidate_dashboard_cache
+from ..etag import conditional_get_all, not_modified, set_etag
 
 auth_scheme = HTTPBearer(auto_error=False)
 router = APIRouter(tags=["records"])
@@ -19,87 +22,95 @@ async def get_auth_header(creds: HTTPAuthorizationCredentials = Depends(auth_sch
 
 @router.get("/records/by_task")
 async def list_records_by_task(
+    request: Request,
+    response: Response,
     task_id: Optional[int] = None,
     from_: Optional[str] = None,
     to: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     auth_header: dict = Depends(get_auth_header),
 ):
-    """タスク別実績一覧をrecord-serviceから取得し、全タスクとマージ"""
+    """タスク別実績一覧をrecord-serviceから取得し、全タスクとマージ
+    各タスクの実績は新しい順に limit 件まで。続きは next_cursor を cursor に渡して task_id 指定で取得する
+    """
     try:
-        async with httpx.AsyncClient() as client:
-            # 1. 全タスクを取得
-            tasks_response = await client.get(
-                "http://task-service/v1/tasks",
-                params={"mine": "true"},
-                headers=auth_header,
-                timeout=30.0
-            )
-            if tasks_response.status_code != 200:
-                raise HTTPException(
-                    status_code=tasks_response.status_code,
-                    detail={"message": "task service error"}
-                )
-            all_tasks = tasks_response.json()
+        params = {}
+        if task_id is not None:
+            params["task_id"] = task_id
+        if from_ is not None:
+            params["from"] = from_
+        if to is not None:
+            params["to"] = to
+        if limit is not None:
+            params["limit"] = limit
+        if cursor is not None:
+            params["cursor"] = cursor
             
-            # 2. 実績データを取得
-            params = {}
-            if task_id is not None:
-                params["task_id"] = task_id
-            if from_ is not None:
-                params["from"] = from_
-            if to is not None:
-                params["to"] = to
-                
-            records_response = await client.get(
-                f"{RECORD_SVC_BASE}/records/by_task",
-                params=params,
-                headers=auth_header,
-                timeout=30.0
+        # 1. 全タスクと 2. 実績データを並行取得（両サービスの ETag で条件付き取得）
+        responses, etag = await conditional_get_all(
+            request,
+            auth_header,
+            [(task_client(), "/tasks", {"mine": "true"}), (record_client(), "/records/by_task", params)],
+        )
+        if responses is None:
+            return not_modified(etag)
+        tasks_response, records_response = responses
+        if tasks_response.status_code != 200:
+            raise HTTPException(
+                status_code=tasks_response.status_code,
+                detail={"message": "task service error"}
             )
+        all_tasks = tasks_response.json()
+        
+        # 実績データの取得に失敗した場合は空の実績として扱う
+        if records_response.status_code == 200:
+            records_data = records_response.json()
+            tasks_with_records = {t["task_id"]: t for t in records_data.get("tasks", [])}
+        else:
+            tasks_with_records = {}
+        
+        # 3. 全タスクと実績をマージ
+        merged_tasks = []
+        for task in all_tasks:
+            current_task_id = task["task_id"]
             
-            # 実績データの取得に失敗した場合は空の実績として扱う
-            if records_response.status_code == 200:
-                records_data = records_response.json()
-                tasks_with_records = {t["task_id"]: t for t in records_data.get("tasks", [])}
-            else:
-                tasks_with_records = {}
-            
-            # 3. 全タスクと実績をマージ
-            merged_tasks = []
-            for task in all_tasks:
-                current_task_id = task["task_id"]
+            # task_idでフィルタリング（指定されている場合）
+            if task_id is not None and task_id != current_task_id:
+                continue
                 
-                # task_idでフィルタリング（指定されている場合）
-                if task_id is not None and task_id != current_task_id:
-                    continue
-                    
-                if current_task_id in tasks_with_records:
-                    # 実績があるタスク
-                    task_with_records = tasks_with_records[current_task_id]
-                    merged_tasks.append({
-                        "task_id": task["task_id"],
-                        "task_title": task["task_name"],
-                        "assignees": [],
-                        "records": task_with_records["records"]
-                    })
-                else:
-                    # 実績がないタスク
-                    merged_tasks.append({
-                        "task_id": task["task_id"],
-                        "task_title": task["task_name"],
-                        "assignees": [],
-                        "records": []
-                    })
-            
-            total_records = sum(len(t["records"]) for t in merged_tasks)
-            
-            return {
-                "from": from_,
-                "to": to,
-                "tasks": merged_tasks,
-                "total_tasks": len(merged_tasks),
-                "total_records": total_records,
-            }
+            if current_task_id in tasks_with_records:
+                # 実績があるタスク
+                task_with_records = tasks_with_records[current_task_id]
+                merged_tasks.append({
+                    "task_id": task["task_id"],
+                    "task_title": task["task_name"],
+                    "assignees": [],
+                    "records": task_with_records["records"],
+                    "has_more": task_with_records.get("has_more", False),
+                    "next_cursor": task_with_records.get("next_cursor"),
+                })
+            else:
+                # 実績がないタスク
+                merged_tasks.append({
+                    "task_id": task["task_id"],
+                    "task_title": task["task_name"],
+                    "assignees": [],
+                    "records": [],
+                    "has_more": False,
+                    "next_cursor": None,
+                })
+        
+        total_records = sum(len(t["records"]) for t in merged_tasks)
+        
+        set_etag(response, etag)
+        return {
+            "from": from_,
+            "to": to,
+            "tasks": merged_tasks,
+            "total_tasks": len(merged_tasks),
+            "total_records": total_records,
+        }
             
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail={"message": "service unavailable", "error": str(e)})
@@ -107,156 +118,211 @@ async def list_records_by_task(
 
 @router.get("/records/diary")
 async def list_records_diary(
-    page: int = 1,
+    request: Request,
+    response: Response,
     per_page: int = 50,
+    cursor: Optional[str] = None,
+    with_total: bool = True,
     from_: Optional[str] = None,
     to: Optional[str] = None,
     auth_header: dict = Depends(get_auth_header),
 ):
-    """時系列実績一覧をrecord-serviceから取得"""
+    """時系列実績一覧をrecord-serviceから取得
+    前後のページは next_cursor / prev_cursor を cursor に渡して取得する
+    """
     params = {
-        "page": page,
         "per_page": per_page,
+        "with_total": with_total,
     }
+    if cursor is not None:
+        params["cursor"] = cursor
     if from_ is not None:
         params["from"] = from_
     if to is not None:
         params["to"] = to
 
     try:
-        async with httpx.AsyncClient() as client:
-            # 1. 実績データを取得
-            response = await client.get(
-                f"{RECORD_SVC_BASE}/records",
-                params=params,
-                headers=auth_header,
-                timeout=30.0
+        # 1. 実績データと 2. 全タスク（タスク名のマッピング用）を並行取得（両サービスの ETag で条件付き取得）
+        responses, etag = await conditional_get_all(
+            request,
+            auth_header,
+            [(record_client(), "/records", params), (task_client(), "/tasks", {"mine": "true"})],
+        )
+        if responses is None:
+            return not_modified(etag)
+        records_response, tasks_response = responses
+        if records_response.status_code != 200:
+            raise HTTPException(
+                status_code=records_response.status_code,
+                detail=records_response.json() if records_response.headers.get("content-type") == "application/json" else {"message": "record service error"}
             )
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json() if response.headers.get("content-type") == "application/json" else {"message": "record service error"}
-                )
-            
-            records = response.json()
-            
-            # 2. 全タスクを取得してタスク名をマッピング
-            tasks_response = await client.get(
-                "http://task-service/v1/tasks",
-                params={"mine": "true"},
-                headers=auth_header,
-                timeout=30.0
-            )
-            
-            task_name_map = {}
-            if tasks_response.status_code == 200:
-                all_tasks = tasks_response.json()
-                task_name_map = {t["task_id"]: t["task_name"] for t in all_tasks}
-            
-            # 3. BFF用に形式を変換（タスク名をマージ）
-            items = [
-                {
-                    "record_work_id": r["record_work_id"],
-                    "task_id": r["task_id"],
-                    "task_title": task_name_map.get(r["task_id"]),
-                    "start_at": r["start_at"],
-                    "end_at": r["end_at"],
-                    "work_time": r["work_time"],
-                    "progress_value": r["progress_value"],
-                    "note": r["note"],
-                }
-                for r in records
-            ]
-            
-            return {
-                "from": from_,
-                "to": to,
-                "items": items,
-                "page": page,
-                "per_page": per_page,
-                "total": len(items),  # 簡易版、本来はtotal countを取得
+        
+        records_page = records_response.json()
+        
+        task_name_map = {}
+        if tasks_response.status_code == 200:
+            all_tasks = tasks_response.json()
+            task_name_map = {t["task_id"]: t["task_name"] for t in all_tasks}
+        
+        # 3. BFF用に形式を変換（タスク名をマージ）
+        items = [
+            {
+                "record_work_id": r["record_work_id"],
+                "task_id": r["task_id"],
+                "task_title": task_name_map.get(r["task_id"]),
+                "start_at": r["start_at"],
+                "end_at": r["end_at"],
+                "work_time": r["work_time"],
+                "progress_value": r["progress_value"],
+                "note": r["note"],
             }
+            for r in records_page["items"]
+        ]
+        
+        set_etag(response, etag)
+        return {
+            "from": from_,
+            "to": to,
+            "items": items,
+            "per_page": per_page,
+            "next_cursor": records_page.get("next_cursor"),
+            "prev_cursor": records_page.get("prev_cursor"),
+            "total": records_page.get("total"),
+            "total_exact": records_page.get("total_exact"),
+        }
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail={"message": "record service unavailable", "error": str(e)})
 
 
+@router.get("/records/export")
+async def export_records(
+    format: str = Query(default="ndjson", regex="^(ndjson|csv)$"),
+    task_id: Optional[int] = None,
+    from_: Optional[str] = Query(default=None, alias="from"),
+    to: Optional[str] = Query(default=None),
+    auth_header: dict = Depends(get_auth_header),
+):
+    """実績エクスポート（NDJSON / CSV）を record-service から受け取りながらそのまま流す（BFF ではバッファしない）"""
+    params = {"format": format}
+    if task_id is not None:
+        params["task_id"] = task_id
+    if from_ is not None:
+        params["from"] = from_
+    if to is not None:
+        params["to"] = to
+
+    client = record_client()
+    try:
+        upstream = await client.send(client.build_request("GET", "/records/export", params=params, headers=auth_header), stream=True)
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=503, detail={"message": "record service unavailable", "error": str(e)})
+    if upstream.status_code != 200:
+        await upstream.aread()
+        await upstream.aclose()
+        raise HTTPException(
+            status_code=upstream.status_code,
+            detail=upstream.json() if upstream.headers.get("content-type") == "application/json" else {"message": "record service error"}
+        )
+    headers = {"Content-Disposition": upstream.headers["content-disposition"]} if "content-disposition" in upstream.headers else None
+    # 終了・切断時に下流の接続を閉じる
+    return StreamingResponse(
+        upstream.aiter_raw(),
+        media_type=upstream.headers.get("content-type"),
+        headers=headers,
+        background=BackgroundTask(upstream.aclose),
+    )
+
+
 @router.get("/records/{record_work_id}")
 async def get_record(record_work_id: int, auth_header: dict = Depends(get_auth_header)):
     """単一実績をrecord-serviceから取得"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{RECORD_SVC_BASE}/records/{record_work_id}",
-                headers=auth_header,
-                timeout=30.0
+        response = await record_client().get(
+            f"/records/{record_work_id}",
+            headers=auth_header
+        )
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=response.json() if response.headers.get("content-type") == "application/json" else {"message": "record service error"}
             )
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json() if response.headers.get("content-type") == "application/json" else {"message": "record service error"}
-                )
-            return response.json()
+        return response.json()
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail={"message": "record service unavailable", "error": str(e)})
 
 
-@router.post("/records")
+@router.post("/records", dependencies=[Depends(invalidate_dashboard_cache)])
 async def create_record(payload: dict, auth_header: dict = Depends(get_auth_header)):
     """実績作成をrecord-serviceに委譲"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{RECORD_SVC_BASE}/records",
-                json=payload,
-                headers=auth_header,
-                timeout=30.0
+        response = await record_client().post(
+            "/records",
+            json=payload,
+            headers=auth_header
+        )
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=response.json() if response.headers.get("content-type") == "application/json" else {"message": "record service error"}
+            )
+        return response.json()
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=503, detail={"message": "record service unavailable", "error": str(e)})
+
+
+@router.post("/records/bulk", dependencies=[Depends(invalidate_dashboard_cache)])
+async def create_records_bulk(request: Request, skip_invalid: bool = False, auth_header: dict = Depends(get_auth_header)):
+    """実績の一括登録を record-service に委譲（本文は JSON 配列 / NDJSON / CSV のままストリーミングで転送）"""
+    headers = {**auth_header, "Content-Type": request.headers.get("content-type", "application/json")}
+    try:
+        response = await record_client().post(
+            "/records/bulk",
+            params={"skip_invalid": skip_invalid},
+            content=request.stream(),
+            headers=headers,
+        )
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=response.json() if response.headers.get("content-type") == "application/json" else {"message": "record service error"}
             )
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json() if response.headers.get("content-type") == "application/json" else {"message": "record service error"}
-                )
-            return response.json()
+        return response.json()
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail={"message": "record service unavailable", "error": str(e)})
 
 
-@router.patch("/records/{record_work_id}")
+@router.patch("/records/{record_work_id}", dependencies=[Depends(invalidate_dashboard_cache)])
 async def update_record(record_work_id: int, payload: dict, auth_header: dict = Depends(get_auth_header)):
     """実績更新をrecord-serviceに委譲"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.patch(
-                f"{RECORD_SVC_BASE}/records/{record_work_id}",
-                json=payload,
-                headers=auth_header,
-                timeout=30.0
+        response = await record_client().patch(
+            f"/records/{record_work_id}",
+            json=payload,
+            headers=auth_header
+        )
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=response.json() if response.headers.get("content-type") == "application/json" else {"message": "record service error"}
             )
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json() if response.headers.get("content-type") == "application/json" else {"message": "record service error"}
-                )
-            return response.json()
+        return response.json()
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail={"message": "record service unavailable", "error": str(e)})
 
 
-@router.delete("/records/{record_work_id}")
+@router.delete("/records/{record_work_id}", dependencies=[Depends(invalidate_dashboard_cache)])
 async def delete_record(record_work_id: int, auth_header: dict = Depends(get_auth_header)):
     """実績削除をrecord-serviceに委譲"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{RECORD_SVC_BASE}/records/{record_work_id}",
-                headers=auth_header,
-                timeout=30.0
+        response = await record_client().delete(
+            f"/records/{record_work_id}",
+            headers=auth_header
+        )
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=response.json() if response.headers.get("content-type") == "application/json" else {"message": "record service error"}
             )
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=response.json() if response.headers.get("content-type") == "application/json" else {"message": "record service error"}
-                )
-            return response.json()
+        return response.json()
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail={"message": "record service unavailable", "error": str(e)})
@@ -1,13 +1,23 @@
-from fastapi import APIRouter, HTTPException, Request
+import asyncio
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import Optional, List, Dict, Any
 from datetime import datetime, date
 import httpx
 
+from ..clients import task_client, user_client, record_client
+from ..dashboard_cache import invalidate_dashboard_cache
+from ..etag import body_etag, conditional_get_all, etag_matches, not_modified, set_etag
+
 router = APIRouter(tags=["tasks"])
 
-TASK_SVC_BASE = "http://task-service/v1"
-USER_SVC_BASE = "http://user-service/v1"
-RECORD_SVC_BASE = "http://record-service/v1"
+# list_tasks の include（daily_plans / actuals）取得設定
+INCLUDE_FETCH_CONCURRENCY = int(os.getenv("INCLUDE_FETCH_CONCURRENCY", "10"))  # 同時リクエスト数の上限
+INCLUDE_FETCH_DEADLINE = float(os.getenv("INCLUDE_FETCH_DEADLINE", "8"))  # include 取得全体の締め切り（秒）
+INCLUDE_BATCH_SIZE = 1000  # 一括取得 API 1回あたりの task_id 数（各サービスの上限）
+
+TASKS_MAX_PER_PAGE = 200  # 一覧1ページの上限（task-service の上限と同じ）
 
 
 def _forward_auth_headers(request: Request) -> dict:
@@ -18,79 +28,6 @@ def _forward_auth_headers(request: Request) -> dict:
     return headers
 
 
-def _aggregate_daily_actuals(
-    records: List[Dict],
-    expected_dates: Optional[List[str]] = None,
-    upto_date: Optional[date] = None,
-) -> List[Dict]:
-    """
-    実績データを日付ごとに集計（累積値）
-    records: [{ start_at, progress_value, work_time, ... }]
-    戻り値: [{ target_date, work_actual_value, time_actual_value }]
-    """
-    if not records:
-        return []
-    
-    # 日付ごとにグループ化
-    daily_data = {}
-    
-    for record in sorted(records, key=lambda r: r.get("start_at", "")):
-        start_at_str = record.get("start_at")
-        if not start_at_str:
-            continue
-        
-        try:
-            # ISO形式の日時から日付部分を抽出
-            date_str = start_at_str.split("T")[0]  # "2025-01-01T10:00:00" -> "2025-01-01"
-        except:
-            continue
-        
-        if date_str not in daily_data:
-            daily_data[date_str] = {
-                "progress_sum": 0,
-                "time_sum": 0
-            }
-        
-        daily_data[date_str]["progress_sum"] += record.get("progress_value", 0)
-        daily_data[date_str]["time_sum"] += record.get("work_time", 0)
-    
-    timeline_set = set()
-
-    for key in daily_data.keys():
-        key_date = _parse_iso_date(key)
-        if key_date and (upto_date is None or key_date <= upto_date):
-            timeline_set.add(key_date.isoformat())
-
-    if expected_dates:
-        for expected in expected_dates:
-            expected_date = _parse_iso_date(expected)
-            if expected_date and (upto_date is None or expected_date <= upto_date):
-                timeline_set.add(expected_date.isoformat())
-
-    timeline = sorted(timeline_set)
-
-    cumulative_progress = 0
-
-    result = []
-    for date_str in timeline:
-        day_values = daily_data.get(date_str)
-        if day_values:
-            cumulative_progress += day_values["progress_sum"]
-            daily_time = day_values["time_sum"]
-        else:
-            daily_time = 0
-
-        cumulative_progress = min(cumulative_progress, 100)
-
-        result.append({
-            "target_date": date_str,
-            "work_actual_value": cumulative_progress,
-            "time_actual_value": daily_time,
-        })
-
-    return result
-
-
 def _parse_iso_date(value) -> Optional[date]:
     if not value:
         return None
@@ -153,112 +90,206 @@ def _compute_today_summary(task: Dict[str, Any], today: date) -> None:
     task["summary_today"] = summary
 
 
+class _IncludeError(Exception):
+    pass
+
+
+async def _request_json(sem: asyncio.Semaphore, client: httpx.AsyncClient, method: str, path: str, headers: dict, **kwargs) -> Any:
+    async with sem:
+        try:
+            resp = await client.request(method, path, headers=headers, **kwargs)
+        except httpx.RequestError as e:
+            raise _IncludeError(f"request failed: {e.__class__.__name__}")
+    if not resp.is_success:
+        raise _IncludeError(f"status {resp.status_code}")
+    return resp.json()
+
+
+async def _wait_stage(fetches: Dict[Any, asyncio.Task], deadline: float) -> None:
+    """締め切りまで待ち、終わらなかったものはキャンセルする"""
+    if not fetches:
+        return
+    timeout = max(deadline - asyncio.get_running_loop().time(), 0)
+    _, pending = await asyncio.wait(fetches.values(), timeout=timeout)
+    for fut in pending:
+        fut.cancel()
+
+
+def _outcome(fut: asyncio.Task):
+    """(結果, エラー理由) を返す"""
+    if fut.cancelled() or not fut.done():
+        return None, "deadline exceeded"
+    if fut.exception() is not None:
+        return None, str(fut.exception())
+    return fut.result(), None
+
+
+def _spread_batches(fetches: Dict[int, asyncio.Task], task_ids: List[int], batch_size: int, kind: str, tasks_by_id: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict]]:
+    """バッチ取得の結果（{task_id: [...]}）をタスクごとに振り分け、失敗したバッチのタスクには理由を記録する"""
+    by_task: Dict[str, List[Dict]] = {}
+    for start, fut in fetches.items():
+        result, error = _outcome(fut)
+        for task_id in map(str, task_ids[start:start + batch_size]):
+            if error is None:
+                by_task[task_id] = (result.get(task_id) if isinstance(result, dict) else None) or []
+            else:
+                tasks_by_id[task_id].setdefault("include_errors", {})[kind] = error
+    return by_task
+
+
+async def _attach_includes(
+    tasks: List[Dict[str, Any]],
+    include_daily_plans: bool,
+    include_actuals: bool,
+    headers: dict,
+    today: date,
+) -> None:
+    """
+    各タスクの daily_plans / 実績タイムラインをバッチ API でまとめて取得して task に付与する
+    実績は計画日付で穴埋めするため、計画 → 実績の順に取得する（全体で1つの締め切り）
+    取得に失敗・締め切り超過したものは空リストとし、task["include_errors"] に理由を記録する
+    """
+    sem = asyncio.Semaphore(INCLUDE_FETCH_CONCURRENCY)
+    deadline = asyncio.get_running_loop().time() + INCLUDE_FETCH_DEADLINE
+    task_ids = [task.get("task_id") for task in tasks if task.get("task_id")]
+    tasks_by_id = {str(task.get("task_id")): task for task in tasks if task.get("task_id")}
+
+    plans_by_task: Dict[str, List[Dict]] = {}
+    if include_daily_plans:
+        # daily_plans は task-service の一括取得 API でまとめて取る
+        plan_fetches = {
+            start: asyncio.create_task(
+                _request_json(sem, task_client(), "GET", "/daily_plans", headers,
+                              params={"task_ids": task_ids[start:start + INCLUDE_BATCH_SIZE]})
+            )
+            for start in range(0, len(task_ids), INCLUDE_BATCH_SIZE)
+        }
+        await _wait_stage(plan_fetches, deadline)
+        plans_by_task = _spread_batches(plan_fetches, task_ids, INCLUDE_BATCH_SIZE, "daily_plans", tasks_by_id)
+
+    actuals_by_task: Dict[str, List[Dict]] = {}
+    if include_actuals:
+        # 実績は record-service 側で日次集計・累積済みのタイムラインを取る
+        actual_fetches = {}
+        for start in range(0, len(task_ids), INCLUDE_BATCH_SIZE):
+            chunk = task_ids[start:start + INCLUDE_BATCH_SIZE]
+            expected_dates = {
+                task_id: [
+                    p.get("target_date")
+                    for p in plans_by_task.get(str(task_id), [])
+                    if isinstance(p, dict) and p.get("target_date")
+                ]
+                for task_id in chunk
+            }
+            body = {
+                "task_ids": chunk,
+                "expected_dates": {k: v for k, v in expected_dates.items() if v},
+                "upto": today.isoformat(),
+            }
+            actual_fetches[start] = asyncio.create_task(
+                _request_json(sem, record_client(), "POST", "/records/actuals_timeline", headers, json=body)
+            )
+        await _wait_stage(actual_fetches, deadline)
+        actuals_by_task = _spread_batches(actual_fetches, task_ids, INCLUDE_BATCH_SIZE, "actuals", tasks_by_id)
+
+    for task in tasks:
+        key = str(task.get("task_id"))
+        if include_daily_plans:
+            task["daily_plans"] = plans_by_task.get(key, [])
+        if include_actuals:
+            task["daily_actuals"] = actuals_by_task.get(key, [])
+
+
 @router.get("/tasks")
-def list_tasks(request: Request, mine: Optional[bool] = True, category: Optional[str] = None, status: Optional[str] = None, include_daily_plans: Optional[bool] = False, include_actuals: Optional[bool] = False, page: int = 1, per_page: int = 50):
-    # v1: task-service への単純委譲（ページングは後続拡張でBFF側対応）
-    params = {"mine": mine} # 自分のタスクのみ取得（デフォルトで?mine=trueというクエリが来る）
+async def list_tasks(
+    request: Request,
+    response: Response,
+    mine: Optional[bool] = True,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    include_daily_plans: Optional[bool] = False,
+    include_actuals: Optional[bool] = False,
+    per_page: int = Query(default=50, ge=1, le=TASKS_MAX_PER_PAGE),
+    cursor: Optional[str] = None,
+    sort: str = Query(default="id", regex="^(id|start_at|end_at|updated_at)$"),
+    order: str = Query(default="desc", regex="^(asc|desc)$"),
+):
+    """
+    タスク一覧（task-service のキーセットページングをそのまま通す）
+    続きは next_cursor を cursor に渡して取得する。include の計画・実績は表示するページ分だけ取得する
+    """
+    params = {"mine": mine, "limit": per_page, "sort": sort, "order": order} # 自分のタスクのみ取得（デフォルトで?mine=trueというクエリが来る）
     if category is not None:
         params["category"] = category
     if status is not None:
         params["status"] = status
+    if cursor is not None:
+        params["cursor"] = cursor
     try:
-        # httpx.Clientやhttpx.getを使って、apiにアクセス
-        with httpx.Client(timeout=10.0) as client:
-            resp = client.get(f"{TASK_SVC_BASE}/tasks", params=params, headers=_forward_auth_headers(request)) # SVC：serviceのこと
-            if not resp.is_success:
-                raise HTTPException(status_code=resp.status_code, detail=resp.json())
-            
-            items = resp.json()
-            
-            # itemsがリストでない場合は空リストに
-            if not isinstance(items, list):
-                items = []
-            
-            today = datetime.utcnow().date()
-
-            # include_daily_plansがTrueの場合、各タスクのdaily_plansを取得
-            if include_daily_plans:
-                headers = _forward_auth_headers(request)
-                for task in items:
-                    # taskが辞書であることを確認
-                    if not isinstance(task, dict):
-                        continue
-                    task_id = task.get("task_id")
-                    if task_id:
-                        try:
-                            plans_resp = client.get(f"{TASK_SVC_BASE}/tasks/{task_id}/daily_plans", headers=headers)
-                            if plans_resp.is_success:
-                                task["daily_plans"] = plans_resp.json()
-                            else:
-                                task["daily_plans"] = []
-                        except Exception as e:
-                            print(f"Error fetching daily_plans for task {task_id}: {e}")
-                            task["daily_plans"] = []
-                    else:
-                        task["daily_plans"] = []
-            
-            # include_actualsがTrueの場合、各タスクの実績データを取得して集計
-            if include_actuals:
-                headers = _forward_auth_headers(request)
-                for task in items:
-                    if not isinstance(task, dict):
-                        continue
-                    task_id = task.get("task_id")
-                    if task_id:
-                        try:
-                            # record-serviceから実績を取得
-                            records_resp = client.get(
-                                f"{RECORD_SVC_BASE}/records",
-                                params={"task_id": task_id},
-                                headers=headers
-                            )
-                            if records_resp.is_success:
-                                records = records_resp.json()
-                                # 日付ごとに集計
-                                plan_dates = []
-                                if include_daily_plans:
-                                    plan_dates = [
-                                        p.get("target_date")
-                                        for p in task.get("daily_plans") or []
-                                        if isinstance(p, dict) and p.get("target_date")
-                                    ]
-                                task["daily_actuals"] = _aggregate_daily_actuals(
-                                    records,
-                                    plan_dates if plan_dates else None,
-                                    upto_date=today,
-                                )
-                            else:
-                                task["daily_actuals"] = []
-                        except Exception as e:
-                            print(f"Error fetching actuals for task {task_id}: {e}")
-                            task["daily_actuals"] = []
-                    else:
-                        task["daily_actuals"] = []
-            
-            for task in items:
-                if isinstance(task, dict):
-                    _compute_today_summary(task, today)
-
-            return {
-                "items": items,
-                "page": page,
-                "per_page": per_page,
-                "total": len(items),
-            }
+        include = bool(include_daily_plans or include_actuals)
+        # 共有の httpx.AsyncClient（keep-alive）を使って、apiにアクセス
+        # include なしの一覧は task-service の ETag で条件付き取得する（変化がなければ 304 をそのまま返す）
+        if include:
+            resp = await task_client().get("/tasks/page", params=params, headers=_forward_auth_headers(request)) # SVC：serviceのこと
+            etag = None
+        else:
+            responses, etag = await conditional_get_all(request, _forward_auth_headers(request), [(task_client(), "/tasks/page", params)])
+            if responses is None:
+                return not_modified(etag)
+            resp = responses[0]
+        if not resp.is_success:
+            raise HTTPException(status_code=resp.status_code, detail=resp.json())
+
+        page = resp.json()
+        items = page.get("items") if isinstance(page, dict) else None
+        # itemsがリストでない場合は空リストに
+        if not isinstance(items, list):
+            items = []
+
+        today = datetime.utcnow().date()
+
+        # include_daily_plans / include_actuals はこのページのタスク分だけ同時取得（上限・締め切りつき）
+        if include:
+            await _attach_includes(
+                [task for task in items if isinstance(task, dict)],
+                include_daily_plans=bool(include_daily_plans),
+                include_actuals=bool(include_actuals),
+                headers=_forward_auth_headers(request),
+                today=today,
+            )
+
+        for task in items:
+            if isinstance(task, dict):
+                _compute_today_summary(task, today)
+
+        payload = {
+            "items": items,
+            "per_page": per_page,
+            "sort": sort,
+            "order": order,
+            "next_cursor": page.get("next_cursor"),
+            "total": page.get("total", len(items)),
+        }
+        if include:
+            # 計画・実績は下流の ETag で表せないので、本文のハッシュで転送量だけ省く
+            etag = body_etag(payload)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+        set_etag(response, etag)
+        return payload
     except httpx.RequestError as e:
         raise HTTPException(status_code=502, detail={"message": "task-service unavailable", "error": str(e)})
 
 
 @router.get("/tasks/{task_id}/auths")
-def list_task_auths(task_id: int, request: Request):
+async def list_task_auths(task_id: int, request: Request):
     headers = _forward_auth_headers(request)
     try:
-        with httpx.Client(timeout=10.0) as client:
-            resp = client.get(
-                f"{USER_SVC_BASE}/task_auths",
-                params={"task_id": task_id},
-                headers=headers,
-            )
+        resp = await user_client().get(
+            "/task_auths",
+            params={"task_id": task_id},
+            headers=headers,
+        )
         if resp.is_success:
             return resp.json()
         raise HTTPException(status_code=resp.status_code, detail=resp.json())
@@ -266,14 +297,13 @@ def list_task_auths(task_id: int, request: Request):
         raise HTTPException(status_code=502, detail={"message": "user-service unavailable", "error": str(e)})
 
 
-@router.post("/tasks/{task_id}/auths")
-def create_task_auth(task_id: int, payload: Dict[str, Any], request: Request):
+@router.post("/tasks/{task_id}/auths", dependencies=[Depends(invalidate_dashboard_cache)])
+async def create_task_auth(task_id: int, payload: Dict[str, Any], request: Request):
     headers = _forward_auth_headers(request)
     body = dict(payload or {})
     body["task_id"] = task_id
     try:
-        with httpx.Client(timeout=10.0) as client:
-            resp = client.post(f"{USER_SVC_BASE}/task_auths", json=body, headers=headers)
+        resp = await user_client().post("/task_auths", json=body, headers=headers)
         if resp.is_success:
             return resp.json()
         raise HTTPException(status_code=resp.status_code, detail=resp.json())
@@ -281,16 +311,15 @@ def create_task_auth(task_id: int, payload: Dict[str, Any], request: Request):
         raise HTTPException(status_code=502, detail={"message": "user-service unavailable", "error": str(e)})
 
 
-@router.patch("/tasks/{task_id}/auths/{task_auth_id}")
-def update_task_auth(task_id: int, task_auth_id: int, payload: Dict[str, Any], request: Request):
+@router.patch("/tasks/{task_id}/auths/{task_auth_id}", dependencies=[Depends(invalidate_dashboard_cache)])
+async def update_task_auth(task_id: int, task_auth_id: int, payload: Dict[str, Any], request: Request):
     headers = _forward_auth_headers(request)
     try:
-        with httpx.Client(timeout=10.0) as client:
-            resp = client.patch(
-                f"{USER_SVC_BASE}/task_auths/{task_auth_id}",
-                json=payload,
-                headers=headers,
-            )
+        resp = await user_client().patch(
+            f"/task_auths/{task_auth_id}",
+            json=payload,
+            headers=headers,
+        )
         if resp.is_success:
             return resp.json()
         raise HTTPException(status_code=resp.status_code, detail=resp.json())
@@ -298,12 +327,11 @@ def update_task_auth(task_id: int, task_auth_id: int, payload: Dict[str, Any], r
         raise HTTPException(status_code=502, detail={"message": "user-service unavailable", "error": str(e)})
 
 
-@router.delete("/tasks/{task_id}/auths/{task_auth_id}")
-def delete_task_auth(task_id: int, task_auth_id: int, request: Request):
+@router.delete("/tasks/{task_id}/auths/{task_auth_id}", dependencies=[Depends(invalidate_dashboard_cache)])
+async def delete_task_auth(task_id: int, task_auth_id: int, request: Request):
     headers = _forward_auth_headers(request)
     try:
-        with httpx.Client(timeout=10.0) as client:
-            resp = client.delete(f"{USER_SVC_BASE}/task_auths/{task_auth_id}", headers=headers)
+        resp = await user_client().delete(f"/task_auths/{task_auth_id}", headers=headers)
         if resp.is_success:
             # user-service returns {"ok": True}
             return resp.json()
@@ -312,17 +340,23 @@ def delete_task_auth(task_id: int, task_auth_id: int, request: Request):
         raise HTTPException(status_code=502, detail={"message": "user-service unavailable", "error": str(e)})
 
 @router.get("/tasks/{task_id}")
-def get_task(task_id: int, request: Request):
-    # v1: task本体 + 日次計画をtask-serviceから取得して返却
+async def get_task(task_id: int, request: Request, response: Response):
+    # v1: task本体 + 日次計画をtask-serviceから取得して返却（両方の ETag で条件付き取得）
     headers = _forward_auth_headers(request)
     try:
-        with httpx.Client(timeout=10.0) as client:
-            task_resp = client.get(f"{TASK_SVC_BASE}/tasks/{task_id}", headers=headers)
-            if not task_resp.is_success:
-                raise HTTPException(status_code=task_resp.status_code, detail=task_resp.json())
-            plans_resp = client.get(f"{TASK_SVC_BASE}/tasks/{task_id}/daily_plans", headers=headers)
-            if not plans_resp.is_success:
-                raise HTTPException(status_code=plans_resp.status_code, detail=plans_resp.json())
+        responses, etag = await conditional_get_all(
+            request,
+            headers,
+            [(task_client(), f"/tasks/{task_id}", None), (task_client(), f"/tasks/{task_id}/daily_plans", None)],
+        )
+        if responses is None:
+            return not_modified(etag)
+        task_resp, plans_resp = responses
+        if not task_resp.is_success:
+            raise HTTPException(status_code=task_resp.status_code, detail=task_resp.json())
+        if not plans_resp.is_success:
+            raise HTTPException(status_code=plans_resp.status_code, detail=plans_resp.json())
+        set_etag(response, etag)
         return {
             "task": task_resp.json(),
             "daily_plans": plans_resp.json(),
@@ -332,12 +366,11 @@ def get_task(task_id: int, request: Request):
         raise HTTPException(status_code=502, detail={"message": "task-service unavailable", "error": str(e)})
 
 
-@router.post("/tasks")
-def create_task(payload: dict, request: Request):
+@router.post("/tasks", dependencies=[Depends(invalidate_dashboard_cache)])
+async def create_task(payload: dict, request: Request):
     headers = _forward_auth_headers(request)
     try:
-        with httpx.Client(timeout=10.0) as client:
-            resp = client.post(f"{TASK_SVC_BASE}/tasks", json=payload, headers=headers)
+        resp = await task_client().post("/tasks", json=payload, headers=headers)
         if resp.is_success:
             return resp.json()
         raise HTTPException(status_code=resp.status_code, detail=resp.json())
@@ -345,12 +378,11 @@ def create_task(payload: dict, request: Request):
         raise HTTPException(status_code=502, detail={"message": "task-service unavailable", "error": str(e)})
 
 
-@router.patch("/tasks/{task_id}")
-def update_task(task_id: int, payload: dict, request: Request):
+@router.patch("/tasks/{task_id}", dependencies=[Depends(invalidate_dashboard_cache)])
+async def update_task(task_id: int, payload: dict, request: Request):
     headers = _forward_auth_headers(request)
     try:
-        with httpx.Client(timeout=10.0) as client:
-            resp = client.patch(f"{TASK_SVC_BASE}/tasks/{task_id}", json=payload, headers=headers)
+        resp = await task_client().patch(f"/tasks/{task_id}", json=payload, headers=headers)
         if resp.is_success:
             return resp.json()
         raise HTTPException(status_code=resp.status_code, detail=resp.json())
@@ -358,12 +390,11 @@ def update_task(task_id: int, payload: dict, request: Request):
         raise HTTPException(status_code=502, detail={"message": "task-service unavailable", "error": str(e)})
 
 
-@router.delete("/tasks/{task_id}")
-def delete_task(task_id: int, request: Request):
+@router.delete("/tasks/{task_id}", dependencies=[Depends(invalidate_dashboard_cache)])
+async def delete_task(task_id: int, request: Request):
     headers = _forward_auth_headers(request)
     try:
-        with httpx.Client(timeout=10.0) as client:
-            resp = client.delete(f"{TASK_SVC_BASE}/tasks/{task_id}", headers=headers)
+        resp = await task_client().delete(f"/tasks/{task_id}", headers=headers)
         if resp.is_success:
             return resp.json()
         raise HTTPException(status_code=resp.status_code, detail=resp.json())
@@ -372,8 +403,8 @@ def delete_task(task_id: int, request: Request):
 
 
 # 合成API: タスク作成 + 日次計画一括登録（失敗時は補償削除）
-@router.post("/tasks_with_plans")
-def create_task_with_plans(payload: Dict[str, Any], request: Request):
+@router.post("/tasks_with_plans", dependencies=[Depends(invalidate_dashboard_cache)])
+async def create_task_with_plans(payload: Dict[str, Any], request: Request):
     """
     入力例:
     {
@@ -402,29 +433,28 @@ def create_task_with_plans(payload: Dict[str, Any], request: Request):
 
     created_task = None
     try:
-        with httpx.Client(timeout=10.0) as client:
-            # 1) タスク作成
-            task_resp = client.post(f"{TASK_SVC_BASE}/tasks", json=task_body, headers=headers)
-            if not task_resp.is_success:
-                raise HTTPException(status_code=task_resp.status_code, detail=task_resp.json())
-            created_task = task_resp.json()
-            task_id = created_task.get("task_id")
-            if not task_id:
-                # 念のためガード
-                raise HTTPException(status_code=502, detail={"message": "invalid response from task-service: missing task_id"})
-
-            # 2) 日次計画一括
-            bulk_resp = client.put(
-                f"{TASK_SVC_BASE}/tasks/{task_id}/daily_plans/bulk",
-                json=items,
-                headers=headers,
-            )
-            if not bulk_resp.is_success:
-                # 失敗したら補償として作成タスクを削除
-                try:
-                    client.delete(f"{TASK_SVC_BASE}/tasks/{task_id}", headers=headers)
-                finally:
-                    raise HTTPException(status_code=bulk_resp.status_code, detail=bulk_resp.json())
+        # 1) タスク作成
+        task_resp = await task_client().post("/tasks", json=task_body, headers=headers)
+        if not task_resp.is_success:
+            raise HTTPException(status_code=task_resp.status_code, detail=task_resp.json())
+        created_task = task_resp.json()
+        task_id = created_task.get("task_id")
+        if not task_id:
+            # 念のためガード
+            raise HTTPException(status_code=502, detail={"message": "invalid response from task-service: missing task_id"})
+
+        # 2) 日次計画一括
+        bulk_resp = await task_client().put(
+            f"/tasks/{task_id}/daily_plans/bulk",
+            json=items,
+            headers=headers,
+        )
+        if not bulk_resp.is_success:
+            # 失敗したら補償として作成タスクを削除
+            try:
+                await task_client().delete(f"/tasks/{task_id}", headers=headers)
+            finally:
+                raise HTTPException(status_code=bulk_resp.status_code, detail=bulk_resp.json())
 
         # 成功
         return {"task": created_task, "daily_plans_count": len(items)}
@@ -434,8 +464,8 @@ def create_task_with_plans(payload: Dict[str, Any], request: Request):
 
 
 # 合成API: タスク更新 + 日次計画一括更新（失敗時は補償で元に戻す）
-@router.patch("/tasks_with_plans/{task_id}")
-def update_task_with_plans(task_id: int, payload: Dict[str, Any], request: Request):
+@router.patch("/tasks_with_plans/{task_id}", dependencies=[Depends(invalidate_dashboard_cache)])
+async def update_task_with_plans(task_id: int, payload: Dict[str, Any], request: Request):
     """
     入力例:
     {
@@ -457,56 +487,55 @@ def update_task_with_plans(task_id: int, payload: Dict[str, Any], request: Reque
         raise HTTPException(status_code=400, detail={"message": "daily_plans.items is required"})
 
     try:
-        with httpx.Client(timeout=10.0) as client:
-            # 1) 現在のタスクを取得
-            cur_task_resp = client.get(f"{TASK_SVC_BASE}/tasks/{task_id}", headers=headers)
-            if not cur_task_resp.is_success:
-                raise HTTPException(status_code=cur_task_resp.status_code, detail=cur_task_resp.json())
-            original_task = cur_task_resp.json()
-
-            # 2) タスク更新（task_bodyが空ならスキップ）
-            updated_task = original_task
-            if task_body:
-                patch_resp = client.patch(f"{TASK_SVC_BASE}/tasks/{task_id}", json=task_body, headers=headers)
-                if not patch_resp.is_success:
-                    raise HTTPException(status_code=patch_resp.status_code, detail=patch_resp.json())
-                updated_task = patch_resp.json()
-
-            # 2.5) 軽量検証（合計チェック）。target_time は更新後の値で評価
-            try:
-                sum_time = sum(int(x.get("time_plan_value", 0)) for x in items)
-                tgt_time = int(updated_task.get("target_time", 0))
+        # 1) 現在のタスクを取得
+        cur_task_resp = await task_client().get(f"/tasks/{task_id}", headers=headers)
+        if not cur_task_resp.is_success:
+            raise HTTPException(status_code=cur_task_resp.status_code, detail=cur_task_resp.json())
+        original_task = cur_task_resp.json()
+
+        # 2) タスク更新（task_bodyが空ならスキップ）
+        updated_task = original_task
+        if task_body:
+            patch_resp = await task_client().patch(f"/tasks/{task_id}", json=task_body, headers=headers)
+            if not patch_resp.is_success:
+                raise HTTPException(status_code=patch_resp.status_code, detail=patch_resp.json())
+            updated_task = patch_resp.json()
+
+        # 2.5) 軽量検証（合計チェック）。target_time は更新後の値で評価
+        try:
+            sum_time = sum(int(x.get("time_plan_value", 0)) for x in items)
+            tgt_time = int(updated_task.get("target_time", 0))
                 
-                # work_plan_value は累積値なので、最大値が100であることを確認
-                max_work = max(int(x.get("work_plan_value", 0)) for x in items) if items else 0
-                if max_work != 100:
-                    raise HTTPException(status_code=400, detail={"message": "max(work_plan_value) must be 100 (cumulative)"})
-                if sum_time != tgt_time:
-                    raise HTTPException(status_code=400, detail={"message": "sum(time_plan_value) must equal task.target_time"})
-            except ValueError:
-                raise HTTPException(status_code=400, detail={"message": "invalid daily_plans items"})
-
-            # 3) 日次計画bulk（upsert+prune）
-            bulk_resp = client.put(
-                f"{TASK_SVC_BASE}/tasks/{task_id}/daily_plans/bulk",
-                json=items,
-                headers=headers,
-            )
-            if not bulk_resp.is_success:
-                # 4) 補償: タスクを元に戻す（best-effort）
-                try:
-                    revert = {
-                        "task_name": original_task.get("task_name"),
-                        "task_content": original_task.get("task_content"),
-                        "start_at": original_task.get("start_at"),
-                        "end_at": original_task.get("end_at"),
-                        "category": original_task.get("category"),
-                        "target_time": original_task.get("target_time"),
-                        "comment": original_task.get("comment"),
-                    }
-                    client.patch(f"{TASK_SVC_BASE}/tasks/{task_id}", json=revert, headers=headers)
-                finally:
-                    raise HTTPException(status_code=bulk_resp.status_code, detail=bulk_resp.json())
+            # work_plan_value は累積値なので、最大値が100であることを確認
+            max_work = max(int(x.get("work_plan_value", 0)) for x in items) if items else 0
+            if max_work != 100:
+                raise HTTPException(status_code=400, detail={"message": "max(work_plan_value) must be 100 (cumulative)"})
+            if sum_time != tgt_time:
+                raise HTTPException(status_code=400, detail={"message": "sum(time_plan_value) must equal task.target_time"})
+        except ValueError:
+            raise HTTPException(status_code=400, detail={"message": "invalid daily_plans items"})
+
+        # 3) 日次計画bulk（upsert+prune）
+        bulk_resp = await task_client().put(
+            f"/tasks/{task_id}/daily_plans/bulk",
+            json=items,
+            headers=headers,
+        )
+        if not bulk_resp.is_success:
+            # 4) 補償: タスクを元に戻す（best-effort）
+            try:
+                revert = {
+                    "task_name": original_task.get("task_name"),
+                    "task_content": original_task.get("task_content"),
+                    "start_at": original_task.get("start_at"),
+                    "end_at": original_task.get("end_at"),
+                    "category": original_task.get("category"),
+                    "target_time": original_task.get("target_time"),
+                    "comment": original_task.get("comment"),
+                }
+                await task_client().patch(f"/tasks/{task_id}", json=revert, headers=headers)
+            finally:
+                raise HTTPException(status_code=bulk_resp.status_code, detail=bulk_resp.json())
 
         # 成功
         return {"task": updated_task, "daily_plans_count": len(items)}
@@ -0,0 +1,56 @@
+import asyncio
+from urllib.parse import parse_qs
+
+import httpx
+
+from app import clients
+from app.routers import dashboard
+
+TASK_COUNT = 2500
+SERVICE_MAX_TASK_IDS = 1000  # task-service / record-service の task_ids 上限
+
+
+def _task_ids(request: httpx.Request) -> list:
+    return [int(v) for v in parse_qs(request.url.query.decode())["task_ids"]]
+
+
+def _task_service(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/v1/tasks":
+        tasks = [{"task_id": i, "task_name": f"task {i}"} for i in range(1, TASK_COUNT + 1)]
+        return httpx.Response(200, json=tasks)
+    task_ids = _task_ids(request)
+    if len(task_ids) > SERVICE_MAX_TASK_IDS:
+        return httpx.Response(422, json={"detail": "too many task_ids"})
+    # 全タスクで計画 10
+    return httpx.Response(200, json=[{"task_id": i, "work_plan_value": 10} for i in task_ids])
+
+
+def _record_service(request: httpx.Request) -> httpx.Response:
+    task_ids = _task_ids(request)
+    if len(task_ids) > SERVICE_MAX_TASK_IDS:
+        return httpx.Response(422, json={"detail": "too many task_ids"})
+    # 偶数 task_id だけ計画どおり進んでいる
+    return httpx.Response(
+        200, json=[{"task_id": i, "progress_value": 10 if i % 2 == 0 else 3} for i in task_ids]
+    )
+
+
+def test_lagging_tasks_over_service_limit():
+    async def run():
+        clients._clients["task"] = httpx.AsyncClient(
+            base_url="http://task-service/v1", transport=httpx.MockTransport(_task_service)
+        )
+        clients._clients["record"] = httpx.AsyncClient(
+            base_url="http://record-service/v1", transport=httpx.MockTransport(_record_service)
+        )
+        try:
+            return await dashboard._compute_lagging_tasks({})
+        finally:
+            await clients.close_clients()
+
+    lagging, complete = asyncio.run(run())
+
+    assert complete
+    assert len(lagging) == TASK_COUNT // 2
+    assert {t["task_id"] for t in lagging} == set(range(1, TASK_COUNT + 1, 2))
+    assert all(t["progress_gap"] == -7 for t in lagging)
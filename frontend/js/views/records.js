@@ -13,19 +13,16 @@ function formatDateForInput(utcDateString) {
   return `${year}-${month}-${day}T${hours}:${minutes}`;
 }
 
-export async function RecordsView() {
-  let data = { items: [] };
-  try { data = await api.listRecords({ page:1, per_page:50 }); } catch {}
-  const items = Array.isArray(data) ? data : (data.items || []); // dataが配列ならそのまま、そうでなければdata.itemsを配列として扱う
+const RECORDS_PER_PAGE = 50;
+
+// 表示中のページのカーソル（null は先頭ページ）と、その先頭行の通し番号（件数表示用）
+let recordsCursor = null;
+let recordsOffset = 0;
+// 表示中のページから前後へ移動するためのカーソル
+let recordsPageCursors = { prev: null, next: null };
 
-  // r.title || r.name || r.id  ... r（APIレスポンス）にtitleが無いならname, nameが無いならid
+function renderRecordRow(r) {
   return `
-  <div class="card">
-    <h2>実績記録</h2>
-    <table class="table">
-      <thead><tr><th>タスク</th><th>開始</th><th>終了</th><th>進捗</th><th>作業時間(分)</th><th>操作</th></tr></thead>
-      <tbody>
-        ${items.map(r => `
           <tr>
             <td>${r.task_title || r.task_name || r.task_id}</td>
             <td>${r.start_at ? new Date(r.start_at).toLocaleString() : ''}</td>
@@ -37,16 +34,101 @@ export async function RecordsView() {
               <button class="btn btn-xs btn-danger" data-del-record="${r.record_work_id || r.id}">削除</button>
             </td>
           </tr>
-        `).join('')}
+        `;
+}
+
+// 「前へ / 次へ」と「51〜100 / 全 1,234 件」の表示
+function renderRecordsPager(data, count) {
+  const total = data.total ?? count;
+  const totalLabel = `${data.total_exact === false ? '約 ' : ''}${Number(total).toLocaleString()}`;
+  const range = count ? `${recordsOffset + 1}〜${recordsOffset + count}` : '0';
+  return `
+      <button type="button" class="btn secondary" id="btn-prev-records" ${recordsPageCursors.prev ? '' : 'disabled'}>前へ</button>
+      <span class="helper">${range} / 全 ${totalLabel} 件</span>
+      <button type="button" class="btn secondary" id="btn-next-records" ${recordsPageCursors.next ? '' : 'disabled'}>次へ</button>
+  `;
+}
+
+export async function RecordsView() {
+  // 画面を開き直したときは先頭ページから表示
+  recordsCursor = null;
+  recordsOffset = 0;
+  let data = { items: [] };
+  try { data = await api.listRecords({ per_page: RECORDS_PER_PAGE }); } catch {}
+  const items = data.items || [];
+  recordsPageCursors = { prev: data.prev_cursor || null, next: data.next_cursor || null };
+
+  return `
+  <div class="card">
+    <h2>実績記録</h2>
+    <table class="table">
+      <thead><tr><th>タスク</th><th>開始</th><th>終了</th><th>進捗</th><th>作業時間(分)</th><th>操作</th></tr></thead>
+      <tbody id="records-body">
+        ${items.map(renderRecordRow).join('')}
       </tbody>
     </table>
-    ${!items.length ? '<div class="helper">記録がありません</div>' : ''}
+    <div class="helper${items.length ? ' hidden' : ''}" id="records-empty">記録がありません</div>
+    <div class="records-pager" id="records-pager">${renderRecordsPager(data, items.length)}</div>
     <div id="modal-root"></div>
   </div>`;
 }
 
+// cursor のページを取得して表とページ送りを差し替える（offset はそのページの先頭行の通し番号）
+async function showRecordsPage(cursor, offset) {
+  const data = await api.listRecords({ per_page: RECORDS_PER_PAGE, cursor });
+  const items = data.items || [];
+  if (!items.length && cursor) {
+    // 削除などでページが空になった場合は先頭ページへ戻る
+    return showRecordsPage(null, 0);
+  }
+  recordsCursor = cursor;
+  // 前ページが無ければ先頭（前へ戻ったときの推定位置のずれもここで直る）
+  recordsOffset = data.prev_cursor ? Math.max(offset, 0) : 0;
+  recordsPageCursors = { prev: data.prev_cursor || null, next: data.next_cursor || null };
+
+  document.getElementById('records-body').innerHTML = items.map(renderRecordRow).join('');
+  document.getElementById('records-empty').classList.toggle('hidden', items.length > 0);
+  document.getElementById('records-pager').innerHTML = renderRecordsPager(data, items.length);
+  bindRecordRowEvents();
+  bindRecordsPagerEvents(items.length);
+}
+
+// 表示中のページを取り直す（編集・削除の後）
+function reloadRecordsPage() {
+  return showRecordsPage(recordsCursor, recordsOffset);
+}
+
 // 実績ページのイベントハンドラーを設定する関数
 export function setupRecordsEvents() {
+  bindRecordRowEvents();
+  bindRecordsPagerEvents(document.querySelectorAll('#records-body tr').length);
+}
+
+function bindRecordsPagerEvents(count) {
+  const prevBtn = document.getElementById('btn-prev-records');
+  const nextBtn = document.getElementById('btn-next-records');
+  const go = async (btn, cursor, offset) => {
+    if (!cursor) return;
+    btn.disabled = true;
+    try {
+      await showRecordsPage(cursor, offset);
+      window.scrollTo(0, 0);
+    } catch (e) {
+      console.error('Failed to load records page', e);
+      alert('実績の取得に失敗しました: ' + e.message);
+      btn.disabled = false;
+    }
+  };
+  if (prevBtn) {
+    // 前ページの件数は取得するまで分からないので、1ページ分戻った位置とみなす
+    prevBtn.onclick = () => go(prevBtn, recordsPageCursors.prev, recordsOffset - RECORDS_PER_PAGE);
+  }
+  if (nextBtn) {
+    nextBtn.onclick = () => go(nextBtn, recordsPageCursors.next, recordsOffset + count);
+  }
+}
+
+function bindRecordRowEvents() {
   // 編集ボタン
   document.querySelectorAll('[data-edit-record]').forEach(btn => {
     btn.onclick = async (e) => {
@@ -86,9 +168,8 @@ async function editRecord(recordId, data) {
   try {
     await api.updateRecord(recordId, data);
     alert('実績が更新されました');
-    // ページを再描画（リロードの代わりに現在のページを再レンダリング）
-    const currentPath = location.hash.replace(/^#/, '');
-    location.hash = '#' + currentPath; // ルーターのhashchangeをトリガー
+    // 表示中のページだけ取り直す（先頭ページに戻さない）
+    await reloadRecordsPage();
   } catch (e) {
     console.error('Failed to edit record', e);
     alert('実績の更新に失敗しました: ' + e.message);
@@ -100,9 +181,8 @@ async function deleteRecord(recordId) {
   try {
     await api.deleteRecord(recordId);
     alert('実績が削除されました');
-    // ページを再描画（リロードの代わりに現在のページを再レンダリング）
-    const currentPath = location.hash.replace(/^#/, '');
-    location.hash = '#' + currentPath; // ルーターのhashchangeをトリガー
+    // 表示中のページだけ取り直す（先頭ページに戻さない）
+    await reloadRecordsPage();
   } catch (e) {
     console.error('Failed to delete record', e);
     alert('実績の削除に失敗しました: ' + e.message);
@@ -17,23 +17,13 @@ export async function RecordsBoardView(params = {}) {
     <div class="kanban-column">
       <div class="kanban-column__header">
         <div class="kanban-column__title">${t.task_title}</div>
-        <div class="kanban-column__meta">${(t.records || []).length} 件</div>
+        <div class="kanban-column__meta">${(t.records || []).length}${t.has_more ? '+' : ''} 件</div>
       </div>
-      <div class="kanban-column__body">
-        ${(t.records || []).map(r => `
-          <div class="kanban-card">
-            <div class="kanban-card__row"><span class="badge">${new Date(r.start_at).toLocaleDateString()}</span></div>
-            <div class="kanban-card__row small">${new Date(r.start_at).toLocaleTimeString()} - ${new Date(r.end_at).toLocaleTimeString()}</div>
-            <div class="kanban-card__row">進捗: ${r.progress_value ?? ''} / 時間: ${r.work_time ?? ''} 分</div>
-            ${r.note ? `<div class="kanban-card__note">${r.note}</div>` : ''}
-            <div class="kanban-card__actions">
-              <button class="btn btn-xs" data-edit-record="${r.record_work_id}">編集</button>
-              <button class="btn btn-xs btn-danger" data-del-record="${r.record_work_id}">削除</button>
-            </div>
-          </div>
-        `).join('')}
+      <div class="kanban-column__body" data-records-body="${t.task_id}">
+        ${(t.records || []).map(renderRecordCard).join('')}
         ${!(t.records || []).length ? '<div class="helper">記録がありません</div>' : ''}
       </div>
+      ${t.has_more ? `<button class="btn btn-sm kanban-column__more" data-more-records="${t.task_id}" data-cursor="${t.next_cursor}" data-from="${from ?? ''}" data-to="${to ?? ''}">さらに表示</button>` : ''}
       <div class="kanban-column__footer">
         <button class="btn btn-sm" data-add-record="${t.task_id}">+ 実績追加</button>
       </div>
@@ -53,6 +43,7 @@ export async function RecordsBoardView(params = {}) {
       .kanban-card__row.small { color:#4b5563; font-size: 12px; }
       .kanban-card__note { margin-top: 4px; color:#1f2937; font-size: 13px; white-space: pre-wrap; }
       .kanban-card__actions { display:flex; gap:6px; margin-top: 6px; }
+      .kanban-column__more { margin: 0 8px 8px; }
       .kanban-column__footer { padding: 8px; border-top: 1px solid #f0f0f0; }
       .badge { display:inline-block; background:#eef2ff; color:#3730a3; border-radius: 9999px; padding:2px 8px; font-size:12px; }
     </style>
@@ -72,8 +63,51 @@ export async function RecordsBoardView(params = {}) {
   </div>`;
 }
 
+function renderRecordCard(r) {
+  return `
+          <div class="kanban-card">
+            <div class="kanban-card__row"><span class="badge">${new Date(r.start_at).toLocaleDateString()}</span></div>
+            <div class="kanban-card__row small">${new Date(r.start_at).toLocaleTimeString()} - ${new Date(r.end_at).toLocaleTimeString()}</div>
+            <div class="kanban-card__row">進捗: ${r.progress_value ?? ''} / 時間: ${r.work_time ?? ''} 分</div>
+            ${r.note ? `<div class="kanban-card__note">${r.note}</div>` : ''}
+            <div class="kanban-card__actions">
+              <button class="btn btn-xs" data-edit-record="${r.record_work_id}">編集</button>
+              <button class="btn btn-xs btn-danger" data-del-record="${r.record_work_id}">削除</button>
+            </div>
+          </div>
+        `;
+}
+
 // イベントハンドラを設定する関数
 export function setupRecordsBoardEvents() {
+  // さらに表示ボタン（タスク単位で続きを取得して列に追加）
+  document.querySelectorAll('[data-more-records]').forEach(btn => {
+    btn.onclick = async (e) => {
+      const button = e.target;
+      const taskId = button.dataset.moreRecords;
+      button.disabled = true;
+      try {
+        const { from, to, cursor } = button.dataset;
+        const data = await api.listRecordsByTask({ from_: from, to, task_id: taskId, cursor });
+        const task = (data?.tasks || []).find(t => String(t.task_id) === String(taskId));
+        const body = document.querySelector(`[data-records-body="${taskId}"]`);
+        if (task && body) {
+          body.insertAdjacentHTML('beforeend', (task.records || []).map(renderRecordCard).join(''));
+        }
+        if (task?.has_more) {
+          button.dataset.cursor = task.next_cursor;
+          button.disabled = false;
+        } else {
+          button.remove();
+        }
+        setupRecordsBoardEvents();
+      } catch (err) {
+        console.error('Failed to load more records', err);
+        button.disabled = false;
+      }
+    };
+  });
+
   // 実績追加ボタン
   document.querySelectorAll('[data-add-record]').forEach(btn => {
     btn.onclick = (e) => {
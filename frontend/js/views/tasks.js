@@ -72,19 +72,110 @@ function mergePlanAndActual(plans, actuals) {
   );
 }
 
+// 一覧の取得条件（計画・実績はそのページの分だけ BFF が付与する）
+const TASK_LIST_PARAMS = { per_page: 50, include_daily_plans: true, include_actuals: true };
+
+// 読み込み済みのタスクと続きのカーソル（TasksView で初期化し、「さらに表示」で追記する）
+let loadedTasks = [];
+let nextTasksCursor = null;
+
+function getStatusBadge(status) {
+  const def = STATUS_DEFINITIONS[status];
+  if (!def) {
+    return '<span class="badge badge-secondary">不明</span>';
+  }
+  return `<span class="badge ${def.badgeClass}">${def.label}</span>`;
+}
+
+function renderTaskCard(t) {
+  const summary = t.summary_today || {};
+  const timePlanToday = summary.time_plan_cumulative ?? 0;
+  const timeActualToday = summary.time_actual_cumulative ?? 0;
+  const workPlanToday = summary.work_plan_cumulative ?? 0;
+  const workActualToday = summary.work_actual_cumulative ?? 0;
+  const isDelayed = isTaskDelayed(t, summary);
+  return `
+  <div class="task-card${isDelayed ? ' delayed' : ''}" data-task-id="${t.task_id}">
+    <div class="task-card-header">
+      <div class="task-header-main">
+        <h3 class="task-name">${t.task_name}</h3>
+        ${isDelayed ? '<span class="badge badge-danger badge-delay">遅延</span>' : ''}
+      </div>
+      <div class="task-actions">
+        <button class="btn secondary" data-edit-task="${t.task_id}">編集</button>
+        <button class="btn danger" data-del-task="${t.task_id}">削除</button>
+      </div>
+    </div>
+    
+    <div class="task-info">
+      <div class="task-info-item">
+        <span class="label">期間:</span>
+        <span>${t.start_at ? new Date(t.start_at).toLocaleDateString() : ''} - ${t.end_at ? new Date(t.end_at).toLocaleDateString() : ''}</span>
+      </div>
+      <div class="task-info-item">
+        <span class="label">カテゴリ:</span>
+        <span>${t.category || ''}</span>
+      </div>
+      <div class="task-info-item">
+        <span class="label">ステータス:</span>
+        ${getStatusBadge(t.status)}
+      </div>
+      <div class="task-info-item">
+        <span class="label">目標時間:</span>
+        <span>${t.target_time ?? ''}時間</span>
+      </div>
+      <div class="task-info-item">
+        <span class="label">予定時間(今日まで):</span>
+        <span>${timePlanToday}時間</span>
+      </div>
+      <div class="task-info-item">
+        <span class="label">実績時間(今日まで):</span>
+        <span>${timeActualToday}時間</span>
+      </div>
+      <div class="task-info-item">
+        <span class="label">予定進捗(今日まで):</span>
+        <span>${workPlanToday}%</span>
+      </div>
+      <div class="task-info-item">
+        <span class="label">実績進捗(今日まで):</span>
+        <span>${workActualToday}%</span>
+      </div>
+    </div>
+    
+    <div class="task-charts">
+      <div class="task-charts-header">
+        <button
+          type="button"
+          class="task-chart-toggle"
+          data-task-toggle="${t.task_id}"
+          aria-expanded="false"
+        >
+          グラフを表示
+        </button>
+      </div>
+      <div class="task-charts-body collapsed" data-task-charts="${t.task_id}">
+        <div class="chart-section">
+          <h4>作業進捗予定 (Work %)</h4>
+          <div class="chart-container" id="chart-work-${t.task_id}" style="height: 150px;"></div>
+        </div>
+        <div class="chart-section">
+          <h4>時間予定 (Time)</h4>
+          <div class="chart-container" id="chart-time-${t.task_id}" style="height: 150px;"></div>
+        </div>
+      </div>
+    </div>
+  </div>
+  `;
+}
+
 export async function TasksView() {
   let data = { items: [] };
-  try { data = await api.listTasks({ page: 1, per_page: 50, include_daily_plans: true, include_actuals: true }); } catch {}
+  try { data = await api.listTasks(TASK_LIST_PARAMS); } catch {}
   const items = Array.isArray(data) ? data : (data.items || []);
-
-  // ステータス表示用の関数
-  const getStatusBadge = (status) => {
-    const def = STATUS_DEFINITIONS[status];
-    if (!def) {
-      return '<span class="badge badge-secondary">不明</span>';
-    }
-    return `<span class="badge ${def.badgeClass}">${def.label}</span>`;
-  };
+  // 表示中のページ（計画・実績つき）をイベント側でも使い回す
+  loadedTasks = items;
+  nextTasksCursor = data.next_cursor || null;
+  const total = data.total ?? items.length;
 
   const categoryOptions = Array.from(new Set(items.map(t => t.category).filter(Boolean))).sort((a, b) => a.localeCompare(b, 'ja'));
   const statusOptions = [
@@ -124,86 +215,11 @@ export async function TasksView() {
     <div class="helper hidden" id="tasks-filter-empty">該当するタスクがありません</div>
     
     <div class="tasks-list">
-      ${items.map(t => {
-        const summary = t.summary_today || {};
-        const timePlanToday = summary.time_plan_cumulative ?? 0;
-        const timeActualToday = summary.time_actual_cumulative ?? 0;
-        const workPlanToday = summary.work_plan_cumulative ?? 0;
-        const workActualToday = summary.work_actual_cumulative ?? 0;
-        const isDelayed = isTaskDelayed(t, summary);
-        return `
-        <div class="task-card${isDelayed ? ' delayed' : ''}" data-task-id="${t.task_id}">
-          <div class="task-card-header">
-            <div class="task-header-main">
-              <h3 class="task-name">${t.task_name}</h3>
-              ${isDelayed ? '<span class="badge badge-danger badge-delay">遅延</span>' : ''}
-            </div>
-            <div class="task-actions">
-              <button class="btn secondary" data-edit-task="${t.task_id}">編集</button>
-              <button class="btn danger" data-del-task="${t.task_id}">削除</button>
-            </div>
-          </div>
-          
-          <div class="task-info">
-            <div class="task-info-item">
-              <span class="label">期間:</span>
-              <span>${t.start_at ? new Date(t.start_at).toLocaleDateString() : ''} - ${t.end_at ? new Date(t.end_at).toLocaleDateString() : ''}</span>
-            </div>
-            <div class="task-info-item">
-              <span class="label">カテゴリ:</span>
-              <span>${t.category || ''}</span>
-            </div>
-            <div class="task-info-item">
-              <span class="label">ステータス:</span>
-              ${getStatusBadge(t.status)}
-            </div>
-            <div class="task-info-item">
-              <span class="label">目標時間:</span>
-              <span>${t.target_time ?? ''}時間</span>
-            </div>
-            <div class="task-info-item">
-              <span class="label">予定時間(今日まで):</span>
-              <span>${timePlanToday}時間</span>
-            </div>
-            <div class="task-info-item">
-              <span class="label">実績時間(今日まで):</span>
-              <span>${timeActualToday}時間</span>
-            </div>
-            <div class="task-info-item">
-              <span class="label">予定進捗(今日まで):</span>
-              <span>${workPlanToday}%</span>
-            </div>
-            <div class="task-info-item">
-              <span class="label">実績進捗(今日まで):</span>
-              <span>${workActualToday}%</span>
-            </div>
-          </div>
-          
-          <div class="task-charts">
-            <div class="task-charts-header">
-              <button
-                type="button"
-                class="task-chart-toggle"
-                data-task-toggle="${t.task_id}"
-                aria-expanded="false"
-              >
-                グラフを表示
-              </button>
-            </div>
-            <div class="task-charts-body collapsed" data-task-charts="${t.task_id}">
-              <div class="chart-section">
-                <h4>作業進捗予定 (Work %)</h4>
-                <div class="chart-container" id="chart-work-${t.task_id}" style="height: 150px;"></div>
-              </div>
-              <div class="chart-section">
-                <h4>時間予定 (Time)</h4>
-                <div class="chart-container" id="chart-time-${t.task_id}" style="height: 150px;"></div>
-              </div>
-            </div>
-          </div>
-        </div>
-      `;
-      }).join('')}
+      ${items.map(renderTaskCard).join('')}
+    </div>
+    <div class="tasks-more">
+      <span class="helper" id="tasks-count">${items.length} / ${total} 件</span>
+      <button type="button" class="btn secondary${nextTasksCursor ? '' : ' hidden'}" id="btn-more-tasks">さらに表示</button>
     </div>
   </div>`;
 }
@@ -251,49 +267,52 @@ export async function setupTasksEvents() {
     });
   }
 
-  // 編集ボタン
-  document.querySelectorAll('[data-edit-task]').forEach(btn => {
-    btn.onclick = (e) => {
-      e.preventDefault();
-      e.stopPropagation();
-      const editId = e.target.getAttribute('data-edit-task');
-      if (editId) {
-        navigateTo(`/tasks/${editId}`);
-      }
-    };
-  });
-
-  // 削除ボタン
-  document.querySelectorAll('[data-del-task]').forEach(btn => {
-    btn.onclick = async (e) => {
-      e.preventDefault();
-      e.stopPropagation();
-      const delId = e.target.getAttribute('data-del-task');
-      if (delId) {
-        if (!confirm('削除しますか？')) return;
-        try { 
-          await api.deleteTask(delId); 
-          location.reload(); 
-        } catch (err) { 
-          alert(err.message); 
-        }
-      }
-    };
-  });
-
   const chartState = new Map();
-  let tasksResponse = null;
 
+  // 計画・実績は一覧の取得時に付与済みなので、読み込み済みのページをそのまま使う
   async function ensureTaskData() {
-    if (tasksResponse) return tasksResponse;
-    try {
-      const data = await api.listTasks({ page: 1, per_page: 50, include_daily_plans: true, include_actuals: true });
-      tasksResponse = Array.isArray(data) ? data : (data.items || []);
-    } catch (err) {
-      console.error('Failed to load tasks for charts:', err);
-      tasksResponse = [];
-    }
-    return tasksResponse;
+    return loadedTasks;
+  }
+
+  // カードごとの編集・削除・グラフ開閉（「さらに表示」で追加したカードにも同じものを付ける）
+  function bindCardEvents(cards) {
+    cards.forEach(card => {
+      card.querySelectorAll('[data-edit-task]').forEach(btn => {
+        btn.onclick = (e) => {
+          e.preventDefault();
+          e.stopPropagation();
+          const editId = e.target.getAttribute('data-edit-task');
+          if (editId) {
+            navigateTo(`/tasks/${editId}`);
+          }
+        };
+      });
+
+      card.querySelectorAll('[data-del-task]').forEach(btn => {
+        btn.onclick = async (e) => {
+          e.preventDefault();
+          e.stopPropagation();
+          const delId = e.target.getAttribute('data-del-task');
+          if (delId) {
+            if (!confirm('削除しますか？')) return;
+            try { 
+              await api.deleteTask(delId); 
+              location.reload(); 
+            } catch (err) { 
+              alert(err.message); 
+            }
+          }
+        };
+      });
+
+      card.querySelectorAll('.task-chart-toggle').forEach(btn => {
+        btn.addEventListener('click', () => handleToggle(btn));
+        const taskId = btn.getAttribute('data-task-toggle');
+        if (taskId && !chartState.has(taskId)) {
+          chartState.set(taskId, { initialized: false, expanded: false });
+        }
+      });
+    });
   }
 
   function buildCharts(task) {
@@ -479,13 +498,47 @@ export async function setupTasksEvents() {
     }
   }
 
-  document.querySelectorAll('.task-chart-toggle').forEach(btn => {
-    btn.addEventListener('click', () => handleToggle(btn));
-    const taskId = btn.getAttribute('data-task-toggle');
-    if (taskId && !chartState.has(taskId)) {
-      chartState.set(taskId, { initialized: false, expanded: false });
-    }
-  });
+  bindCardEvents(document.querySelectorAll('.task-card'));
+
+  // さらに表示: 次のページを取得してカードを追記する
+  const moreBtn = document.getElementById('btn-more-tasks');
+  const countLabel = document.getElementById('tasks-count');
+  const list = document.querySelector('.tasks-list');
+  if (moreBtn && list) {
+    moreBtn.onclick = async (e) => {
+      e.preventDefault();
+      if (!nextTasksCursor) return;
+      moreBtn.disabled = true;
+      try {
+        const data = await api.listTasks({ ...TASK_LIST_PARAMS, cursor: nextTasksCursor });
+        const items = data.items || [];
+        loadedTasks = loadedTasks.concat(items);
+        nextTasksCursor = data.next_cursor || null;
+
+        const template = document.createElement('template');
+        template.innerHTML = items.map(renderTaskCard).join('');
+        const cards = Array.from(template.content.querySelectorAll('.task-card'));
+        list.append(...template.content.childNodes);
+        bindCardEvents(cards);
+
+        // 新しいページで初めて出てきたカテゴリを絞り込みの選択肢に足す
+        if (categorySelect) {
+          const known = new Set(Array.from(categorySelect.options).map(o => o.value));
+          items.map(t => t.category).filter(c => c && !known.has(c)).forEach(c => {
+            known.add(c);
+            categorySelect.add(new Option(c, c));
+          });
+        }
+        if (countLabel) countLabel.textContent = `${loadedTasks.length} / ${data.total ?? loadedTasks.length} 件`;
+        moreBtn.classList.toggle('hidden', !nextTasksCursor);
+        await applyFilters();
+      } catch (err) {
+        console.error('Failed to load more tasks:', err);
+      } finally {
+        moreBtn.disabled = false;
+      }
+    };
+  }
 
   await applyFilters();
 
@@ -0,0 +1,88 @@
+"""一覧応答のシリアライズのベンチマーク
+
+従来の経路（行ごとに Pydantic モデルを組み立て → FastAPI が response_model で検証・変換 → JSONResponse）と
+高速経路（app.fast_json: 行タプル → dict → orjson）で、同じ行から同じ JSON になることを確かめたうえで
+1秒あたりの行数を比べる。DB は使わず、一覧クエリ（GET /v1/records）と同じ形の行を生成して計測する:
+
+    python -m app.bench_serialization            # 既定 10000 行
+    python -m app.bench_serialization --rows 50000 --repeat 5
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+
+import orjson
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.fast_json import json_response, rows_as_dicts
+from app.schemas.records import RecordOut, RecordPageOut
+
+RECORD_COLUMNS = [
+    "record_work_id", "task_id", "created_by", "start_at", "end_at",
+    "progress_value", "work_time", "note", "last_updated_user", "created_at", "updated_at",
+]
+
+
+def _record_rows(n: int) -> List[tuple]:
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        (
+            i, i % 20 + 1, 1, base + timedelta(hours=i), base + timedelta(hours=i, minutes=45),
+            i % 100, 45, None if i % 2 else "note", None, base, base + timedelta(seconds=i),
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def _page(items) -> dict:
+    return {"items": items, "next_cursor": "next.cursor", "prev_cursor": None, "total": len(items), "total_exact": True}
+
+
+_FIELD = create_response_field(name="bench", type_=RecordPageOut, mode="serialization")
+
+
+def _legacy(rows: List[tuple]) -> bytes:
+    # 変更前のハンドラと同じく行ごとにモデルを作り、FastAPI の応答処理に渡す
+    page = RecordPageOut(**_page([RecordOut(**dict(zip(RECORD_COLUMNS, row))) for row in rows]))
+    content = asyncio.run(serialize_response(field=_FIELD, response_content=page))
+    return JSONResponse(content).body
+
+
+def _fast(rows: List[tuple]) -> bytes:
+    return json_response(_page(rows_as_dicts(RECORD_COLUMNS, rows))).body
+
+
+def _rows_per_second(fn: Callable[[List[tuple]], bytes], rows: List[tuple], repeat: int) -> float:
+    best = min(_elapsed(fn, rows) for _ in range(repeat))
+    return len(rows) / best
+
+
+def _elapsed(fn, rows) -> float:
+    started = time.perf_counter()
+    fn(rows)
+    return time.perf_counter() - started
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.bench_serialization")
+    parser.add_argument("--rows", type=int, default=10000, help="1回の応答に含める行数")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最速の回を採用）")
+    args = parser.parse_args(argv)
+
+    rows = _record_rows(args.rows)
+    if orjson.loads(_legacy(rows)) != orjson.loads(_fast(rows)):
+        print("list_records: output mismatch")
+        return 1
+    before = _rows_per_second(_legacy, rows, args.repeat)
+    after = _rows_per_second(_fast, rows, args.repeat)
+    print(f"list_records: pydantic {before:,.0f} rows/s -> orjson {after:,.0f} rows/s ({after / before:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""実績の一括登録（COPY）
+
+JSON 配列 / NDJSON / CSV を受け取り、RECORDS_BULK_BATCH_SIZE 件ずつ RecordIn で検証して
+1つのトランザクション内の COPY に流し込む。record_works のカウンタ更新トリガはステートメント単位なので、
+件数によらず1回で済む。
+NDJSON / CSV は本文を受信しながら行に分けて処理するので、本文全体をメモリに載せない
+（本文は RECORDS_BULK_MAX_BYTES まで）。JSON 配列は途中から読めないため、RECORDS_BULK_JSON_MAX_BYTES までに限る。
+受信中はトランザクションと DB 接続を1本占有する。
+"""
+import codecs
+import csv
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import anyio.from_thread
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+
+from app.db import get_conn
+from app.schemas.records import RecordBulkError, RecordBulkOut, RecordIn
+
+RECORDS_BULK_MAX_ROWS = int(os.getenv("RECORDS_BULK_MAX_ROWS", "100000"))  # 1リクエストの上限行数
+RECORDS_BULK_BATCH_SIZE = int(os.getenv("RECORDS_BULK_BATCH_SIZE", "5000"))  # 検証・COPY の単位
+RECORDS_BULK_MAX_BYTES = int(os.getenv("RECORDS_BULK_MAX_BYTES", str(64 * 1024 * 1024)))  # NDJSON / CSV の本文上限
+RECORDS_BULK_JSON_MAX_BYTES = int(os.getenv("RECORDS_BULK_JSON_MAX_BYTES", str(4 * 1024 * 1024)))  # JSON 配列の本文上限
+RECORDS_BULK_MAX_ERRORS = 100  # 応答に含めるエラー行数の上限（件数は failed に全て数える）
+
+BULK_FORMATS = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "text/csv": "csv",
+}
+
+_COPY_SQL = (
+    "COPY record_works (task_id, created_by, start_at, end_at, progress_value, work_time, note) FROM STDIN"
+)
+
+# (行番号, 行データ or None, パースエラー)
+ParsedRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def bulk_format(content_type: Optional[str]) -> str:
+    media_type = (content_type or "application/json").split(";")[0].strip().lower()
+    fmt = BULK_FORMATS.get(media_type)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail={"message": f"unsupported content type: {media_type}"})
+    return fmt
+
+
+def bulk_max_bytes(fmt: str) -> int:
+    return RECORDS_BULK_JSON_MAX_BYTES if fmt == "json" else RECORDS_BULK_MAX_BYTES
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail={"message": f"body too large (max {max_bytes} bytes)"})
+
+
+def check_content_length(content_length: Optional[str], fmt: str) -> None:
+    """Content-Length が分かる場合は本文を読む前に上限を判定する（chunked の場合は受信中に数える）"""
+    max_bytes = bulk_max_bytes(fmt)
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise _too_large(max_bytes)
+
+
+def iter_request_body(request: Request) -> Iterator[bytes]:
+    """本文をチャンクごとに返す同期イテレータ（スレッドプール側から、1チャンクずつイベントループで受信する）"""
+    stream = request.stream()
+
+    async def receive() -> Optional[bytes]:
+        try:
+            return await stream.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    while True:
+        chunk = anyio.from_thread.run(receive)
+        if chunk is None:
+            return
+        if chunk:
+            yield chunk
+
+
+def _limited(chunks: Iterable[bytes], max_bytes: int) -> Iterator[bytes]:
+    received = 0
+    for chunk in chunks:
+        received += len(chunk)
+        if received > max_bytes:
+            raise _too_large(max_bytes)
+        yield chunk
+
+
+def _lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """受信したチャンクを UTF-8（BOM 可）として順に復号し、改行つきの1行ずつ返す"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    rest = ""
+    try:
+        for chunk in chunks:
+            rest += decoder.decode(chunk)
+            *lines, rest = rest.split("\n")
+            for line in lines:
+                yield line + "\n"
+        rest += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail={"message": "body must be UTF-8"})
+    if rest:
+        yield rest
+
+
+def _parse_json(chunks: Iterable[bytes]) -> Iterator[ParsedRow]:
+    body = b"".join(chunks)
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail={"message": "body must be UTF-8"})
+    try:
+        items = json.loads(text)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"message": f"invalid JSON: {e}"})
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail={"message": "body must be a JSON array"})
+    for i, item in enumerate(items, start=1):
+        yield (i, item, None) if isinstance(item, dict) else (i, None, "row must be an object")
+
+
+def _parse_ndjson(chunks: Iterable[bytes]) -> Iterator[ParsedRow]:
+    row = 0
+    for line in _lines(chunks):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            yield row, None, f"invalid JSON: {e}"
+            continue
+        yield (row, item, None) if isinstance(item, dict) else (row, None, "row must be an object")
+
+
+def _parse_csv(chunks: Iterable[bytes]) -> Iterator[ParsedRow]:
+    # 1行目はヘッダー（列順は自由）。空欄は未指定として扱う（note は NULL、必須列はエラー）
+    # 引用符内の改行は csv モジュールが次の行を読んでつなげる
+    for i, item in enumerate(csv.DictReader(_lines(chunks)), start=1):
+        yield i, {k: v for k, v in item.items() if k and v not in (None, "")}, None
+
+
+_PARSERS = {"json": _parse_json, "ndjson": _parse_ndjson, "csv": _parse_csv}
+
+
+def load_records_bulk(chunks: Iterable[bytes], fmt: str, current_user_id: int, skip_invalid: bool) -> RecordBulkOut:
+    """本文のチャンク列を検証して COPY で登録する
+
+    skip_invalid=False（既定）の場合は1行でもエラーがあれば何も登録せず 422 を返す。
+    True の場合はエラー行だけを飛ばして残りを登録する。
+    """
+    started = time.perf_counter()
+    received = inserted = failed = 0
+    errors: List[RecordBulkError] = []
+
+    def fail(row: int, message: str) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < RECORDS_BULK_MAX_ERRORS:
+            errors.append(RecordBulkError(row=row, message=message))
+
+    with get_conn() as conn:
+        with conn.transaction():
+            with conn.cursor() as cur:
+                with cur.copy(_COPY_SQL) as copy:
+                    batch: List[ParsedRow] = []
+                    for parsed in _PARSERS[fmt](_limited(chunks, bulk_max_bytes(fmt))):
+                        received += 1
+                        if received > RECORDS_BULK_MAX_ROWS:
+                            raise HTTPException(
+                                status_code=413,
+                                detail={"message": f"too many rows (max {RECORDS_BULK_MAX_ROWS})"},
+                            )
+                        batch.append(parsed)
+                        if len(batch) >= RECORDS_BULK_BATCH_SIZE:
+                            inserted += _copy_batch(copy, batch, current_user_id, fail)
+                            batch = []
+                    inserted += _copy_batch(copy, batch, current_user_id, fail)
+
+                if failed and not skip_invalid:
+                    # トランザクションを巻き戻して何も登録しない
+                    raise HTTPException(
+                        status_code=422,
+                        detail={
+                            "message": f"{failed} invalid row(s); nothing was inserted",
+                            "failed": failed,
+                            "errors": [e.model_dump() for e in errors],
+                        },
+                    )
+
+    elapsed = time.perf_counter() - started
+    return RecordBulkOut(
+        received=received,
+        inserted=inserted,
+        failed=failed,
+        errors=errors,
+        elapsed_ms=round(elapsed * 1000, 1),
+        rows_per_second=round(inserted / elapsed) if elapsed > 0 else inserted,
+    )
+
+
+def _copy_batch(copy, batch: List[ParsedRow], current_user_id: int, fail) -> int:
+    written = 0
+    for row, item, parse_error in batch:
+        if parse_error is not None:
+            fail(row, parse_error)
+            continue
+        try:
+            record = RecordIn.model_validate(item)
+        except ValidationError as e:
+            fail(row, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            continue
+        copy.write_row(
+            (
+                record.task_id,
+                current_user_id,
+                record.start_at,
+                record.end_at,
+                record.progress_value,
+                record.work_time,
+                record.note,
+            )
+        )
+        written += 1
+    return written
@@ -0,0 +1,119 @@
+"""実績のストリーミングエクスポート
+
+サーバー側の名前付きカーソルから RECORDS_EXPORT_BATCH_SIZE 件ずつ読み、NDJSON / CSV に変換して
+バッチごとに返す。結果全体をメモリに載せないので、件数によらずメモリ使用量は一定。
+NDJSON の各行とタイムスタンプの文字列化は DB 側で行う（Python で tz 付き datetime を組み立てて
+整形するより数倍速い）。タイムスタンプは JSON API と同じ形式（UTC の "Z" 付き、端数がなければ秒まで）にする。
+接続はエクスポートが終わるまで借りたままになるため、同時に実行できる数を制限する。
+実行枠と接続はジェネレータを閉じたときに返るので、応答側で必ず close() する（close_export）。
+"""
+import csv
+import io
+import os
+import threading
+from typing import Iterator, List, Optional, Sequence
+
+from fastapi import HTTPException
+
+from app.db import get_conn
+
+RECORDS_EXPORT_BATCH_SIZE = int(os.getenv("RECORDS_EXPORT_BATCH_SIZE", "1000"))  # 1回の FETCH 件数
+RECORDS_EXPORT_MAX_CONCURRENCY = int(os.getenv("RECORDS_EXPORT_MAX_CONCURRENCY", "2"))  # 同時エクスポート数の上限
+
+EXPORT_FIELDS = [
+    "record_work_id",
+    "task_id",
+    "created_by",
+    "start_at",
+    "end_at",
+    "progress_value",
+    "work_time",
+    "note",
+    "last_updated_user",
+    "created_at",
+    "updated_at",
+]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+_TIMESTAMP_FIELDS = {"start_at", "end_at", "created_at", "updated_at"}
+
+_export_slots = threading.BoundedSemaphore(RECORDS_EXPORT_MAX_CONCURRENCY)
+
+
+def _iso_utc(name: str) -> str:
+    """API 応答（Pydantic / orjson の OPT_UTC_Z）と同じ ISO 8601 文字列にする SQL 式（NULL は NULL のまま）"""
+    utc = f"({name} AT TIME ZONE 'UTC')"
+    return (
+        f"to_char({utc}, 'YYYY-MM-DD\"T\"HH24:MI:SS')"
+        f" || CASE WHEN date_part('microseconds', {name})::bigint %% 1000000 = 0 THEN '' ELSE to_char({utc}, '.US') END"
+        " || 'Z'"
+    )
+
+
+def _column(name: str) -> str:
+    return _iso_utc(name) if name in _TIMESTAMP_FIELDS else name
+
+
+def _select_sql(fmt: str) -> str:
+    if fmt == "csv":
+        return "SELECT " + ", ".join(_column(name) for name in EXPORT_FIELDS)
+    # NDJSON は1行分の JSON オブジェクトを DB で組み立てる
+    return "SELECT json_build_object(" + ", ".join(f"'{name}', {_column(name)}" for name in EXPORT_FIELDS) + ")::text"
+
+
+def _encode_ndjson(rows: Sequence[tuple]) -> bytes:
+    return ("\n".join(row[0] for row in rows) + "\n").encode()
+
+
+def _encode_csv(rows: Sequence[tuple]) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue().encode()
+
+
+def _csv_header() -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerow(EXPORT_FIELDS)
+    return buf.getvalue().encode()
+
+
+def stream_records_export(scope: str, params: List, fmt: str) -> Iterator[bytes]:
+    """scope（FROM/WHERE 句）の実績を (start_at, record_work_id) 昇順で NDJSON / CSV のバイト列として返す
+
+    最初の要素（CSV ヘッダー、NDJSON は空）はカーソルを開いた時点で返す。呼び出し側で先に1つ進めておくと、
+    同時実行数の超過や接続待ちのタイムアウトをストリーム開始前にエラー応答にできる。
+    実行枠は最後まで読み切るか close() されるまで保持する。
+    """
+    if not _export_slots.acquire(blocking=False):
+        raise HTTPException(status_code=429, detail={"message": "too many exports in progress"})
+    try:
+        encode = _encode_csv if fmt == "csv" else _encode_ndjson
+        with get_conn() as conn:
+            # 名前付き（サーバー側）カーソルはトランザクション内でだけ使える（プールの接続は autocommit）
+            with conn.transaction():
+                with conn.cursor(name="records_export") as cur:
+                    cur.execute(
+                        f"{_select_sql(fmt)}{scope} ORDER BY start_at, record_work_id",
+                        params,
+                    )
+                    yield _csv_header() if fmt == "csv" else b""
+                    while True:
+                        rows = cur.fetchmany(RECORDS_EXPORT_BATCH_SIZE)
+                        if not rows:
+                            break
+                        yield encode(rows)
+    finally:
+        _export_slots.release()
+
+
+def close_export(chunks: Iterator[bytes]) -> None:
+    """応答の終了後（途中切断を含む）に呼び、カーソル・接続・実行枠をすぐに返す（読み切った後なら何もしない）"""
+    chunks.close()
+
+
+def export_filename(fmt: str, task_id: Optional[int]) -> str:
+    return f"records{f'_task{task_id}' if task_id is not None else ''}.{fmt}"
@@ -0,0 +1,35 @@
+# サービス間で同一内容のコピー（各サービスのイメージは自分のディレクトリだけをビルドするため）。
+# 変更は全コピーに同じように入れる（tests/test_shared_modules.py で一致を検査）
+"""一覧 API の高速シリアライズ
+
+一覧系はこれまで行ごとに Pydantic モデルを組み立て、FastAPI がそれを response_model で検証し直してから
+標準の json でエンコードしていた。自前の SELECT の結果は列名・型がスキーマと一致しているので検証済みとみなし、
+行タプルを列名つきの dict にして orjson で直接エンコードした Response を返す（response_model は OpenAPI 用に残す）。
+出力は従来と同じ JSON になる（`python -m app.bench_serialization` で一致を確認しつつ速度を比較できる）。
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import orjson
+from fastapi import Response
+
+# UTC の datetime は Pydantic と同じく "Z" を付け、dict の int キー（task_id ごとのまとめ）も許可する
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def column_names(cur) -> List[str]:
+    """直前に実行した SELECT の列名（テーブル別名は付かない）"""
+    return [column.name for column in cur.description]
+
+
+def rows_as_dicts(columns: Sequence[str], rows: Sequence[Sequence]) -> List[Dict[str, Any]]:
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def json_response(content: Any, headers: Optional[Dict[str, str]] = None, status_code: int = 200) -> Response:
+    """content をそのまま orjson でエンコードした応答（FastAPI の response_model による再検証・変換を通らない）"""
+    return Response(
+        content=orjson.dumps(content, option=_ORJSON_OPTIONS),
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers,
+    )
@@ -1,118 +1,229 @@
+import base64
+import itertools
 import os
-from datetime import datetime, timezone
-from typing import List, Optional
-
-from fastapi import FastAPI, HTTPException, Depends, Query
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError
-import psycopg
-
-from app.schemas.records import RecordIn, RecordOut, RecordUpdate
-
-# JWT 設定（user-service と同一シークレット/アルゴリズム）
-JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret")
-JWT_ALG = "HS256"
-
-# DB 設定（record-db）
-DB_HOST = os.getenv("DB_HOST", "climbly-record-db")
-DB_PORT = int(os.getenv("DB_PORT", "5432"))
-DB_NAME = os.getenv("DB_NAME", "record_db")
-DB_USER = os.getenv("DB_USER", "climbly")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "climbly")
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from psycopg_pool import PoolTimeout
+
+from app.auth import get_current_user_id, token_cache
+from app.bulk import bulk_format, check_content_length, iter_request_body, load_records_bulk
+from app.db import get_conn, get_pool_stats, pool
+from app.etag import etag_matches, make_etag, not_modified, rows_etag, wants_validation
+from app.export import EXPORT_MEDIA_TYPES, close_export, export_filename, stream_records_export
+from app.fast_json import column_names, json_response, rows_as_dicts
+from app.migrate import RUN_MIGRATIONS, apply_migrations
+from app.schemas.records import (
+    ActualsTimelineIn,
+    DailyActualOut,
+    RecordBulkOut,
+    RecordIn,
+    RecordOut,
+    RecordPageOut,
+    RecordUpdate,
+)
+
+# カンバン表示でタスクごとに返す実績件数（既定値）
+RECORDS_BOARD_PER_TASK = int(os.getenv("RECORDS_BOARD_PER_TASK", "20"))
+# 実績一覧の総件数をこの件数までは正確に数える（超える場合は推定値）
+RECORDS_EXACT_TOTAL_LIMIT = int(os.getenv("RECORDS_EXACT_TOTAL_LIMIT", "1000"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 未適用のマイグレーションを適用してから接続を開く
+    if RUN_MIGRATIONS:
+        apply_migrations()
+    # DBコネクションプールはプロセス内で1つだけ開き、終了時に閉じる
+    pool.open()
+    try:
+        yield
+    finally:
+        pool.close()
 
-auth_scheme = HTTPBearer(auto_error=False)
 
-app = FastAPI(title="Climbly Record Service", version="1.0.0")
+app = FastAPI(title="Climbly Record Service", version="1.0.0", lifespan=lifespan)
 
 
-def get_conn():
-    return psycopg.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        autocommit=True,
-    )
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    # プールが枯渇して接続を取得できない場合は 503 を返す
+    return JSONResponse(status_code=503, content={"detail": {"message": "database busy"}})
 
 
-def decode_token(token: str) -> int:
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
-        sub = payload.get("sub")
-        if sub is None:
-            raise HTTPException(status_code=401, detail={"message": "invalid token"})
-        return int(sub)
-    except JWTError:
-        raise HTTPException(status_code=401, detail={"message": "invalid token"})
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
 
 
-async def get_current_user_id(
-    creds: Optional[HTTPAuthorizationCredentials] = Depends(auth_scheme),
-) -> int:
-    if creds is None or creds.scheme.lower() != "bearer":
-        raise HTTPException(status_code=401, detail={"message": "missing bearer token"})
-    return decode_token(creds.credentials)
+@app.get("/metrics/db_pool")
+def db_pool_metrics():
+    return get_pool_stats()
 
 
-@app.get("/healthz")
-def healthz():
-    return {"status": "ok"}
+@app.get("/metrics/token_cache")
+def token_cache_metrics():
+    return token_cache.stats()
 
 
-@app.get("/v1/records", response_model=List[RecordOut])
+@app.get("/v1/records", response_model=RecordPageOut)
 def list_records(
+    request: Request,
     task_id: Optional[int] = Query(default=None),
     from_: Optional[str] = Query(default=None, alias="from"),
     to: Optional[str] = Query(default=None),
-    page: int = Query(default=1, ge=1),
     per_page: int = Query(default=50, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None),
+    with_total: bool = Query(default=False),
     current_user_id: int = Depends(get_current_user_id),
 ):
-    """実績一覧を取得"""
-    query = """
-        SELECT record_work_id, task_id, created_by, start_at, end_at, 
-               progress_value, work_time, note, last_updated_user, created_at, updated_at
-        FROM record_works
-        WHERE created_by = %s
+    """実績一覧を (start_at, record_work_id) の降順でキーセットページングして取得
+    次/前のページは next_cursor / prev_cursor を cursor に渡す（何ページ目でも同じコスト）
     """
-    params = [current_user_id]
+    scope, params = _records_scope(current_user_id, task_id, from_, to)
+
+    # 前ページは昇順で読んで反転する。1件多く取って続きの有無を判定
+    direction = "next"
+    page_query = scope
+    page_params = list(params)
+    if cursor is not None:
+        direction, cursor_start_at, cursor_id = _decode_page_cursor(cursor)
+        page_query += " AND (start_at, record_work_id) " + ("<" if direction == "next" else ">") + " (%s, %s)"
+        page_params.extend([cursor_start_at, cursor_id])
+    order = "DESC" if direction == "next" else "ASC"
+    page_query += f" ORDER BY start_at {order}, record_work_id {order} LIMIT %s"
+    page_params.append(per_page + 1)
+    columns = (
+        "SELECT record_work_id, task_id, created_by, start_at, end_at, "
+        "progress_value, work_time, note, last_updated_user, created_at, updated_at"
+    )
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            total, total_exact = _records_total(cur, scope, params) if with_total else (None, None)
+            if wants_validation(request):
+                # 条件付き GET は同じページ（＋先読み1件）の集計だけで 304 を返す
+                cur.execute(
+                    f"SELECT COUNT(*), MAX(updated_at), SUM(record_work_id) FROM ({columns}{page_query}) page",
+                    page_params,
+                )
+                etag = make_etag(*cur.fetchone(), total)
+                if etag_matches(request, etag):
+                    return not_modified(etag)
+            cur.execute(columns + page_query, page_params)
+            rows = cur.fetchall()
+            names = column_names(cur)
+    etag = rows_etag(rows, 0, 10, total)
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == "prev":
+        rows.reverse()
+    next_cursor = prev_cursor = None
+    if rows:
+        # 前ページから戻ってきた場合は必ず次がある／カーソル付きで進んだ場合は必ず前がある
+        if (direction == "next" and has_more) or direction == "prev":
+            next_cursor = _encode_page_cursor("next", rows[-1][3], rows[-1][0])
+        if (direction == "prev" and has_more) or (direction == "next" and cursor is not None):
+            prev_cursor = _encode_page_cursor("prev", rows[0][3], rows[0][0])
+
+    return json_response(
+        {
+            "items": rows_as_dicts(names, rows),
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+            "total": total,
+            "total_exact": total_exact,
+        },
+        headers={"ETag": etag},
+    )
+
+
+def _board_etag(rows) -> str:
+    """list_records_by_task の行から、検証用の集計クエリと同じ ETag を作る"""
+    records = [r for r in rows if r[1] is not None]
+    task_ids = {r[0] for r in rows}
+    return make_etag(
+        len(records),
+        max((r[8] for r in records), default=None),
+        sum(r[1] for r in records),
+        len(task_ids),
+        sum(task_ids) if task_ids else None,
+    )
+
+
+def _records_scope(current_user_id: int, task_id: Optional[int], from_: Optional[str], to: Optional[str]):
+    """実績一覧・エクスポートで共通の (FROM/WHERE 句, パラメータ)"""
+    scope = " FROM record_works WHERE created_by = %s"
+    params: List = [current_user_id]
 
     if task_id is not None:
-        query += " AND task_id = %s"
+        scope += " AND task_id = %s"
         params.append(task_id)
     
     if from_:
-        query += " AND start_at >= %s"
+        scope += " AND start_at >= %s"
         params.append(from_)
     
     if to:
-        query += " AND end_at <= %s"
+        scope += " AND end_at <= %s"
         params.append(to)
+    return scope, params
 
-    query += " ORDER BY start_at DESC LIMIT %s OFFSET %s"
-    params.extend([per_page, (page - 1) * per_page])
 
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            rows = cur.fetchall()
-            return [
-                RecordOut(
-                    record_work_id=r[0],
-                    task_id=r[1],
-                    created_by=r[2],
-                    start_at=r[3],
-                    end_at=r[4],
-                    progress_value=r[5],
-                    work_time=r[6],
-                    note=r[7],
-                    last_updated_user=r[8],
-                    created_at=r[9],
-                    updated_at=r[10],
-                )
-                for r in rows
-            ]
+def _records_total(cur, scope: str, params: List):
+    """総件数を (件数, 正確か) で返す
+
+    RECORDS_EXACT_TOTAL_LIMIT 件までは上限付きの COUNT で正確に数え、それを超える場合は
+    全件を数えずにプランナの推定行数を返す。
+    """
+    cur.execute(f"SELECT COUNT(*) FROM (SELECT 1{scope} LIMIT %s) s", params + [RECORDS_EXACT_TOTAL_LIMIT + 1])
+    count = cur.fetchone()[0]
+    if count <= RECORDS_EXACT_TOTAL_LIMIT:
+        return count, True
+    cur.execute("EXPLAIN (FORMAT JSON) SELECT 1" + scope, params)
+    estimated = int(cur.fetchone()[0][0]["Plan"]["Plan Rows"])
+    return max(estimated, count), False
+
+
+def _encode_page_cursor(direction: str, start_at: datetime, record_work_id: int) -> str:
+    return f"{direction}.{_encode_board_cursor(start_at, record_work_id)}"
+
+
+def _decode_page_cursor(cursor: str):
+    direction, _, key = cursor.partition(".")
+    if direction not in ("next", "prev"):
+        raise HTTPException(status_code=400, detail={"message": "invalid cursor"})
+    return (direction, *_decode_board_cursor(key))
+
+
+@app.get("/v1/records/export")
+def export_records(
+    format: str = Query(default="ndjson", regex="^(ndjson|csv)$"),
+    task_id: Optional[int] = Query(default=None),
+    from_: Optional[str] = Query(default=None, alias="from"),
+    to: Optional[str] = Query(default=None),
+    current_user_id: int = Depends(get_current_user_id),
+):
+    """自分の実績を (start_at, record_work_id) 昇順で NDJSON / CSV としてストリーミングで返す
+    サーバー側カーソルで一定件数ずつ読むので、件数によらずメモリ使用量は一定
+    """
+    scope, params = _records_scope(current_user_id, task_id, from_, to)
+    chunks = stream_records_export(scope, params, format)
+    # 同時実行数の超過・接続待ちのタイムアウトはヘッダー送信前にエラー応答にするため、先頭だけここで読む
+    first = next(chunks)
+    return StreamingResponse(
+        itertools.chain([first], chunks),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(format, task_id)}"'},
+        # クライアントが途中で切断した場合もジェネレータを閉じ、実行枠と接続をすぐに返す
+        background=BackgroundTask(close_export, chunks),
+    )
 
 
 @app.get("/v1/records/latest_progress")
@@ -141,6 +252,33 @@ def get_latest_progress(
             return {"task_id": task_id, "progress_value": 0, "start_at": None}
 
 
+@app.get("/v1/records/latest_progress/batch")
+def get_latest_progress_batch(
+    task_ids: List[int] = Query(..., max_length=1000),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """複数タスクの最新実績進捗を1クエリで取得。実績がないタスクは 0 を返す"""
+    task_ids = list(dict.fromkeys(task_ids))
+    query = """
+        SELECT DISTINCT ON (task_id) task_id, progress_value, start_at
+        FROM record_works
+        WHERE created_by = %s AND task_id = ANY(%s)
+        ORDER BY task_id, start_at DESC
+    """
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, [current_user_id, task_ids])
+            latest = {r[0]: r for r in cur.fetchall()}
+    return [
+        {
+            "task_id": task_id,
+            "progress_value": int(latest[task_id][1]) if task_id in latest and latest[task_id][1] else 0,
+            "start_at": latest[task_id][2].isoformat() if task_id in latest else None,
+        }
+        for task_id in task_ids
+    ]
+
+
 @app.get("/v1/records/daily_aggregate")
 def get_daily_aggregate(
     from_date: Optional[str] = Query(default=None, alias="from"),
@@ -184,58 +322,187 @@ def get_daily_aggregate(
             return result
 
 
+@app.post("/v1/records/actuals_timeline", response_model=Dict[int, List[DailyActualOut]])
+def get_actuals_timeline(
+    req: ActualsTimelineIn,
+    current_user_id: int = Depends(get_current_user_id),
+):
+    """タスクごとの日次実績タイムラインを取得（進捗は累積・上限100、作業時間は日ごとの合計）
+    expected_dates に指定した日付は実績がなくても行を返す（作業時間0、累積進捗は前日のまま）。
+    ただし実績が1件もないタスクは expected_dates があっても空リスト（グラフは実績なしとして描く）
+    """
+    task_ids = list(dict.fromkeys(req.task_ids))
+    expected_task_ids: List[int] = []
+    expected_dates: List = []
+    for tid, dates in (req.expected_dates or {}).items():
+        for d in dates:
+            expected_task_ids.append(tid)
+            expected_dates.append(d)
+
+    upto_filter = " AND DATE(start_at) <= %(upto)s" if req.upto else ""
+    expected_upto_filter = " AND e.target_date <= %(upto)s" if req.upto else ""
+    query = f"""
+        WITH daily AS (
+            SELECT task_id, DATE(start_at) AS target_date,
+                   SUM(progress_value) AS progress_sum, SUM(work_time) AS time_sum
+            FROM record_works
+            WHERE created_by = %(user_id)s AND task_id = ANY(%(task_ids)s){upto_filter}
+            GROUP BY task_id, DATE(start_at)
+        ),
+        expected AS (
+            SELECT DISTINCT e.task_id, e.target_date
+            FROM unnest(%(expected_task_ids)s::int[], %(expected_dates)s::date[]) AS e(task_id, target_date)
+            WHERE e.task_id = ANY(%(task_ids)s){expected_upto_filter}
+              AND EXISTS (
+                  SELECT 1 FROM record_works r
+                  WHERE r.created_by = %(user_id)s AND r.task_id = e.task_id
+              )
+        ),
+        timeline AS (
+            SELECT COALESCE(d.task_id, e.task_id) AS task_id,
+                   COALESCE(d.target_date, e.target_date) AS target_date,
+                   COALESCE(d.progress_sum, 0) AS progress_sum,
+                   COALESCE(d.time_sum, 0) AS time_sum
+            FROM daily d
+            FULL OUTER JOIN expected e ON e.task_id = d.task_id AND e.target_date = d.target_date
+        )
+        SELECT task_id, target_date,
+               LEAST(SUM(progress_sum) OVER (PARTITION BY task_id ORDER BY target_date), 100) AS work_actual_value,
+               time_sum
+        FROM timeline
+        ORDER BY task_id, target_date
+    """
+    params = {
+        "user_id": current_user_id,
+        "task_ids": task_ids,
+        "expected_task_ids": expected_task_ids,
+        "expected_dates": expected_dates,
+        "upto": req.upto,
+    }
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+
+    # 実績も期待日付もないタスクは空リストで返す
+    result: Dict[int, List[DailyActualOut]] = {tid: [] for tid in task_ids}
+    for r in rows:
+        result[r[0]].append(
+            DailyActualOut(target_date=r[1], work_actual_value=int(r[2]), time_actual_value=int(r[3]))
+        )
+    return result
+
+
 @app.get("/v1/records/by_task")
 def list_records_by_task(
+    request: Request,
+    response: Response,
     task_id: Optional[int] = Query(default=None),
     from_: Optional[str] = Query(default=None, alias="from"),
     to: Optional[str] = Query(default=None),
+    limit: int = Query(default=RECORDS_BOARD_PER_TASK, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None),
     current_user_id: int = Depends(get_current_user_id),
 ):
-    """タスク別に実績をグループ化して取得（カンバン表示用）"""
-    query = """
-        SELECT DISTINCT task_id FROM record_works WHERE created_by = %s
+    """タスク別に実績をグループ化して取得（カンバン表示用）
+    各タスクは start_at の新しい順に最大 limit 件。続きは next_cursor を cursor に渡して task_id 指定で取得する
     """
-    params = [current_user_id]
-    
+    if cursor is not None and task_id is None:
+        raise HTTPException(status_code=400, detail={"message": "cursor requires task_id"})
+
+    # タスク一覧は期間で絞らない（期間内に実績がないタスクも空の列として返す）
+    task_filter = ""
+    params: dict = {"user_id": current_user_id, "limit": limit + 1}
     if task_id is not None:
-        query += " AND task_id = %s"
-        params.append(task_id)
+        task_filter = " AND task_id = %(task_id)s"
+        params["task_id"] = task_id
+
+    record_filter = ""
+    if from_:
+        record_filter += " AND w.start_at >= %(from)s"
+        params["from"] = from_
+    if to:
+        record_filter += " AND w.end_at <= %(to)s"
+        params["to"] = to
+    if cursor is not None:
+        params["cursor_start_at"], params["cursor_id"] = _decode_board_cursor(cursor)
+        record_filter += " AND (w.start_at, w.record_work_id) < (%(cursor_start_at)s, %(cursor_id)s)"
+
+    # タスク ID は (created_by, task_id, start_at) インデックスを task_id ごとに1回ずつ飛び移って列挙し
+    # （ルースインデックススキャン）、各タスクの (start_at DESC, record_work_id DESC) の先頭 limit+1 件だけを
+    # LATERAL で取る。実績の総数ではなく「タスク数 × limit」に比例するコストで済む（1クエリ）
+    query = f"""
+        WITH RECURSIVE t AS (
+            (SELECT task_id FROM record_works
+             WHERE created_by = %(user_id)s{task_filter}
+             ORDER BY task_id LIMIT 1)
+            UNION ALL
+            SELECT (SELECT task_id FROM record_works
+                    WHERE created_by = %(user_id)s AND task_id > t.task_id{task_filter}
+                    ORDER BY task_id LIMIT 1)
+            FROM t
+            WHERE t.task_id IS NOT NULL
+        )
+        SELECT t.task_id, r.record_work_id, r.created_by, r.start_at, r.end_at,
+               r.progress_value, r.work_time, r.note, r.updated_at
+        FROM t
+        LEFT JOIN LATERAL (
+            SELECT w.record_work_id, w.created_by, w.start_at, w.end_at, w.progress_value, w.work_time, w.note,
+                   w.updated_at
+            FROM record_works w
+            WHERE w.created_by = %(user_id)s AND w.task_id = t.task_id{record_filter}
+            ORDER BY w.start_at DESC, w.record_work_id DESC
+            LIMIT %(limit)s
+        ) r ON TRUE
+        WHERE t.task_id IS NOT NULL
+        ORDER BY t.task_id, r.start_at DESC, r.record_work_id DESC
+    """
 
     with get_conn() as conn:
         with conn.cursor() as cur:
+            if wants_validation(request):
+                # 条件付き GET は返す行（＋先読み1件）とタスク列の集計だけで 304 を返す
+                cur.execute(
+                    "SELECT COUNT(record_work_id), MAX(updated_at), SUM(record_work_id), "
+                    f"COUNT(DISTINCT task_id), SUM(DISTINCT task_id) FROM ({query}) board",
+                    params,
+                )
+                etag = make_etag(*cur.fetchone())
+                if etag_matches(request, etag):
+                    return not_modified(etag)
             cur.execute(query, params)
-            task_ids = [row[0] for row in cur.fetchall()]
+            rows = cur.fetchall()
+    response.headers["ETag"] = _board_etag(rows)
 
     tasks = []
-
-    for tid in task_ids:
-        # 実績データを取得
-        record_query = """
-            SELECT record_work_id, task_id, created_by, start_at, end_at,
-                   progress_value, work_time, note, last_updated_user, created_at, updated_at
-            FROM record_works
-            WHERE task_id = %s AND created_by = %s
-        """
-        record_params = [tid, current_user_id]
-        
-        if from_:
-            record_query += " AND start_at >= %s"
-            record_params.append(from_)
-        
-        if to:
-            record_query += " AND end_at <= %s"
-            record_params.append(to)
-            
-        record_query += " ORDER BY start_at DESC"
-
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute(record_query, record_params)
-                record_rows = cur.fetchall()
-
-        records = [
+    by_task: Dict[int, dict] = {}
+    last_shown: Dict[int, tuple] = {}  # task_id -> 表示済み最後の (start_at, record_work_id)
+    for r in rows:
+        task = by_task.get(r[0])
+        if task is None:
+            task = {
+                "task_id": r[0],
+                "task_title": "",  # シンプルなタイトル、詳細はBFFで取得
+                "assignees": [],  # 簡易版では空配列
+                "records": [],
+                "has_more": False,
+                "next_cursor": None,
+            }
+            by_task[r[0]] = task
+            tasks.append(task)
+        if r[1] is None:
+            # 期間内に実績がないタスク（LEFT JOIN の空行）
+            continue
+        if len(task["records"]) == limit:
+            # limit+1 件目があれば続きあり。カーソルは表示済みの最後の1件を指す
+            task["has_more"] = True
+            task["next_cursor"] = _encode_board_cursor(*last_shown[r[0]])
+            continue
+        last_shown[r[0]] = (r[3], r[1])
+        task["records"].append(
             {
-                "record_work_id": r[0],
+                "record_work_id": r[1],
                 "start_at": r[3].isoformat(),
                 "end_at": r[4].isoformat(),
                 "work_time": r[6],
@@ -243,15 +510,7 @@ def list_records_by_task(
                 "note": r[7],
                 "created_by": r[2],
             }
-            for r in record_rows
-        ]
-
-        tasks.append({
-            "task_id": tid,
-            "task_title": "",  # シンプルなタイトル、詳細はBFFで取得
-            "assignees": [],  # 簡易版では空配列
-            "records": records,
-        })
+        )
 
     total_records = sum(len(t["records"]) for t in tasks)
     
@@ -264,6 +523,19 @@ def list_records_by_task(
     }
 
 
+def _encode_board_cursor(start_at: datetime, record_work_id: int) -> str:
+    raw = f"{start_at.isoformat()}|{record_work_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_board_cursor(cursor: str):
+    try:
+        start_at_str, record_work_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(start_at_str), int(record_work_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail={"message": "invalid cursor"})
+
+
 @app.get("/v1/records/{record_work_id}", response_model=RecordOut)
 def get_record(
     record_work_id: int,
@@ -342,6 +614,23 @@ def create_record(
             )
 
 
+@app.post("/v1/records/bulk", response_model=RecordBulkOut)
+async def create_records_bulk(
+    request: Request,
+    skip_invalid: bool = Query(default=False),
+    current_user_id: int = Depends(get_current_user_id),
+):
+    """実績を一括登録（JSON 配列 / NDJSON / CSV を Content-Type で判別し、COPY で1トランザクションに投入）
+    既定では1行でも不正なら何も登録せず 422。skip_invalid=true なら不正な行だけ飛ばす
+    """
+    fmt = bulk_format(request.headers.get("content-type"))
+    check_content_length(request.headers.get("content-length"), fmt)
+    # 検証と COPY は同期処理なのでスレッドプールで実行し、本文はそこから受信しながら読む
+    return await run_in_threadpool(
+        load_records_bulk, iter_request_body(request), fmt, current_user_id, skip_invalid
+    )
+
+
 @app.patch("/v1/records/{record_work_id}", response_model=RecordOut)
 def update_record(
     record_work_id: int,
@@ -436,20 +725,55 @@ def get_work_time_summary(
     to_date: Optional[str] = Query(default=None, alias="to"),
     current_user_id: int = Depends(get_current_user_id)
 ):
-    """作業時間の集計を取得"""
-    query = "SELECT COALESCE(SUM(work_time), 0) FROM record_works WHERE created_by=%s"
-    params = [current_user_id]
-    
-    if from_date:
-        query += " AND created_at >= %s"
-        params.append(from_date)
-    if to_date:
-        query += " AND created_at < %s"
-        params.append(to_date)
-    
+    """作業時間の集計を取得
+    期間なし（累計）と月初日区切りの期間はカウンタから返し、それ以外は record_works を集計する
+    """
+    from_month = _month_start(from_date)
+    to_month = _month_start(to_date)
+
     with get_conn() as conn:
         with conn.cursor() as cur:
-            cur.execute(query, params)
-            total = cur.fetchone()[0]
+            if not from_date and not to_date:
+                # 累計: ユーザーごとのカウンタ1行
+                cur.execute(
+                    "SELECT total_work_time FROM user_work_time_totals WHERE user_id=%s",
+                    (current_user_id,),
+                )
+                row = cur.fetchone()
+                total = row[0] if row else 0
+            elif (not from_date or from_month) and (not to_date or to_month):
+                # 月単位の期間: 月別カウンタの該当月のみ
+                query = "SELECT COALESCE(SUM(total_work_time), 0) FROM user_monthly_work_time WHERE user_id=%s"
+                params = [current_user_id]
+                if from_month:
+                    query += " AND month >= %s"
+                    params.append(from_month)
+                if to_month:
+                    query += " AND month < %s"
+                    params.append(to_month)
+                cur.execute(query, params)
+                total = cur.fetchone()[0]
+            else:
+                query = "SELECT COALESCE(SUM(work_time), 0) FROM record_works WHERE created_by=%s"
+                params = [current_user_id]
+                if from_date:
+                    query += " AND created_at >= %s"
+                    params.append(from_date)
+                if to_date:
+                    query += " AND created_at < %s"
+                    params.append(to_date)
+                cur.execute(query, params)
+                total = cur.fetchone()[0]
     
     return {"total_work_time": int(total)}
+
+
+def _month_start(value: Optional[str]) -> Optional[date]:
+    """YYYY-MM-01 形式（日付のみ・月初日）なら date を返す"""
+    if not value:
+        return None
+    try:
+        d = date.fromisoformat(value)
+    except ValueError:
+        return None
+    return d if d.day == 1 else None
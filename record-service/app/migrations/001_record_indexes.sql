@@ -0,0 +1,9 @@
+-- 001: record_works の検索用インデックス
+
+-- タスク別の実績（一覧・最新進捗・カンバン・実績タイムライン）。start_at 降順をそのまま読む
+CREATE INDEX IF NOT EXISTS idx_record_works_created_by_task_id_start_at
+  ON record_works(created_by, task_id, start_at DESC, record_work_id DESC);
+
+-- ユーザー全体の実績（時系列一覧・日次集計）
+CREATE INDEX IF NOT EXISTS idx_record_works_created_by_start_at
+  ON record_works(created_by, start_at DESC);
@@ -0,0 +1,121 @@
+-- 002: ユーザーごとの作業時間カウンタ（累計・月別）
+-- record_works への変更をステートメント単位のトリガで差分反映する（COPY などの一括投入でも1回で済む）
+-- 月の区切りは created_at の UTC 月
+
+CREATE TABLE IF NOT EXISTS user_work_time_totals (
+  user_id INTEGER PRIMARY KEY,
+  total_work_time BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS user_monthly_work_time (
+  user_id INTEGER NOT NULL,
+  month DATE NOT NULL, -- 月初日
+  total_work_time BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (user_id, month)
+);
+
+-- (user_id, month, delta) の配列をカウンタに加算する。行ロックの順序を揃えるため user_id, month 順に処理
+CREATE OR REPLACE FUNCTION add_work_time_deltas(p_user_ids INTEGER[], p_months DATE[], p_deltas BIGINT[])
+RETURNS void AS $$
+BEGIN
+  INSERT INTO user_monthly_work_time (user_id, month, total_work_time)
+  SELECT d.user_id, d.month, d.delta
+  FROM unnest(p_user_ids, p_months, p_deltas) AS d(user_id, month, delta)
+  ORDER BY d.user_id, d.month
+  ON CONFLICT (user_id, month) DO UPDATE
+  SET total_work_time = user_monthly_work_time.total_work_time + EXCLUDED.total_work_time,
+      updated_at = NOW();
+
+  INSERT INTO user_work_time_totals (user_id, total_work_time)
+  SELECT d.user_id, SUM(d.delta)
+  FROM unnest(p_user_ids, p_deltas) AS d(user_id, delta)
+  GROUP BY d.user_id
+  ORDER BY d.user_id
+  ON CONFLICT (user_id) DO UPDATE
+  SET total_work_time = user_work_time_totals.total_work_time + EXCLUDED.total_work_time,
+      updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION record_works_work_time_counters() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM add_work_time_deltas(array_agg(user_id), array_agg(month), array_agg(delta))
+    FROM (
+      SELECT created_by AS user_id, date_trunc('month', created_at AT TIME ZONE 'UTC')::date AS month,
+             SUM(work_time)::bigint AS delta
+      FROM new_rows
+      GROUP BY 1, 2
+    ) d;
+  ELSIF TG_OP = 'UPDATE' THEN
+    PERFORM add_work_time_deltas(array_agg(user_id), array_agg(month), array_agg(delta))
+    FROM (
+      SELECT created_by AS user_id, date_trunc('month', created_at AT TIME ZONE 'UTC')::date AS month,
+             SUM(work_time)::bigint AS delta
+      FROM (
+        SELECT created_by, created_at, work_time FROM new_rows
+        UNION ALL
+        SELECT created_by, created_at, -work_time FROM old_rows
+      ) c
+      GROUP BY 1, 2
+      HAVING SUM(work_time) <> 0
+    ) d;
+  ELSE
+    PERFORM add_work_time_deltas(array_agg(user_id), array_agg(month), array_agg(delta))
+    FROM (
+      SELECT created_by AS user_id, date_trunc('month', created_at AT TIME ZONE 'UTC')::date AS month,
+             -SUM(work_time)::bigint AS delta
+      FROM old_rows
+      GROUP BY 1, 2
+    ) d;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_record_works_work_time_ins ON record_works;
+CREATE TRIGGER trg_record_works_work_time_ins
+  AFTER INSERT ON record_works
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION record_works_work_time_counters();
+
+DROP TRIGGER IF EXISTS trg_record_works_work_time_upd ON record_works;
+CREATE TRIGGER trg_record_works_work_time_upd
+  AFTER UPDATE ON record_works
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION record_works_work_time_counters();
+
+DROP TRIGGER IF EXISTS trg_record_works_work_time_del ON record_works;
+CREATE TRIGGER trg_record_works_work_time_del
+  AFTER DELETE ON record_works
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION record_works_work_time_counters();
+
+-- record_works から作り直す（p_user_id 指定時はそのユーザーのみ）
+-- 作り直し中に差分が混ざらないよう record_works への書き込みを止める（読み取りは可能）
+CREATE OR REPLACE FUNCTION rebuild_work_time_counters(p_user_id INTEGER DEFAULT NULL)
+RETURNS void AS $$
+BEGIN
+  LOCK TABLE record_works IN SHARE MODE;
+
+  DELETE FROM user_monthly_work_time WHERE p_user_id IS NULL OR user_id = p_user_id;
+  DELETE FROM user_work_time_totals WHERE p_user_id IS NULL OR user_id = p_user_id;
+
+  INSERT INTO user_monthly_work_time (user_id, month, total_work_time)
+  SELECT created_by, date_trunc('month', created_at AT TIME ZONE 'UTC')::date, SUM(work_time)
+  FROM record_works
+  WHERE p_user_id IS NULL OR created_by = p_user_id
+  GROUP BY 1, 2;
+
+  INSERT INTO user_work_time_totals (user_id, total_work_time)
+  SELECT user_id, SUM(total_work_time)
+  FROM user_monthly_work_time
+  WHERE p_user_id IS NULL OR user_id = p_user_id
+  GROUP BY user_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 既存データのバックフィル
+SELECT rebuild_work_time_counters();
@@ -0,0 +1,7 @@
+-- 003: ユーザー全体の実績一覧をキーセットページング（(start_at, record_work_id) の降順）で読むためのインデックス
+-- 同順位の start_at を record_work_id で並べるため、001 の (created_by, start_at DESC) を置き換える
+
+CREATE INDEX IF NOT EXISTS idx_record_works_created_by_start_at_id
+  ON record_works(created_by, start_at DESC, record_work_id DESC);
+
+DROP INDEX IF EXISTS idx_record_works_created_by_start_at;
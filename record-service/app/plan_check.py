@@ -0,0 +1,145 @@
+"""ホットクエリの実行計画チェック
+
+大きめのダミーデータを投入した状態で各ホットクエリを EXPLAIN し、対象テーブルに Seq Scan が
+出ていれば失敗とする。投入したデータはトランザクションごとロールバックするので残らない。
+マイグレーション適用後の DB に対して `python -m app.migrate --check-plans` で実行する。
+"""
+import os
+from typing import Dict, List
+
+import psycopg
+
+from app.db import DB_CONNINFO
+
+PLAN_CHECK_ROWS = int(os.getenv("PLAN_CHECK_ROWS", "50000"))  # 投入する record_works の件数
+
+# 既存データと衝突しない ID 帯を明示して使う（ロールバックしてもシーケンスを消費しないため）
+_BASE = 1_000_000_000
+_USER_ID = _BASE + 1
+_TASK_ID = _BASE + 1
+
+CHECKED_TABLES = {"record_works"}
+
+# ユーザー500人・タスク5000件に均等に分散させる
+SEED_SQL = [
+    """
+    INSERT INTO record_works (record_work_id, task_id, created_by, start_at, end_at, progress_value, work_time)
+    SELECT %(base)s + g, %(base)s + (g %% 5000) + 1, %(base)s + (g %% 500) + 1,
+           NOW() - g * INTERVAL '10 minutes', NOW() - g * INTERVAL '10 minutes' + INTERVAL '30 minutes',
+           1, 30
+    FROM generate_series(1, %(rows)s) AS g
+    """,
+    "ANALYZE record_works",
+]
+
+# name -> SQL（app/main.py の主要クエリと同じ形）
+HOT_QUERIES: Dict[str, str] = {
+    "list_records_by_task": f"""
+        SELECT record_work_id, task_id, created_by, start_at, end_at,
+               progress_value, work_time, note, last_updated_user, created_at, updated_at
+        FROM record_works
+        WHERE created_by = {_USER_ID} AND task_id = {_TASK_ID}
+          AND (start_at, record_work_id) < (NOW() - INTERVAL '30 days', {_BASE + 5000})
+        ORDER BY start_at DESC, record_work_id DESC LIMIT 51
+    """,
+    "list_records": f"""
+        SELECT record_work_id, task_id, created_by, start_at, end_at,
+               progress_value, work_time, note, last_updated_user, created_at, updated_at
+        FROM record_works
+        WHERE created_by = {_USER_ID}
+          AND (start_at, record_work_id) < (NOW() - INTERVAL '30 days', {_BASE + 5000})
+        ORDER BY start_at DESC, record_work_id DESC LIMIT 51
+    """,
+    "list_records_total": f"""
+        SELECT COUNT(*) FROM (SELECT 1 FROM record_works WHERE created_by = {_USER_ID} LIMIT 1001) s
+    """,
+    "records_export": f"""
+        SELECT record_work_id, task_id, created_by, start_at, end_at,
+               progress_value, work_time, note, last_updated_user, created_at, updated_at
+        FROM record_works
+        WHERE created_by = {_USER_ID}
+        ORDER BY start_at, record_work_id
+    """,
+    "latest_progress": f"""
+        SELECT progress_value, start_at
+        FROM record_works
+        WHERE task_id = {_TASK_ID} AND created_by = {_USER_ID}
+        ORDER BY start_at DESC
+        LIMIT 1
+    """,
+    "latest_progress_batch": f"""
+        SELECT DISTINCT ON (task_id) task_id, progress_value, start_at
+        FROM record_works
+        WHERE created_by = {_USER_ID} AND task_id = ANY(ARRAY[{_TASK_ID}, {_TASK_ID + 500}])
+        ORDER BY task_id, start_at DESC
+    """,
+    "daily_aggregate": f"""
+        SELECT DATE(start_at) as target_date, COALESCE(SUM(work_time), 0) as total_work_time
+        FROM record_works
+        WHERE created_by = {_USER_ID} AND DATE(start_at) >= CURRENT_DATE - 30
+        GROUP BY DATE(start_at) ORDER BY target_date ASC
+    """,
+    "records_board": f"""
+        WITH RECURSIVE t AS (
+            (SELECT task_id FROM record_works WHERE created_by = {_USER_ID} ORDER BY task_id LIMIT 1)
+            UNION ALL
+            SELECT (SELECT task_id FROM record_works
+                    WHERE created_by = {_USER_ID} AND task_id > t.task_id
+                    ORDER BY task_id LIMIT 1)
+            FROM t
+            WHERE t.task_id IS NOT NULL
+        )
+        SELECT t.task_id, r.record_work_id, r.start_at, r.updated_at
+        FROM t
+        LEFT JOIN LATERAL (
+            SELECT w.record_work_id, w.start_at, w.updated_at
+            FROM record_works w
+            WHERE w.created_by = {_USER_ID} AND w.task_id = t.task_id
+            ORDER BY w.start_at DESC, w.record_work_id DESC
+            LIMIT 21
+        ) r ON TRUE
+        WHERE t.task_id IS NOT NULL
+        ORDER BY t.task_id, r.start_at DESC, r.record_work_id DESC
+    """,
+    "actuals_timeline": f"""
+        SELECT task_id, DATE(start_at) AS target_date,
+               SUM(progress_value) AS progress_sum, SUM(work_time) AS time_sum
+        FROM record_works
+        WHERE created_by = {_USER_ID} AND task_id = ANY(ARRAY[{_TASK_ID}, {_TASK_ID + 500}])
+        GROUP BY task_id, DATE(start_at)
+    """,
+    "actuals_timeline_has_records": f"""
+        SELECT e.task_id
+        FROM unnest(ARRAY[{_TASK_ID}, {_TASK_ID + 500}]) AS e(task_id)
+        WHERE EXISTS (
+            SELECT 1 FROM record_works r
+            WHERE r.created_by = {_USER_ID} AND r.task_id = e.task_id
+        )
+    """,
+}
+
+
+def _seq_scans(node: dict) -> List[str]:
+    found = []
+    if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in CHECKED_TABLES:
+        found.append(node["Relation Name"])
+    for child in node.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def check_plans() -> List[str]:
+    """Seq Scan になったクエリを "name: 理由" のリストで返す（空なら OK）"""
+    failures = []
+    with psycopg.connect(DB_CONNINFO) as conn:
+        with conn.transaction(force_rollback=True):
+            with conn.cursor() as cur:
+                for sql in SEED_SQL:
+                    cur.execute(sql, {"base": _BASE, "rows": PLAN_CHECK_ROWS} if "%(" in sql else None)
+                for name, query in HOT_QUERIES.items():
+                    cur.execute("EXPLAIN (FORMAT JSON) " + query)
+                    plan = cur.fetchone()[0][0]["Plan"]
+                    scans = _seq_scans(plan)
+                    if scans:
+                        failures.append(f"{name}: Seq Scan on {', '.join(sorted(set(scans)))}")
+    return failures
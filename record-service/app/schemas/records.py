@@ -1,5 +1,5 @@
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -33,3 +33,38 @@ class RecordOut(BaseModel):
     last_updated_user: Optional[int]
     created_at: datetime
     updated_at: datetime
+
+
+class RecordPageOut(BaseModel):
+    items: List[RecordOut]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+    total: Optional[int] = None  # with_total=true の場合のみ
+    total_exact: Optional[bool] = None  # False なら推定値
+
+
+class RecordBulkError(BaseModel):
+    row: int  # 入力内の何件目か（1始まり。CSV はヘッダーを除く）
+    message: str
+
+
+class RecordBulkOut(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    errors: List[RecordBulkError]  # 先頭 100 件まで
+    elapsed_ms: float
+    rows_per_second: int
+
+
+class ActualsTimelineIn(BaseModel):
+    task_ids: List[int] = Field(min_length=1, max_length=1000)
+    # task_id -> 実績がなくても行を出したい日付（計画日付など）
+    expected_dates: Optional[Dict[int, List[date]]] = None
+    upto: Optional[date] = None
+
+
+class DailyActualOut(BaseModel):
+    target_date: date
+    work_actual_value: int
+    time_actual_value: int
@@ -0,0 +1,34 @@
+"""作業時間カウンタ（user_work_time_totals / user_monthly_work_time）の作り直し
+
+カウンタは record_works のトリガで差分更新される（migrations/002_work_time_counters.sql）。
+ずれた場合やトリガ導入前のデータを取り込む場合に CLI から作り直す:
+
+    python -m app.work_time_counters              # 全ユーザー
+    python -m app.work_time_counters --user-id 1  # 指定ユーザーのみ
+"""
+import argparse
+import sys
+from typing import Optional
+
+import psycopg
+
+from app.db import DB_CONNINFO
+
+
+def rebuild_counters(user_id: Optional[int] = None) -> None:
+    with psycopg.connect(DB_CONNINFO) as conn:
+        with conn.transaction():
+            conn.execute("SELECT rebuild_work_time_counters(%s)", (user_id,))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.work_time_counters")
+    parser.add_argument("--user-id", type=int, default=None, help="指定ユーザーのみ作り直す")
+    args = parser.parse_args(argv)
+    rebuild_counters(args.user_id)
+    print("rebuilt work time counters" + (f" for user {args.user_id}" if args.user_id is not None else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# サービス間で同一内容のコピー（各サービスのイメージは自分のディレクトリだけをビルドするため）。
+# 変更は全コピーに同じように入れる（tests/test_shared_modules.py で一致を検査）
+import hashlib
+import hmac
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import Depends, Header, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from jose import jwt, JWTError
+
+# JWT 設定（全サービスで同一シークレット/アルゴリズム）
+JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret")
+JWT_ALG = "HS256"
+JWT_EXPIRE_DAYS = int(os.getenv("JWT_EXPIRE_DAYS", "7"))
+
+# サービス間の内部API用共有トークン（全サービスで同一値）
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN", "dev-internal-token")
+
+# 検証済みトークンキャッシュ設定
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+
+auth_scheme = HTTPBearer(auto_error=False)
+
+
+class TokenCache:
+    """検証済みトークンのダイジェスト -> (exp, user_id) を保持する LRU キャッシュ
+
+    トークン本体は保持せず SHA-256 ダイジェストをキーにする。exp を過ぎたエントリは使わない。
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[bytes, Tuple[float, int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[int]:
+        key = self._key(token)
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, token: str, exp: float, user_id: int) -> None:
+        key = self._key(token)
+        self._data[key] = (exp, user_id)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+token_cache = TokenCache(maxsize=TOKEN_CACHE_MAX_SIZE)
+
+
+def decode_token(token: str) -> int:
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
+        sub = payload.get("sub")
+        if sub is None:
+            raise HTTPException(status_code=401, detail={"message": "invalid token"})
+        user_id = int(sub)
+    except (JWTError, ValueError):
+        raise HTTPException(status_code=401, detail={"message": "invalid token"})
+    # exp の無いトークンは失効時刻が分からないのでキャッシュしない
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        token_cache.set(token, exp, user_id)
+    return user_id
+
+
+async def get_current_user_id(
+    creds: Optional[HTTPAuthorizationCredentials] = Depends(auth_scheme),
+) -> int:
+    if creds is None or creds.scheme.lower() != "bearer":
+        raise HTTPException(status_code=401, detail={"message": "missing bearer token"})
+    return decode_token(creds.credentials)
+
+
+def get_auth_token(creds: Optional[HTTPAuthorizationCredentials] = Depends(auth_scheme)) -> str:
+    """認証トークンを取得（他サービスへの転送用）"""
+    if creds is None or creds.scheme.lower() != "bearer":
+        raise HTTPException(status_code=401, detail={"message": "missing bearer token"})
+    return creds.credentials
+
+
+def require_internal_token(x_internal_token: Optional[str] = Header(default=None)) -> None:
+    """サービス間の内部APIを保護する共有トークンを検証"""
+    if not x_internal_token or not hmac.compare_digest(x_internal_token, INTERNAL_API_TOKEN):
+        raise HTTPException(status_code=403, detail={"message": "forbidden"})
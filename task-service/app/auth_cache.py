@@ -0,0 +1,66 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# タスク権限キャッシュ設定
+TASK_AUTH_CACHE_TTL = float(os.getenv("TASK_AUTH_CACHE_TTL", "60"))  # 秒
+TASK_AUTH_CACHE_MAX_USERS = int(os.getenv("TASK_AUTH_CACHE_MAX_USERS", "10000"))
+
+
+class TaskAuthCache:
+    """user_id -> {task_id: role} を保持する TTL 付き LRU キャッシュ
+
+    user-service で task_auths が変更された場合は invalidate() で明示的に破棄される
+    （通知を受けたインスタンスは即時、他のワーカーは変更フィードのポーリング時）。
+    TTL は通知もフィードも届かなかった場合の保険。
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[int, Tuple[float, Dict[int, str]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int) -> Optional[Dict[int, str]]:
+        entry = self._data.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, roles = entry
+        if expires_at < time.monotonic():
+            del self._data[user_id]
+            self.misses += 1
+            return None
+        self._data.move_to_end(user_id)
+        self.hits += 1
+        return roles
+
+    def set(self, user_id: int, roles: Dict[int, str]) -> None:
+        self._data[user_id] = (time.monotonic() + self.ttl, roles)
+        self._data.move_to_end(user_id)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self.invalidations += 1
+        self._data.pop(user_id, None)
+
+    def clear(self) -> None:
+        self.invalidations += 1
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+task_auth_cache = TaskAuthCache(maxsize=TASK_AUTH_CACHE_MAX_USERS, ttl=TASK_AUTH_CACHE_TTL)
@@ -0,0 +1,106 @@
+"""一覧応答のシリアライズのベンチマーク
+
+従来の経路（行ごとに Pydantic モデルを組み立て → FastAPI が response_model で検証・変換 → JSONResponse）と
+高速経路（app.fast_json: 行タプル → dict → orjson）で、同じ行から同じ JSON になることを確かめたうえで
+1秒あたりの行数を比べる。DB は使わず、一覧クエリと同じ形の行を生成して計測する:
+
+    python -m app.bench_serialization            # 既定 10000 行
+    python -m app.bench_serialization --rows 50000 --repeat 5
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, List, Sequence
+
+import orjson
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.fast_json import json_response, rows_as_dicts
+from app.schemas import DailyPlanOut, TaskOut
+
+TASK_COLUMNS = [
+    "task_id", "created_by", "task_name", "task_content", "start_at", "end_at",
+    "category", "target_time", "comment", "status", "created_at", "updated_at", "completed_at",
+]
+DAILY_PLAN_COLUMNS = [
+    "daily_time_plan_id", "task_id", "created_by", "target_date",
+    "work_plan_value", "time_plan_value", "created_at", "updated_at",
+]
+
+
+def _task_rows(n: int) -> List[tuple]:
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        (
+            i, 1, f"task {i}", "content " * 5, base + timedelta(days=i % 365), base + timedelta(days=i % 365 + 30),
+            "study", 600, None if i % 3 else "comment", "active", base, base + timedelta(seconds=i), None,
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def _daily_plan_rows(n: int) -> List[tuple]:
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        (i, i // 30 + 1, 1, date(2025, 1, 1) + timedelta(days=i % 30), 3, 20, base, base + timedelta(seconds=i))
+        for i in range(1, n + 1)
+    ]
+
+
+def _legacy(model, columns: Sequence[str]) -> Callable[[List[tuple]], bytes]:
+    field = create_response_field(name="bench", type_=List[model], mode="serialization")
+
+    def run(rows: List[tuple]) -> bytes:
+        # 変更前のハンドラと同じく行ごとにモデルを作り、FastAPI の応答処理に渡す
+        items = [model(**dict(zip(columns, row))) for row in rows]
+        content = asyncio.run(serialize_response(field=field, response_content=items))
+        return JSONResponse(content).body
+
+    return run
+
+
+def _fast(columns: Sequence[str]) -> Callable[[List[tuple]], bytes]:
+    def run(rows: List[tuple]) -> bytes:
+        return json_response(rows_as_dicts(columns, rows)).body
+
+    return run
+
+
+def _rows_per_second(fn: Callable[[List[tuple]], bytes], rows: List[tuple], repeat: int) -> float:
+    best = min(_elapsed(fn, rows) for _ in range(repeat))
+    return len(rows) / best
+
+
+def _elapsed(fn, rows) -> float:
+    started = time.perf_counter()
+    fn(rows)
+    return time.perf_counter() - started
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.bench_serialization")
+    parser.add_argument("--rows", type=int, default=10000, help="1回の応答に含める行数")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最速の回を採用）")
+    args = parser.parse_args(argv)
+
+    cases = [
+        ("list_tasks", TaskOut, TASK_COLUMNS, _task_rows(args.rows)),
+        ("get_daily_plans", DailyPlanOut, DAILY_PLAN_COLUMNS, _daily_plan_rows(args.rows)),
+    ]
+    for name, model, columns, rows in cases:
+        legacy, fast = _legacy(model, columns), _fast(columns)
+        if orjson.loads(legacy(rows)) != orjson.loads(fast(rows)):
+            print(f"{name}: output mismatch")
+            return 1
+        before = _rows_per_second(legacy, rows, args.repeat)
+        after = _rows_per_second(fast, rows, args.repeat)
+        print(f"{name}: pydantic {before:,.0f} rows/s -> orjson {after:,.0f} rows/s ({after / before:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
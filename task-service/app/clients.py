@@ -0,0 +1,40 @@
+import os
+from typing import Dict
+
+import httpx
+
+# user-service URL
+USER_SVC_BASE = os.getenv("USER_SVC_BASE", "http://user-service/v1")
+USER_SVC_TIMEOUT = float(os.getenv("USER_SVC_TIMEOUT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+
+# コネクション上限と keep-alive
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+# lifespan で生成し、プロセス内の全リクエストで使い回す
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+async def open_clients() -> None:
+    _clients["user"] = httpx.AsyncClient(
+        base_url=USER_SVC_BASE,
+        timeout=httpx.Timeout(USER_SVC_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+async def close_clients() -> None:
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
+
+
+def user_client() -> httpx.AsyncClient:
+    """user-service 用の共有クライアント（パスは /v1 からの相対で指定）"""
+    return _clients["user"]
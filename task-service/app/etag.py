@@ -0,0 +1,50 @@
+# サービス間で同一内容のコピー（各サービスのイメージは自分のディレクトリだけをビルドするため）。
+# 変更は全コピーに同じように入れる（tests/test_shared_modules.py で一致を検査）
+"""弱い ETag（W/"..."）の生成と条件付き GET（If-None-Match）の判定
+
+ETag はレスポンス本文ではなくデータのバージョン（件数・最大 updated_at・ID の合計）から作る。
+同じ値は一覧の取得結果からも、集計だけの検証用クエリからも計算できるので、
+If-None-Match 付きのリクエストは検証用クエリ1本で 304 を返せる。
+"""
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional, Sequence
+
+from fastapi import Request, Response
+
+
+def make_etag(count: int, max_updated_at: Optional[datetime], id_sum: Optional[int], *extra) -> str:
+    """extra には本文に影響する行以外の値（総件数など）を渡す"""
+    stamp = max_updated_at.astimezone(timezone.utc).isoformat() if max_updated_at is not None else "-"
+    raw = "|".join([str(count), stamp, str(id_sum or 0), *(str(e) for e in extra)])
+    digest = hashlib.sha1(raw.encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def rows_etag(rows: Sequence[Sequence], id_index: int, updated_at_index: int, *extra) -> str:
+    """取得済みの行から、検証用クエリ（COUNT(*), MAX(updated_at), SUM(id)）と同じ ETag を作る"""
+    return make_etag(
+        len(rows),
+        max((r[updated_at_index] for r in rows), default=None),
+        sum(r[id_index] for r in rows),
+        *extra,
+    )
+
+
+def wants_validation(request: Request) -> bool:
+    return bool(request.headers.get("if-none-match"))
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match を弱い比較（W/ を無視）で判定する"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
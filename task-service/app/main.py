@@ -1,185 +1,374 @@
-import os
+import asyncio
+import base64
+import json
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone, date
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, Depends, Query
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError
-import psycopg
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse
+from psycopg_pool import PoolTimeout
 import httpx
 
-from app.schemas import TaskIn, TaskOut, TaskUpdate, DailyPlanOut, DailyPlanBulkItem
+from app.auth import get_auth_token, get_current_user_id, require_internal_token, token_cache
+from app.auth_cache import task_auth_cache
+from app.clients import open_clients, close_clients, user_client
+from app.db import get_conn, get_pool_stats, pool
+from app.etag import etag_matches, make_etag, not_modified, rows_etag, wants_validation
+from app.fast_json import column_names, json_response, rows_as_dicts
+from app.migrate import RUN_MIGRATIONS, apply_migrations
+from app import task_auth_replica
+from app.schemas import (
+    TaskIn,
+    TaskOut,
+    TaskPageOut,
+    TaskStatsOut,
+    TaskUpdate,
+    DailyPlanOut,
+    DailyPlanBulkItem,
+    TaskAuthCacheInvalidation,
+)
+
+# GET /v1/daily_plans（・latest_progress/batch）で一度に指定できる task_id の上限
+MAX_DAILY_PLAN_TASK_IDS = 1000
+
+# GET /v1/tasks/page の1ページの上限と、並べ替えに使える列（いずれも (列, task_id) のインデックスあり）
+MAX_TASKS_PER_PAGE = 200
+TASK_SORT_COLUMNS = {"id": "t.task_id", "start_at": "t.start_at", "end_at": "t.end_at", "updated_at": "t.updated_at"}
+TASK_SORT_ROW_INDEX = {"start_at": 4, "end_at": 5, "updated_at": 11}  # _TASK_COLUMNS 内の位置
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 未適用のマイグレーションを適用してから接続を開く（同期処理なのでスレッドで実行）
+    if RUN_MIGRATIONS:
+        await asyncio.to_thread(apply_migrations)
+    # DBコネクションプールと user-service 用クライアントはプロセス内で1つだけ開き、終了時に閉じる
+    await pool.open()
+    await open_clients()
+    # task_auths レプリカの同期ループをバックグラウンドで起動
+    sync_task = asyncio.create_task(task_auth_replica.sync_loop())
+    try:
+        yield
+    finally:
+        sync_task.cancel()
+        try:
+            await sync_task
+        except asyncio.CancelledError:
+            pass
+        await close_clients()
+        await pool.close()
 
-# JWT 設定（user-service と同一シークレット/アルゴリズム）
-JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret")
-JWT_ALG = "HS256"
-JWT_EXPIRE_DAYS = int(os.getenv("JWT_EXPIRE_DAYS", "7"))
 
-# DB 設定（task-db）
-DB_HOST = os.getenv("DB_HOST", "climbly-task-db")
-DB_PORT = int(os.getenv("DB_PORT", "5432"))
-DB_NAME = os.getenv("DB_NAME", "task_db")
-DB_USER = os.getenv("DB_USER", "climbly")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "climbly")
+app = FastAPI(title="Climbly Task Service", version="1.0.0", lifespan=lifespan)
 
-# user-service URL
-USER_SVC_BASE = os.getenv("USER_SVC_BASE", "http://user-service/v1")
 
-auth_scheme = HTTPBearer(auto_error=False)
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    # プールが枯渇して接続を取得できない場合は 503 を返す
+    return JSONResponse(status_code=503, content={"detail": {"message": "database busy"}})
 
-app = FastAPI(title="Climbly Task Service", version="1.0.0")
 
+async def get_task_roles(user_id: int, token: str) -> Dict[int, str]:
+    """ユーザーがアクセス権を持つタスクの {task_id: role} を取得（キャッシュ優先）"""
+    roles = task_auth_cache.get(user_id)
+    if roles is not None:
+        return roles
 
-def get_conn():
-    return psycopg.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        autocommit=True,
-    )
+    # キャッシュに無ければ user-service から全権限を取得してキャッシュする
+    try:
+        auth_resp = await user_client().get(
+            "/task_auths",
+            headers={"authorization": f"Bearer {token}"}
+        )
+    except httpx.RequestError as e:
+        raise HTTPException(
+            status_code=502,
+            detail={"message": "user-service unavailable", "error": str(e)}
+        )
+    if not auth_resp.is_success:
+        raise HTTPException(
+            status_code=502,
+            detail={"message": "failed to get task_auths", "error": auth_resp.text}
+        )
+    roles = {auth["task_id"]: auth["task_user_auth"] for auth in auth_resp.json()}
+    task_auth_cache.set(user_id, roles)
+    return roles
 
 
-def decode_token(token: str) -> int:
+async def check_task_permission(task_id: int, user_id: int, token: str) -> bool:
+    """ユーザーが指定されたタスクへのアクセス権を持っているかチェック"""
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
-        sub = payload.get("sub")
-        if sub is None:
-            raise HTTPException(status_code=401, detail={"message": "invalid token"})
-        return int(sub)
-    except JWTError:
-        raise HTTPException(status_code=401, detail={"message": "invalid token"})
+        roles = await get_task_roles(user_id, token)
+    except HTTPException:
+        return False
+    return task_id in roles
 
 
-async def get_current_user_id(
-    creds: Optional[HTTPAuthorizationCredentials] = Depends(auth_scheme),
-) -> int:
-    if creds is None or creds.scheme.lower() != "bearer":
-        raise HTTPException(status_code=401, detail={"message": "missing bearer token"})
-    return decode_token(creds.credentials)
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
 
 
-def get_auth_token(creds: Optional[HTTPAuthorizationCredentials] = Depends(auth_scheme)) -> str:
-    """認証トークンを取得（user-serviceへの転送用）"""
-    if creds is None or creds.scheme.lower() != "bearer":
-        raise HTTPException(status_code=401, detail={"message": "missing bearer token"})
-    return creds.credentials
+@app.get("/metrics/db_pool")
+async def db_pool_metrics():
+    return get_pool_stats()
 
 
-def check_task_permission(task_id: int, user_id: int, token: str) -> bool:
-    """ユーザーが指定されたタスクへのアクセス権を持っているかチェック"""
-    try:
-        with httpx.Client(timeout=10.0) as client:
-            auth_resp = client.get(
-                f"{USER_SVC_BASE}/task_auths",
-                params={"task_id": task_id},
-                headers={"authorization": f"Bearer {token}"}
-            )
-            if auth_resp.is_success:
-                task_auths = auth_resp.json()
-                return len(task_auths) > 0
-            return False
-    except httpx.RequestError:
-        return False
+@app.get("/metrics/token_cache")
+async def token_cache_metrics():
+    return token_cache.stats()
 
 
-@app.get("/healthz")
-def healthz():
-    return {"status": "ok"}
+@app.get("/metrics/task_auth_cache")
+async def task_auth_cache_metrics():
+    return task_auth_cache.stats()
+
+
+@app.get("/metrics/task_auth_replica")
+async def task_auth_replica_metrics():
+    return task_auth_replica.replica_state.stats()
+
+
+# Internal（user-service からの権限変更通知・レプリカ運用）
+@app.post("/v1/internal/task_auth_cache/invalidate", dependencies=[Depends(require_internal_token)])
+async def invalidate_task_auth_cache(req: TaskAuthCacheInvalidation):
+    if req.user_ids is None:
+        task_auth_cache.clear()
+    else:
+        for user_id in req.user_ids:
+            task_auth_cache.invalidate(user_id)
+    # レプリカも次のポーリングを待たずに追いつかせる
+    task_auth_replica.poke()
+    return {"ok": True}
+
+
+@app.post("/v1/internal/task_auth_replica/resync", dependencies=[Depends(require_internal_token)])
+async def resync_task_auth_replica():
+    """task_auths レプリカを全件から作り直す（運用時の手動リカバリ用）"""
+    task_auth_replica.request_resync()
+    return {"ok": True}
 
 
 # Tasks
+async def _task_scope(
+    mine: bool,
+    category: Optional[str],
+    status: Optional[str],
+    current_user_id: int,
+    token: str,
+) -> Optional[Tuple[str, List[str], List]]:
+    """タスク一覧・集計で共通の (FROM/JOIN 句, WHERE 条件, パラメータ) を返す（アクセスできるタスクがなければ None）"""
+    query = " FROM tasks t"
+    params: List = []
+    where: List[str] = []
+
+    if mine:
+        if task_auth_replica.replica_state.ready:
+            # ローカルの task_auths レプリカと JOIN して絞り込む（user-service への問い合わせなし）
+            query += " JOIN task_auths a ON a.task_id = t.task_id AND a.user_id = %s"
+            params.append(current_user_id)
+        else:
+            # レプリカ未同期の間は、アクセス権を持つtask_idリストで絞り込む（権限キャッシュ経由）
+            authorized_task_ids = list(await get_task_roles(current_user_id, token))
+            if not authorized_task_ids:
+                return None
+            where.append("t.task_id = ANY(%s)")
+            params.append(authorized_task_ids)
+
+    if category is not None:
+        where.append("t.category=%s")
+        params.append(category)
+    if status is not None:
+        where.append("t.status=%s")
+        params.append(status)
+    return query, where, params
+
+
+def _where(conditions: List[str]) -> str:
+    return " WHERE " + " AND ".join(conditions) if conditions else ""
+
+
+_TASK_COLUMNS = (
+    "SELECT t.task_id, t.created_by, t.task_name, t.task_content, t.start_at, t.end_at, "
+    "t.category, t.target_time, t.comment, t.status, t.created_at, t.updated_at, t.completed_at"
+)
+
+
 @app.get("/v1/tasks", response_model=List[TaskOut])
-def list_tasks(
+async def list_tasks(
+    request: Request,
+    response: Response,
     mine: bool = Query(default=True),   # bool: 自分がアクセス権を持つタスクのみ取得する場合はTrue
     category: Optional[str] = Query(default=None),
     status: Optional[str] = Query(default=None, regex="^(active|completed|paused|cancelled)$"),
     current_user_id: int = Depends(get_current_user_id),
     token: str = Depends(get_auth_token),
 ):
-    query = (
-        "SELECT task_id, created_by, task_name, task_content, start_at, end_at, "
-        "category, target_time, comment, status, created_at, updated_at FROM tasks"
-    )
-    params: List = []
-    where = []
-    
-    if mine:
-        # user-serviceからログインユーザーがアクセス権を持つtask_idリストを取得
-        try:
-            with httpx.Client(timeout=10.0) as client:
-                auth_resp = client.get(
-                    f"{USER_SVC_BASE}/task_auths",
-                    headers={"authorization": f"Bearer {token}"}
-                )
-                if not auth_resp.is_success:
-                    raise HTTPException(
-                        status_code=502,
-                        detail={"message": "failed to get task_auths", "error": auth_resp.text}
-                    )
-                task_auths = auth_resp.json()
-                authorized_task_ids = [auth["task_id"] for auth in task_auths]
-                
-                if authorized_task_ids:
-                    # 権限のあるタスクIDで絞り込む
-                    where.append("task_id = ANY(%s)")
-                    params.append(authorized_task_ids)
+    """全件を返す（サービス内部の集計向け）。画面の一覧は /v1/tasks/page でページングする"""
+    scope = await _task_scope(mine, category, status, current_user_id, token)
+    if scope is None:
+        # 権限のあるタスクがない場合は空を返す
+        etag = make_etag(0, None, 0)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return []
+    query, where, params = scope
+    query += _where(where)
+
+    async with get_conn() as conn:
+        async with conn.cursor() as cur:
+            if wants_validation(request):
+                # 条件付き GET は検証用の集計クエリだけで 304 を返す
+                await cur.execute("SELECT COUNT(*), MAX(t.updated_at), SUM(t.task_id)" + query, params)
+                etag = make_etag(*await cur.fetchone())
+                if etag_matches(request, etag):
+                    return not_modified(etag)
+            await cur.execute(_TASK_COLUMNS + query + " ORDER BY t.task_id DESC", params)
+            rows = await cur.fetchall()
+            return json_response(rows_as_dicts(column_names(cur), rows), headers={"ETag": rows_etag(rows, 0, 11)})
+
+
+@app.get("/v1/tasks/page", response_model=TaskPageOut)
+async def list_tasks_page(
+    request: Request,
+    response: Response,
+    mine: bool = Query(default=True),
+    category: Optional[str] = Query(default=None),
+    status: Optional[str] = Query(default=None, regex="^(active|completed|paused|cancelled)$"),
+    sort: str = Query(default="id", regex="^(id|start_at|end_at|updated_at)$"),
+    order: str = Query(default="desc", regex="^(asc|desc)$"),
+    limit: int = Query(default=50, ge=1, le=MAX_TASKS_PER_PAGE),
+    cursor: Optional[str] = Query(default=None),
+    current_user_id: int = Depends(get_current_user_id),
+    token: str = Depends(get_auth_token),
+):
+    """タスク一覧を (sort 列, task_id) のキーセットでページングして取得
+    続きは next_cursor を cursor に渡す（sort / order はカーソルと同じものを指定する）
+    """
+    scope = await _task_scope(mine, category, status, current_user_id, token)
+    if scope is None:
+        etag = make_etag(0, None, 0)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return TaskPageOut(items=[], total=0)
+    query, where, params = scope
+    column = TASK_SORT_COLUMNS[sort]
+
+    async with get_conn() as conn:
+        async with conn.cursor() as cur:
+            # 総件数と ETag（範囲全体のバージョン）を1本の集計で取る
+            await cur.execute("SELECT COUNT(*), MAX(t.updated_at), SUM(t.task_id)" + query + _where(where), params)
+            total, max_updated_at, id_sum = await cur.fetchone()
+            etag = make_etag(total, max_updated_at, id_sum)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+            page_where = list(where)
+            page_params = list(params)
+            comparison = "<" if order == "desc" else ">"
+            if cursor is not None:
+                value, task_id = _decode_task_cursor(cursor, sort, order)
+                if sort == "id":
+                    page_where.append(f"t.task_id {comparison} %s")
+                    page_params.append(task_id)
                 else:
-                    # 権限のあるタスクがない場合は空を返す
-                    return []
-        except httpx.RequestError as e:
-            raise HTTPException(
-                status_code=502,
-                detail={"message": "user-service unavailable", "error": str(e)}
+                    page_where.append(f"({column}, t.task_id) {comparison} (%s, %s)")
+                    page_params.extend([value, task_id])
+            order_by = f" ORDER BY t.task_id {order}" if sort == "id" else f" ORDER BY {column} {order}, t.task_id {order}"
+            await cur.execute(
+                _TASK_COLUMNS + query + _where(page_where) + order_by + " LIMIT %s",
+                page_params + [limit + 1],
             )
-    
-    if category is not None:
-        where.append("category=%s")
-        params.append(category)
-    if status is not None:
-        where.append("status=%s")
-        params.append(status)
-    if where:
-        query += " WHERE " + " AND ".join(where)
-    query += " ORDER BY task_id DESC"
-
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            rows = cur.fetchall()
-            return [
-                TaskOut(
-                    task_id=r[0],
-                    created_by=r[1],
-                    task_name=r[2],
-                    task_content=r[3],
-                    start_at=r[4],
-                    end_at=r[5],
-                    category=r[6],
-                    target_time=r[7],
-                    comment=r[8],
-                    status=r[9],
-                    created_at=r[10],
-                    updated_at=r[11],
-                )
-                for r in rows
-            ]
+            rows = await cur.fetchall()
+            columns = column_names(cur)
+
+    # 1件多く取って続きの有無を判定
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_task_cursor(sort, order, rows[-1])
+    return json_response(
+        {"items": rows_as_dicts(columns, rows), "next_cursor": next_cursor, "total": total},
+        headers={"ETag": etag},
+    )
+
+
+def _encode_task_cursor(sort: str, order: str, row) -> str:
+    value = row[0] if sort == "id" else row[TASK_SORT_ROW_INDEX[sort]].isoformat()
+    raw = json.dumps([sort, order, value, row[0]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_task_cursor(cursor: str, sort: str, order: str):
+    try:
+        cursor_sort, cursor_order, value, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if (cursor_sort, cursor_order) != (sort, order):
+            raise ValueError("sort mismatch")
+        return (int(value) if sort == "id" else datetime.fromisoformat(value)), int(task_id)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail={"message": "invalid cursor"})
+
+
+@app.get("/v1/tasks/stats", response_model=TaskStatsOut)
+async def task_stats(
+    mine: bool = Query(default=True),
+    from_: Optional[date] = Query(default=None, alias="from"),  # 完了日の範囲（両端含む）
+    to: Optional[date] = Query(default=None, alias="to"),
+    current_user_id: int = Depends(get_current_user_id),
+    token: str = Depends(get_auth_token),
+):
+    """ステータス別の件数と、期間内に完了したタスク数を1回の集計クエリで返す"""
+    scope = await _task_scope(mine, None, None, current_user_id, token)
+    if scope is None:
+        return TaskStatsOut()
+    query, where, params = scope
+
+    # 完了期間の条件は FILTER 句に入る（SELECT 句なので JOIN / WHERE のパラメータより前に並べる）
+    completed = ["t.completed_at IS NOT NULL"]
+    completed_params: List = []
+    if from_ is not None:
+        completed.append("t.completed_at >= %s")
+        completed_params.append(from_)
+    if to is not None:
+        completed.append("t.completed_at < %s")
+        completed_params.append(to + timedelta(days=1))
+    query = (
+        f"SELECT t.status, COUNT(*), COUNT(*) FILTER (WHERE {' AND '.join(completed)})"
+        + query
+        + _where(where)
+        + " GROUP BY t.status"
+    )
+    params = completed_params + params
+
+    async with get_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, params)
+            rows = await cur.fetchall()
+
+    stats = TaskStatsOut()
+    for status, count, completed_in_range in rows:
+        stats.by_status[status] = count
+        stats.total += count
+        stats.completed_in_range += completed_in_range
+    return stats
 
 
 @app.post("/v1/tasks", response_model=TaskOut)
-def create_task(
+async def create_task(
     req: TaskIn, 
     current_user_id: int = Depends(get_current_user_id),
     token: str = Depends(get_auth_token)
 ):
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
+    async with get_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
                 (
-                    "INSERT INTO tasks (created_by, task_name, task_content, start_at, end_at, category, target_time, comment, status) "
-                    "VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s) "
-                    "RETURNING task_id, created_by, task_name, task_content, start_at, end_at, category, target_time, comment, status, created_at, updated_at"
+                    "INSERT INTO tasks (created_by, task_name, task_content, start_at, end_at, category, target_time, comment, status, completed_at) "
+                    "VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s, CASE WHEN %s = 'completed' THEN NOW() END) "
+                    "RETURNING task_id, created_by, task_name, task_content, start_at, end_at, category, target_time, comment, status, created_at, updated_at, completed_at"
                 ),
                 (
                     current_user_id,
@@ -191,33 +380,37 @@ def create_task(
                     req.target_time,
                     req.comment,
                     req.status,
+                    req.status,
                 ),
             )
-            r = cur.fetchone()
+            r = await cur.fetchone()
             task_id = r[0]
             
             # タスク作成後、作成者のtask_authをadminで作成
             try:
-                with httpx.Client(timeout=10.0) as client:
-                    auth_resp = client.post(
-                        f"{USER_SVC_BASE}/task_auths",
-                        json={
-                            "task_id": task_id,
-                            "user_id": current_user_id,
-                            "task_user_auth": "admin"
-                        },
-                        headers={"authorization": f"Bearer {token}"}
+                auth_resp = await user_client().post(
+                    "/task_auths",
+                    json={
+                        "task_id": task_id,
+                        "user_id": current_user_id,
+                        "task_user_auth": "admin"
+                    },
+                    headers={"authorization": f"Bearer {token}"}
+                )
+                if not auth_resp.is_success:
+                    # task_auth作成に失敗した場合、タスクを削除してロールバック
+                    await cur.execute("DELETE FROM tasks WHERE task_id=%s", (task_id,))
+                    raise HTTPException(
+                        status_code=502, 
+                        detail={"message": "failed to create task_auth", "error": auth_resp.text}
                     )
-                    if not auth_resp.is_success:
-                        # task_auth作成に失敗した場合、タスクを削除してロールバック
-                        cur.execute("DELETE FROM tasks WHERE task_id=%s", (task_id,))
-                        raise HTTPException(
-                            status_code=502, 
-                            detail={"message": "failed to create task_auth", "error": auth_resp.text}
-                        )
+                # 新しいタスクの権限が見えるよう、作成者の権限キャッシュを破棄
+                task_auth_cache.invalidate(current_user_id)
+                # レプリカにも即時反映（変更フィードの到着を待たずに一覧へ出す）
+                await task_auth_replica.upsert_local(auth_resp.json())
             except httpx.RequestError as e:
                 # user-serviceに到達できない場合、タスクを削除してロールバック
-                cur.execute("DELETE FROM tasks WHERE task_id=%s", (task_id,))
+                await cur.execute("DELETE FROM tasks WHERE task_id=%s", (task_id,))
                 raise HTTPException(
                     status_code=502, 
                     detail={"message": "user-service unavailable", "error": str(e)}
@@ -236,31 +429,38 @@ def create_task(
                 status=r[9],
                 created_at=r[10],
                 updated_at=r[11],
+                completed_at=r[12],
             )
 
 
 @app.get("/v1/tasks/{task_id}", response_model=TaskOut)
-def get_task(
+async def get_task(
     task_id: int, 
+    request: Request,
+    response: Response,
     current_user_id: int = Depends(get_current_user_id),
     token: str = Depends(get_auth_token)
 ):
     # アクセス権チェック
-    if not check_task_permission(task_id, current_user_id, token):
+    if not await check_task_permission(task_id, current_user_id, token):
         raise HTTPException(status_code=404, detail={"message": "task not found"})
     
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
+    async with get_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
                 (
-                    "SELECT task_id, created_by, task_name, task_content, start_at, end_at, category, target_time, comment, status, created_at, updated_at "
+                    "SELECT task_id, created_by, task_name, task_content, start_at, end_at, category, target_time, comment, status, created_at, updated_at, completed_at "
                     "FROM tasks WHERE task_id=%s"
                 ),
                 (task_id,),
             )
-            r = cur.fetchone()
+            r = await cur.fetchone()
             if r is None:
                 raise HTTPException(status_code=404, detail={"message": "task not found"})
+            etag = rows_etag([r], 0, 11)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            response.headers["ETag"] = etag
             return TaskOut(
                 task_id=r[0],
                 created_by=r[1],
@@ -274,18 +474,19 @@ def get_task(
                 status=r[9],
                 created_at=r[10],
                 updated_at=r[11],
+                completed_at=r[12],
             )
 
 
 @app.patch("/v1/tasks/{task_id}", response_model=TaskOut)
-def update_task(
+async def update_task(
     task_id: int, 
     req: TaskUpdate, 
     current_user_id: int = Depends(get_current_user_id),
     token: str = Depends(get_auth_token)
 ):
     # アクセス権チェック
-    if not check_task_permission(task_id, current_user_id, token):
+    if not await check_task_permission(task_id, current_user_id, token):
         raise HTTPException(status_code=404, detail={"message": "task not found"})
     
     fields = []
@@ -305,24 +506,28 @@ def update_task(
             params.append(val)
     if not fields:
         raise HTTPException(status_code=400, detail={"message": "no fields to update"})
+    if req.status is not None:
+        # 完了日時は completed への遷移時に記録し、完了のまま他項目を編集しても変えない。完了以外に戻したら消す
+        fields.append("completed_at = CASE WHEN %s = 'completed' THEN COALESCE(completed_at, NOW()) ELSE NULL END")
+        params.append(req.status)
     params.append(task_id)
 
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
+    async with get_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
                 f"UPDATE tasks SET {', '.join(fields)}, updated_at=NOW() WHERE task_id=%s",
                 params,
             )
             if cur.rowcount == 0:
                 raise HTTPException(status_code=404, detail={"message": "task not found"})
-            cur.execute(
+            await cur.execute(
                 (
-                    "SELECT task_id, created_by, task_name, task_content, start_at, end_at, category, target_time, comment, status, created_at, updated_at "
+                    "SELECT task_id, created_by, task_name, task_content, start_at, end_at, category, target_time, comment, status, created_at, updated_at, completed_at "
                     "FROM tasks WHERE task_id=%s"
                 ),
                 (task_id,),
             )
-            r = cur.fetchone()
+            r = await cur.fetchone()
             return TaskOut(
                 task_id=r[0],
                 created_by=r[1],
@@ -336,23 +541,24 @@ def update_task(
                 status=r[9],
                 created_at=r[10],
                 updated_at=r[11],
+                completed_at=r[12],
             )
 
 
 @app.delete("/v1/tasks/{task_id}")
-def delete_task(
+async def delete_task(
     task_id: int, 
     current_user_id: int = Depends(get_current_user_id),
     token: str = Depends(get_auth_token)
 ):
     # アクセス権チェック
-    if not check_task_permission(task_id, current_user_id, token):
+    if not await check_task_permission(task_id, current_user_id, token):
         raise HTTPException(status_code=404, detail={"message": "task not found"})
     
-    with get_conn() as conn:
-        with conn.cursor() as cur:
+    async with get_conn() as conn:
+        async with conn.cursor() as cur:
             # 関連(daily_plans)は外部キーでON DELETE CASCADEを採用
-            cur.execute("DELETE FROM tasks WHERE task_id=%s", (task_id,))
+            await cur.execute("DELETE FROM tasks WHERE task_id=%s", (task_id,))
             if cur.rowcount == 0:
                 raise HTTPException(status_code=404, detail={"message": "task not found"})
     return {"ok": True}
@@ -360,70 +566,114 @@ def delete_task(
 
 # Daily Plans
 @app.get("/v1/tasks/{task_id}/daily_plans", response_model=List[DailyPlanOut])
-def get_daily_plans(
+async def get_daily_plans(
     task_id: int,
+    request: Request,
+    response: Response,
     from_: Optional[date] = Query(default=None, alias="from"),
     to: Optional[date] = None,
     current_user_id: int = Depends(get_current_user_id),
     token: str = Depends(get_auth_token),
 ):
     # アクセス権チェック
-    if not check_task_permission(task_id, current_user_id, token):
+    if not await check_task_permission(task_id, current_user_id, token):
         raise HTTPException(status_code=404, detail={"message": "task not found"})
     
-    with get_conn() as conn:
-        with conn.cursor() as cur:
+    async with get_conn() as conn:
+        async with conn.cursor() as cur:
+            query = " FROM daily_plans WHERE task_id=%s"
+            params: List = [task_id]
+            if from_ is not None:
+                query += " AND target_date >= %s"
+                params.append(from_)
+            if to is not None:
+                query += " AND target_date <= %s"
+                params.append(to)
+            if wants_validation(request):
+                await cur.execute("SELECT COUNT(*), MAX(updated_at), SUM(daily_time_plan_id)" + query, params)
+                etag = make_etag(*await cur.fetchone())
+                if etag_matches(request, etag):
+                    return not_modified(etag)
+            await cur.execute(
+                "SELECT daily_time_plan_id, task_id, created_by, target_date, work_plan_value, time_plan_value, created_at, updated_at"
+                + query
+                + " ORDER BY target_date ASC",
+                params,
+            )
+            rows = await cur.fetchall()
+            return json_response(rows_as_dicts(column_names(cur), rows), headers={"ETag": rows_etag(rows, 0, 7)})
+
+
+@app.get("/v1/daily_plans", response_model=Dict[int, List[DailyPlanOut]])
+async def get_daily_plans_for_tasks(
+    task_ids: List[int] = Query(..., max_length=MAX_DAILY_PLAN_TASK_IDS),
+    from_: Optional[date] = Query(default=None, alias="from"),
+    to: Optional[date] = None,
+    current_user_id: int = Depends(get_current_user_id),
+    token: str = Depends(get_auth_token),
+):
+    """複数タスクの日次計画を task_id ごとにまとめて取得（1クエリ）"""
+    task_ids = list(dict.fromkeys(task_ids))
+
+    async with get_conn() as conn:
+        async with conn.cursor() as cur:
+            # アクセス権チェック（権限のない task_id は結果に含めない）
+            if task_auth_replica.replica_state.ready:
+                await cur.execute(
+                    "SELECT task_id FROM task_auths WHERE user_id = %s AND task_id = ANY(%s)",
+                    (current_user_id, task_ids),
+                )
+                authorized = {r[0] for r in await cur.fetchall()}
+            else:
+                authorized = set(await get_task_roles(current_user_id, token))
+            task_ids = [task_id for task_id in task_ids if task_id in authorized]
+            if not task_ids:
+                return {}
+
             query = (
                 "SELECT daily_time_plan_id, task_id, created_by, target_date, work_plan_value, time_plan_value, created_at, updated_at "
-                "FROM daily_plans WHERE task_id=%s"
+                "FROM daily_plans WHERE task_id = ANY(%s)"
             )
-            params: List = [task_id]
+            params: List = [task_ids]
             if from_ is not None:
                 query += " AND target_date >= %s"
                 params.append(from_)
             if to is not None:
                 query += " AND target_date <= %s"
                 params.append(to)
-            query += " ORDER BY target_date ASC"
-            cur.execute(query, params)
-            rows = cur.fetchall()
-            return [
-                DailyPlanOut(
-                    daily_time_plan_id=r[0],
-                    task_id=r[1],
-                    created_by=r[2],
-                    target_date=r[3],
-                    work_plan_value=r[4],
-                    time_plan_value=r[5],
-                    created_at=r[6],
-                    updated_at=r[7],
-                )
-                for r in rows
-            ]
+            query += " ORDER BY task_id ASC, target_date ASC"
+            await cur.execute(query, params)
+            rows = await cur.fetchall()
+            columns = column_names(cur)
+
+    # 計画がないタスクも空リストで返す
+    grouped: Dict[int, List[dict]] = {task_id: [] for task_id in task_ids}
+    for r in rows:
+        grouped[r[1]].append(dict(zip(columns, r)))
+    return json_response(grouped)
 
 
 @app.put("/v1/tasks/{task_id}/daily_plans/bulk")
-def put_daily_plans_bulk(
+async def put_daily_plans_bulk(
     task_id: int,
     items: List[DailyPlanBulkItem],
     current_user_id: int = Depends(get_current_user_id),
     token: str = Depends(get_auth_token),
 ):
     # アクセス権チェック
-    if not check_task_permission(task_id, current_user_id, token):
+    if not await check_task_permission(task_id, current_user_id, token):
         raise HTTPException(status_code=404, detail={"message": "task not found"})
     
     # 仕様: Σ(work_plan_value)=100, Σ(time_plan_value)=tasks.target_time
-    with get_conn() as conn:
+    async with get_conn() as conn:
         # 差分適用を原子的に行いたいのでトランザクションを明示管理
-        conn.autocommit = False
-        try:
-            with conn.cursor() as cur:
+        # （プール接続は autocommit のまま返却したいので transaction() ブロックを使う）
+        async with conn.transaction():
+            async with conn.cursor() as cur:
                 # タスクの目標時間を取得
-                cur.execute("SELECT target_time FROM tasks WHERE task_id=%s", (task_id,))
-                r = cur.fetchone()
+                await cur.execute("SELECT target_time FROM tasks WHERE task_id=%s", (task_id,))
+                r = await cur.fetchone()
                 if r is None:
-                    conn.rollback()
                     raise HTTPException(status_code=404, detail={"message": "task not found"})
                 target_time = int(r[0])
 
@@ -431,7 +681,6 @@ def put_daily_plans_bulk(
                 max_work = max(i.work_plan_value for i in items) if items else 0
                 sum_time = sum(i.time_plan_value for i in items)
                 if max_work != 100 or sum_time != target_time:
-                    conn.rollback()
                     raise HTTPException(
                         status_code=400,
                         detail={
@@ -440,64 +689,45 @@ def put_daily_plans_bulk(
                         },
                     )
 
-                # 既存レコードを取得（target_dateをキーに差分判定）
-                cur.execute(
+                # 入力の辞書化（同じ日付が複数あれば後勝ち）
+                incoming_map = {i.target_date: i for i in items}
+                dates = list(incoming_map.keys())
+
+                # 1) UPSERT: 全日付を1文で反映（値が変わらない行は更新しない）
+                await cur.execute(
+                    """
+                    INSERT INTO daily_plans (task_id, created_by, target_date, work_plan_value, time_plan_value)
+                    SELECT %s, %s, u.target_date, u.work_plan_value, u.time_plan_value
+                    FROM unnest(%s::date[], %s::int[], %s::int[]) AS u(target_date, work_plan_value, time_plan_value)
+                    ON CONFLICT (task_id, target_date) DO UPDATE
+                    SET work_plan_value = EXCLUDED.work_plan_value,
+                        time_plan_value = EXCLUDED.time_plan_value,
+                        updated_at = NOW()
+                    WHERE (daily_plans.work_plan_value, daily_plans.time_plan_value)
+                          IS DISTINCT FROM (EXCLUDED.work_plan_value, EXCLUDED.time_plan_value)
+                    """,
                     (
-                        "SELECT target_date, daily_time_plan_id FROM daily_plans "
-                        "WHERE task_id=%s ORDER BY target_date ASC"
+                        task_id,
+                        current_user_id,
+                        dates,
+                        [incoming_map[d].work_plan_value for d in dates],
+                        [incoming_map[d].time_plan_value for d in dates],
                     ),
-                    (task_id,),
                 )
-                rows = cur.fetchall()
-                existing_dates = {row[0] for row in rows}
-
-                # 入力の辞書化（target_date -> item）
-                incoming_map = {i.target_date: i for i in items}
-                incoming_dates = set(incoming_map.keys())
-
-                # 1) UPDATE/INSERT
-                for td, it in incoming_map.items():
-                    if td in existing_dates:
-                        # 値更新（ID維持）。updated_atはDB側トリガ or NOW() 更新のいずれか。
-                        cur.execute(
-                            (
-                                "UPDATE daily_plans SET work_plan_value=%s, time_plan_value=%s, updated_at=NOW() "
-                                "WHERE task_id=%s AND target_date=%s"
-                            ),
-                            (it.work_plan_value, it.time_plan_value, task_id, td),
-                        )
-                    else:
-                        # 新規挿入
-                        cur.execute(
-                            (
-                                "INSERT INTO daily_plans (task_id, created_by, target_date, work_plan_value, time_plan_value) "
-                                "VALUES (%s,%s,%s,%s,%s)"
-                            ),
-                            (task_id, current_user_id, it.target_date, it.work_plan_value, it.time_plan_value),
-                        )
 
                 # 2) PRUNE: 新配列に無い既存日付を削除
-                to_delete = existing_dates - incoming_dates
-                if to_delete:
-                    # ここで records がある日付の扱いをポリシー化する場合は除外や事前検証を挟む
-                    # 今は単純に削除する（将来拡張余地）
-                    # IN 句用にタプル化
-                    cur.execute(
-                        (
-                            "DELETE FROM daily_plans WHERE task_id=%s AND target_date = ANY(%s)"
-                        ),
-                        (task_id, list(to_delete)),
-                    )
+                # ここで records がある日付の扱いをポリシー化する場合は除外や事前検証を挟む
+                await cur.execute(
+                    "DELETE FROM daily_plans WHERE task_id=%s AND target_date <> ALL(%s::date[])",
+                    (task_id, dates),
+                )
+                pruned = cur.rowcount
 
-            conn.commit()
-            return {"ok": True, "upserted": len(items), "pruned": len(to_delete)}
-        except Exception:
-            conn.rollback()
-            raise
+        return {"ok": True, "upserted": len(incoming_map), "pruned": pruned}
 
 
 @app.get("/v1/daily_plans/latest_progress")
-def get_latest_progress(
+async def get_latest_progress(
     task_id: int = Query(...),
     current_user_id: int = Depends(get_current_user_id)
 ):
@@ -509,10 +739,10 @@ def get_latest_progress(
         ORDER BY target_date DESC
         LIMIT 1
     """
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(query, [task_id, current_user_id])
-            row = cur.fetchone()
+    async with get_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, [task_id, current_user_id])
+            row = await cur.fetchone()
             if row:
                 return {
                     "task_id": task_id,
@@ -522,58 +752,76 @@ def get_latest_progress(
             return {"task_id": task_id, "work_plan_value": 0, "target_date": None}
 
 
+@app.get("/v1/daily_plans/latest_progress/batch")
+async def get_latest_progress_batch(
+    task_ids: List[int] = Query(..., max_length=MAX_DAILY_PLAN_TASK_IDS),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """複数タスクの最新計画進捗を1クエリで取得（今日時点）。計画がないタスクは 0 を返す"""
+    task_ids = list(dict.fromkeys(task_ids))
+    query = """
+        SELECT DISTINCT ON (task_id) task_id, work_plan_value, target_date
+        FROM daily_plans
+        WHERE task_id = ANY(%s) AND created_by = %s AND target_date <= CURRENT_DATE
+        ORDER BY task_id, target_date DESC
+    """
+    async with get_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, [task_ids, current_user_id])
+            latest = {r[0]: r for r in await cur.fetchall()}
+    return [
+        {
+            "task_id": task_id,
+            "work_plan_value": int(latest[task_id][1]) if task_id in latest and latest[task_id][1] else 0,
+            "target_date": str(latest[task_id][2]) if task_id in latest else None,
+        }
+        for task_id in task_ids
+    ]
+
+
 @app.get("/v1/daily_plans/aggregate")
-def aggregate_daily_plans(
+async def aggregate_daily_plans(
     from_: Optional[date] = Query(default=None, alias="from"),
     to: Optional[date] = Query(default=None, alias="to"),
     current_user_id: int = Depends(get_current_user_id),
     token: str = Depends(get_auth_token)
 ):
     """全タスクの日次計画を集計（ダッシュボード用）"""
-    # user-serviceから権限のあるtask_idリストを取得
-    try:
-        with httpx.Client(timeout=10.0) as client:
-            auth_resp = client.get(
-                f"{USER_SVC_BASE}/task_auths",
-                headers={"authorization": f"Bearer {token}"}
-            )
-            if not auth_resp.is_success:
-                raise HTTPException(
-                    status_code=502,
-                    detail={"message": "failed to get task_auths", "error": auth_resp.text}
-                )
-            task_auths = auth_resp.json()
-            authorized_task_ids = [auth["task_id"] for auth in task_auths]
-            
-            if not authorized_task_ids:
-                return []
-    except httpx.RequestError as e:
-        raise HTTPException(
-            status_code=502,
-            detail={"message": "user-service unavailable", "error": str(e)}
-        )
-    
+    if task_auth_replica.replica_state.ready:
+        # ローカルの task_auths レプリカと JOIN して集計（user-service への問い合わせなし）
+        query = """
+            SELECT dp.target_date, SUM(dp.time_plan_value) as total_time_plan
+            FROM daily_plans dp
+            JOIN task_auths a ON a.task_id = dp.task_id AND a.user_id = %s
+            WHERE TRUE
+        """
+        params: List = [current_user_id]
+    else:
+        # レプリカ未同期の間は権限のあるtask_idリストで絞り込む（権限キャッシュ経由）
+        authorized_task_ids = list(await get_task_roles(current_user_id, token))
+        if not authorized_task_ids:
+            return []
+        query = """
+            SELECT dp.target_date, SUM(dp.time_plan_value) as total_time_plan
+            FROM daily_plans dp
+            WHERE dp.task_id = ANY(%s)
+        """
+        params = [authorized_task_ids]
+
+    if from_ is not None:
+        query += " AND dp.target_date >= %s"
+        params.append(from_)
+    if to is not None:
+        query += " AND dp.target_date <= %s"
+        params.append(to)
+
+    query += " GROUP BY dp.target_date ORDER BY dp.target_date ASC"
+
     # daily_plansを日付ごとに集計
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            query = """
-                SELECT target_date, SUM(time_plan_value) as total_time_plan
-                FROM daily_plans
-                WHERE task_id = ANY(%s)
-            """
-            params: List = [authorized_task_ids]
-            
-            if from_ is not None:
-                query += " AND target_date >= %s"
-                params.append(from_)
-            if to is not None:
-                query += " AND target_date <= %s"
-                params.append(to)
-            
-            query += " GROUP BY target_date ORDER BY target_date ASC"
-            
-            cur.execute(query, params)
-            rows = cur.fetchall()
+    async with get_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, params)
+            rows = await cur.fetchall()
             
             return [
                 {
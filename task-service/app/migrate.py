@@ -0,0 +1,124 @@
+# サービス間で同一内容のコピー（各サービスのイメージは自分のディレクトリだけをビルドするため）。
+# 変更は全コピーに同じように入れる（tests/test_shared_modules.py で一致を検査）
+"""スキーマのマイグレーション
+
+app/migrations/NNN_name.sql を番号順に適用し、適用済みのバージョンを schema_migrations に記録する。
+起動時(lifespan)に自動適用されるほか、CLI からも実行できる:
+
+    python -m app.migrate            # 未適用のマイグレーションを適用
+    python -m app.migrate --status   # 適用状況を表示
+    python -m app.migrate --check-plans  # ホットクエリの実行計画を検査（Seq Scan があれば終了コード1）
+"""
+import argparse
+import logging
+import os
+import re
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+import psycopg
+
+from app.db import DB_CONNINFO
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+RUN_MIGRATIONS = os.getenv("RUN_MIGRATIONS", "true").lower() == "true"  # 起動時に適用するか
+
+# 複数ワーカーが同時に起動しても1つずつ適用するための advisory lock キー
+MIGRATION_LOCK_KEY = 7_020_000
+
+_FILENAME_RE = re.compile(r"^(\d{3})_(\w+)\.sql$")
+
+
+def load_migrations() -> List[Tuple[str, str, Path]]:
+    """(version, name, path) を番号順に返す"""
+    migrations = []
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        m = _FILENAME_RE.match(path.name)
+        if m is None:
+            raise RuntimeError(f"invalid migration filename: {path.name}")
+        migrations.append((m.group(1), m.group(2), path))
+    versions = [v for v, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("duplicate migration version")
+    return migrations
+
+
+def _ensure_table(conn: psycopg.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+          version VARCHAR(16) PRIMARY KEY,
+          name VARCHAR(255) NOT NULL,
+          applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+        """
+    )
+
+
+def _applied_versions(conn: psycopg.Connection) -> set:
+    return {r[0] for r in conn.execute("SELECT version FROM schema_migrations").fetchall()}
+
+
+def apply_migrations() -> List[str]:
+    """未適用のマイグレーションを1つずつトランザクション内で適用し、適用したバージョンを返す"""
+    applied: List[str] = []
+    with psycopg.connect(DB_CONNINFO, autocommit=True) as conn:
+        conn.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+        try:
+            _ensure_table(conn)
+            done = _applied_versions(conn)
+            for version, name, path in load_migrations():
+                if version in done:
+                    continue
+                with conn.transaction():
+                    conn.execute(path.read_text(encoding="utf-8"))
+                    conn.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                        (version, name),
+                    )
+                logger.info("applied migration %s_%s", version, name)
+                applied.append(version)
+        finally:
+            conn.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+    return applied
+
+
+def migration_status() -> List[Tuple[str, str, bool]]:
+    """(version, name, applied) の一覧"""
+    with psycopg.connect(DB_CONNINFO, autocommit=True) as conn:
+        _ensure_table(conn)
+        done = _applied_versions(conn)
+    return [(version, name, version in done) for version, name, _ in load_migrations()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.migrate")
+    parser.add_argument("--status", action="store_true", help="適用状況を表示する")
+    parser.add_argument("--check-plans", action="store_true", help="ホットクエリの実行計画を検査する")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.status:
+        for version, name, applied in migration_status():
+            print(f"{version}_{name}: {'applied' if applied else 'pending'}")
+        return 0
+
+    if args.check_plans:
+        from app.plan_check import check_plans
+
+        failures = check_plans()
+        for failure in failures:
+            print(f"NG {failure}")
+        print("plan check: " + ("failed" if failures else "ok"))
+        return 1 if failures else 0
+
+    applied = apply_migrations()
+    print(f"applied {len(applied)} migration(s)" + (f": {', '.join(applied)}" if applied else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+-- 001: user-service の task_auths レプリカと同期位置
+
+-- user-service の task_auths のレプリカ（user-service の変更フィードから同期）
+CREATE TABLE IF NOT EXISTS task_auths (
+  task_auth_id INTEGER PRIMARY KEY, -- user-service 側の task_auth_id をそのまま使う
+  task_id INTEGER NOT NULL,
+  user_id INTEGER NOT NULL,
+  task_user_auth VARCHAR(16) NOT NULL, -- read/write/admin
+  synced_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- レプリカの同期位置（1行のみ）。last_change_id が NULL の間は未同期
+CREATE TABLE IF NOT EXISTS task_auth_sync_state (
+  id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+  last_change_id BIGINT NULL,
+  synced_at TIMESTAMPTZ NULL
+);
+
+INSERT INTO task_auth_sync_state (id) VALUES (1) ON CONFLICT DO NOTHING;
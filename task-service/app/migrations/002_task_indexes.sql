@@ -0,0 +1,17 @@
+-- 002: tasks / daily_plans / task_auths レプリカの検索用インデックスと一意制約
+
+-- daily_plans は (task_id, target_date) で1行。既存の重複は最も新しい行を残して削除
+DELETE FROM daily_plans a
+USING daily_plans b
+WHERE a.task_id = b.task_id
+  AND a.target_date = b.target_date
+  AND a.daily_time_plan_id < b.daily_time_plan_id;
+
+-- タスク単位の期間取得・複数タスク一括取得・最新計画進捗（target_date 降順）
+CREATE UNIQUE INDEX IF NOT EXISTS uq_daily_plans_task_id_target_date ON daily_plans(task_id, target_date);
+
+-- ユーザーがアクセスできるタスクの絞り込み（一覧・集計の JOIN）
+CREATE INDEX IF NOT EXISTS idx_task_auths_user_id_task_id ON task_auths(user_id, task_id);
+
+-- 作成者単位の検索
+CREATE INDEX IF NOT EXISTS idx_tasks_created_by ON tasks(created_by);
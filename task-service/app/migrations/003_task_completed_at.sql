@@ -0,0 +1,6 @@
+-- 003: タスクの完了日時（updated_at は任意の編集で変わるため、完了への遷移時刻を別に持つ）
+
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS completed_at TIMESTAMPTZ NULL;
+
+-- 既存の完了タスクは最終更新日時を完了日時とみなす
+UPDATE tasks SET completed_at = updated_at WHERE status = 'completed' AND completed_at IS NULL;
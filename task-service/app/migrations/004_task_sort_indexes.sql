@@ -0,0 +1,6 @@
+-- 004: タスク一覧の並べ替え用インデックス（GET /v1/tasks/page のキーセットページング）
+
+-- (並べ替え列, task_id) の順で読み進める。降順は同じインデックスを逆向きにたどる
+CREATE INDEX IF NOT EXISTS idx_tasks_start_at_task_id ON tasks(start_at, task_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_end_at_task_id ON tasks(end_at, task_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_updated_at_task_id ON tasks(updated_at, task_id);
@@ -0,0 +1,136 @@
+"""ホットクエリの実行計画チェック
+
+大きめのダミーデータを投入した状態で各ホットクエリを EXPLAIN し、対象テーブルに Seq Scan が
+出ていれば失敗とする。投入したデータはトランザクションごとロールバックするので残らない。
+マイグレーション適用後の DB に対して `python -m app.migrate --check-plans` で実行する。
+"""
+import os
+from typing import Dict, List
+
+import psycopg
+
+from app.db import DB_CONNINFO
+
+PLAN_CHECK_ROWS = int(os.getenv("PLAN_CHECK_ROWS", "50000"))  # 投入する daily_plans の件数
+
+# 既存データと衝突しない ID 帯を明示して使う（ロールバックしてもシーケンスを消費しないため）
+_BASE = 1_000_000_000
+_USER_ID = _BASE + 1
+_TASK_ID = _BASE + 1
+
+CHECKED_TABLES = {"tasks", "daily_plans", "task_auths"}
+
+# タスクは PLAN_CHECK_ROWS/10 件（1タスク10日分の計画）、ユーザー500人に均等に権限を付与
+SEED_SQL = [
+    """
+    INSERT INTO tasks (task_id, created_by, task_name, task_content, start_at, end_at, category, target_time)
+    SELECT %(base)s + g, %(base)s + (g %% 500) + 1, 'plan check', '', NOW(), NOW() + INTERVAL '10 day', 'other', 600
+    FROM generate_series(1, %(rows)s / 10) AS g
+    """,
+    """
+    INSERT INTO daily_plans (daily_time_plan_id, task_id, created_by, target_date, work_plan_value, time_plan_value)
+    SELECT %(base)s + g, %(base)s + (g %% (%(rows)s / 10)) + 1, %(base)s + 1, CURRENT_DATE - (g / (%(rows)s / 10)), 10, 60
+    FROM generate_series(0, %(rows)s - 1) AS g
+    """,
+    """
+    INSERT INTO task_auths (task_auth_id, task_id, user_id, task_user_auth)
+    SELECT %(base)s + g, %(base)s + g, %(base)s + (g %% 500) + 1, 'admin'
+    FROM generate_series(1, %(rows)s / 10) AS g
+    """,
+    "ANALYZE tasks",
+    "ANALYZE daily_plans",
+    "ANALYZE task_auths",
+]
+
+# name -> SQL（app/main.py の主要クエリと同じ形）
+HOT_QUERIES: Dict[str, str] = {
+    "list_tasks_mine": f"""
+        SELECT t.task_id, t.created_by, t.task_name, t.task_content, t.start_at, t.end_at,
+               t.category, t.target_time, t.comment, t.status, t.created_at, t.updated_at, t.completed_at
+        FROM tasks t
+        JOIN task_auths a ON a.task_id = t.task_id AND a.user_id = {_USER_ID}
+        ORDER BY t.task_id DESC
+    """,
+    "list_tasks_page_total": f"""
+        SELECT COUNT(*), MAX(t.updated_at), SUM(t.task_id)
+        FROM tasks t
+        JOIN task_auths a ON a.task_id = t.task_id AND a.user_id = {_USER_ID}
+    """,
+    "list_tasks_page_start_at": f"""
+        SELECT t.task_id, t.created_by, t.task_name, t.task_content, t.start_at, t.end_at,
+               t.category, t.target_time, t.comment, t.status, t.created_at, t.updated_at, t.completed_at
+        FROM tasks t
+        JOIN task_auths a ON a.task_id = t.task_id AND a.user_id = {_USER_ID}
+        WHERE (t.start_at, t.task_id) < (NOW(), {_BASE + 2500})
+        ORDER BY t.start_at DESC, t.task_id DESC LIMIT 51
+    """,
+    "list_tasks_page_updated_at_all": f"""
+        SELECT t.task_id, t.created_by, t.task_name, t.task_content, t.start_at, t.end_at,
+               t.category, t.target_time, t.comment, t.status, t.created_at, t.updated_at, t.completed_at
+        FROM tasks t
+        WHERE (t.updated_at, t.task_id) > (NOW() - INTERVAL '1 day', {_BASE + 2500})
+        ORDER BY t.updated_at ASC, t.task_id ASC LIMIT 51
+    """,
+    "daily_plans_by_task": f"""
+        SELECT daily_time_plan_id, task_id, created_by, target_date, work_plan_value, time_plan_value, created_at, updated_at
+        FROM daily_plans WHERE task_id = {_TASK_ID} AND target_date >= CURRENT_DATE - 30
+        ORDER BY target_date ASC
+    """,
+    "daily_plans_for_tasks": f"""
+        SELECT daily_time_plan_id, task_id, created_by, target_date, work_plan_value, time_plan_value, created_at, updated_at
+        FROM daily_plans WHERE task_id = ANY(ARRAY[{_TASK_ID}, {_TASK_ID + 500}])
+        ORDER BY task_id ASC, target_date ASC
+    """,
+    "latest_plan_progress": f"""
+        SELECT work_plan_value, target_date
+        FROM daily_plans
+        WHERE task_id = {_TASK_ID} AND created_by = {_USER_ID} AND target_date <= CURRENT_DATE
+        ORDER BY target_date DESC
+        LIMIT 1
+    """,
+    "latest_plan_progress_batch": f"""
+        SELECT DISTINCT ON (task_id) task_id, work_plan_value, target_date
+        FROM daily_plans
+        WHERE task_id = ANY(ARRAY[{_TASK_ID}, {_TASK_ID + 500}]) AND created_by = {_USER_ID} AND target_date <= CURRENT_DATE
+        ORDER BY task_id, target_date DESC
+    """,
+    "task_stats_mine": f"""
+        SELECT t.status, COUNT(*),
+               COUNT(*) FILTER (WHERE t.completed_at IS NOT NULL AND t.completed_at >= date_trunc('month', NOW()))
+        FROM tasks t
+        JOIN task_auths a ON a.task_id = t.task_id AND a.user_id = {_USER_ID}
+        GROUP BY t.status
+    """,
+    "aggregate_daily_plans": f"""
+        SELECT dp.target_date, SUM(dp.time_plan_value) as total_time_plan
+        FROM daily_plans dp
+        JOIN task_auths a ON a.task_id = dp.task_id AND a.user_id = {_USER_ID}
+        GROUP BY dp.target_date ORDER BY dp.target_date ASC
+    """,
+}
+
+
+def _seq_scans(node: dict) -> List[str]:
+    found = []
+    if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in CHECKED_TABLES:
+        found.append(node["Relation Name"])
+    for child in node.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def check_plans() -> List[str]:
+    """Seq Scan になったクエリを "name: 理由" のリストで返す（空なら OK）"""
+    failures = []
+    with psycopg.connect(DB_CONNINFO) as conn:
+        with conn.transaction(force_rollback=True):
+            with conn.cursor() as cur:
+                for sql in SEED_SQL:
+                    cur.execute(sql, {"base": _BASE, "rows": PLAN_CHECK_ROWS} if "%(" in sql else None)
+                for name, query in HOT_QUERIES.items():
+                    cur.execute("EXPLAIN (FORMAT JSON) " + query)
+                    plan = cur.fetchone()[0][0]["Plan"]
+                    scans = _seq_scans(plan)
+                    if scans:
+                        failures.append(f"{name}: Seq Scan on {', '.join(sorted(set(scans)))}")
+    return failures
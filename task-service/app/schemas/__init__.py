@@ -1,7 +1,10 @@
 from .tasks import (
     TaskIn,
     TaskOut,
+    TaskPageOut,
+    TaskStatsOut,
     TaskUpdate,
     DailyPlanOut,
     DailyPlanBulkItem,
+    TaskAuthCacheInvalidation,
 )
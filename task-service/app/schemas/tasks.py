@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime, date
 
 
@@ -38,6 +38,21 @@ class TaskOut(BaseModel):
     status: str
     created_at: datetime
     updated_at: datetime
+    completed_at: Optional[datetime] = None  # completed に遷移した日時（完了以外は None）
+
+
+class TaskPageOut(BaseModel):
+    items: List[TaskOut]
+    next_cursor: Optional[str] = None
+    total: int  # フィルタ条件に一致する全件数
+
+
+class TaskStatsOut(BaseModel):
+    total: int = 0
+    by_status: Dict[str, int] = Field(
+        default_factory=lambda: {"active": 0, "completed": 0, "paused": 0, "cancelled": 0}
+    )
+    completed_in_range: int = 0  # 指定期間内に完了したタスク数
 
 
 class DailyPlanOut(BaseModel):
@@ -59,3 +74,8 @@ class DailyPlanBulkItem(BaseModel):
 
 class DailyPlanBulkIn(BaseModel):
     items: List[DailyPlanBulkItem]
+
+
+class TaskAuthCacheInvalidation(BaseModel):
+    # None の場合はキャッシュ全体を破棄
+    user_ids: Optional[List[int]] = None
@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from app.auth import INTERNAL_API_TOKEN
+from app.auth_cache import task_auth_cache
+from app.clients import user_client
+from app.db import get_conn
+
+logger = logging.getLogger(__name__)
+
+# レプリカ同期設定
+TASK_AUTH_SYNC_INTERVAL = float(os.getenv("TASK_AUTH_SYNC_INTERVAL", "5"))  # ポーリング間隔（秒）
+TASK_AUTH_SYNC_BATCH = int(os.getenv("TASK_AUTH_SYNC_BATCH", "1000"))  # 変更フィード1回の取得件数
+TASK_AUTH_SNAPSHOT_BATCH = int(os.getenv("TASK_AUTH_SNAPSHOT_BATCH", "5000"))  # 再同期時の1ページ件数
+
+# 複数ワーカーが同時に同期しないための advisory lock キー
+SYNC_LOCK_KEY = 7_020_001
+
+_INTERNAL_HEADERS = {"x-internal-token": INTERNAL_API_TOKEN}
+
+
+class ReplicaState:
+    def __init__(self):
+        self.ready = False  # 一度でも全件同期が済んでいれば True（一覧・集計で JOIN を使える）
+        self.last_change_id: Optional[int] = None
+        self.last_synced_at: Optional[datetime] = None
+        self.applied_changes = 0
+        self.resyncs = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.cache_evicted_through: Optional[int] = None  # このプロセスの権限キャッシュへ反映済みの change_id
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "last_change_id": self.last_change_id,
+            "last_synced_at": self.last_synced_at.isoformat() if self.last_synced_at else None,
+            "applied_changes": self.applied_changes,
+            "resyncs": self.resyncs,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "cache_evicted_through": self.cache_evicted_through,
+        }
+
+
+replica_state = ReplicaState()
+_wakeup = asyncio.Event()
+_force_resync = False
+
+
+def poke() -> None:
+    """次のポーリングを待たずに同期させる（user-service からの変更通知時に呼ぶ）"""
+    _wakeup.set()
+
+
+def request_resync() -> None:
+    """次回の同期でレプリカを全件から作り直す"""
+    global _force_resync
+    _force_resync = True
+    _wakeup.set()
+
+
+async def upsert_local(task_auth: dict) -> None:
+    """自サービス起点で作成した task_auth を即時レプリカへ反映する
+
+    同じ変更は後から変更フィードでも届くが、upsert なので二重適用しても結果は同じ。
+    """
+    async with get_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "INSERT INTO task_auths (task_auth_id, task_id, user_id, task_user_auth) VALUES (%s,%s,%s,%s) "
+                "ON CONFLICT (task_auth_id) DO UPDATE SET task_id=EXCLUDED.task_id, user_id=EXCLUDED.user_id, "
+                "task_user_auth=EXCLUDED.task_user_auth, synced_at=NOW()",
+                (task_auth["task_auth_id"], task_auth["task_id"], task_auth["user_id"], task_auth["task_user_auth"]),
+            )
+
+
+async def _fetch(path: str, params: dict) -> dict:
+    resp = await user_client().get(path, params=params, headers=_INTERNAL_HEADERS)
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def _resync(cur) -> int:
+    """レプリカを user-service の全件スナップショットで置き換え、同期位置を返す"""
+    await cur.execute("DELETE FROM task_auths")
+    after_id = 0
+    change_id: Optional[int] = None
+    async with cur.copy("COPY task_auths (task_auth_id, task_id, user_id, task_user_auth) FROM STDIN") as copy:
+        while True:
+            page = await _fetch(
+                "/internal/task_auths/snapshot",
+                {"after_id": after_id, "limit": TASK_AUTH_SNAPSHOT_BATCH},
+            )
+            if change_id is None:
+                # 最初のページの位置から変更フィードを追えば、ページング中の変更も取りこぼさない
+                change_id = page["change_id"]
+            for row in page["rows"]:
+                await copy.write_row((row["task_auth_id"], row["task_id"], row["user_id"], row["task_user_auth"]))
+            after_id = page["last_task_auth_id"]
+            if not page["has_more"]:
+                break
+    replica_state.resyncs += 1
+    return change_id or 0
+
+
+async def _apply_changes(cur, changes: List[dict]) -> None:
+    # 同じ task_auth_id への変更は最後のものだけ適用すればよい
+    latest: Dict[int, dict] = {}
+    for ch in changes:
+        latest[ch["task_auth_id"]] = ch
+    upserts = [
+        (ch["task_auth_id"], ch["task_id"], ch["user_id"], ch["task_user_auth"])
+        for ch in latest.values()
+        if ch["op"] == "upsert"
+    ]
+    deletes = [ch["task_auth_id"] for ch in latest.values() if ch["op"] == "delete"]
+    if upserts:
+        await cur.executemany(
+            "INSERT INTO task_auths (task_auth_id, task_id, user_id, task_user_auth) VALUES (%s,%s,%s,%s) "
+            "ON CONFLICT (task_auth_id) DO UPDATE SET task_id=EXCLUDED.task_id, user_id=EXCLUDED.user_id, "
+            "task_user_auth=EXCLUDED.task_user_auth, synced_at=NOW()",
+            upserts,
+        )
+    if deletes:
+        await cur.execute("DELETE FROM task_auths WHERE task_auth_id = ANY(%s)", (deletes,))
+    replica_state.applied_changes += len(changes)
+
+
+async def sync_once() -> None:
+    """未同期なら全件再同期し、その後は変更フィードを追いつくまで適用する"""
+    global _force_resync
+    async with get_conn() as conn:
+        async with conn.transaction():
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (SYNC_LOCK_KEY,))
+                locked = (await cur.fetchone())[0]
+                await cur.execute("SELECT last_change_id FROM task_auth_sync_state WHERE id=1")
+                row = await cur.fetchone()
+                last_change_id = row[0] if row else None
+                if not locked:
+                    # 他ワーカーが同期中。状態だけ反映する
+                    replica_state.ready = last_change_id is not None
+                    replica_state.last_change_id = last_change_id
+                    return
+
+                if last_change_id is None or _force_resync:
+                    last_change_id = await _resync(cur)
+                    _force_resync = False
+
+                while True:
+                    feed = await _fetch(
+                        "/internal/task_auth_changes",
+                        {"after": last_change_id, "limit": TASK_AUTH_SYNC_BATCH},
+                    )
+                    if feed["changes"]:
+                        await _apply_changes(cur, feed["changes"])
+                    last_change_id = feed["last_change_id"]
+                    if not feed["has_more"]:
+                        break
+
+                await cur.execute(
+                    "INSERT INTO task_auth_sync_state (id, last_change_id, synced_at) VALUES (1, %s, NOW()) "
+                    "ON CONFLICT (id) DO UPDATE SET last_change_id=EXCLUDED.last_change_id, synced_at=EXCLUDED.synced_at",
+                    (last_change_id,),
+                )
+    replica_state.ready = True
+    replica_state.last_change_id = last_change_id
+    replica_state.last_synced_at = datetime.now(timezone.utc)
+
+
+async def evict_changed_users() -> None:
+    """変更フィードを追い、権限が変わったユーザーをこのプロセスの権限キャッシュから破棄する
+
+    レプリカへの適用は advisory lock を取った1ワーカーだけが行うが、権限キャッシュはワーカーごとに
+    持っているため、フィードの読み取りと破棄は各ワーカーが自分の位置から行う。
+    """
+    if replica_state.cache_evicted_through is None:
+        # 起動直後はキャッシュが空なので、現在の同期位置から追い始めればよい
+        replica_state.cache_evicted_through = replica_state.last_change_id
+        return
+    while True:
+        feed = await _fetch(
+            "/internal/task_auth_changes",
+            {"after": replica_state.cache_evicted_through, "limit": TASK_AUTH_SYNC_BATCH},
+        )
+        for user_id in {ch["user_id"] for ch in feed["changes"]}:
+            task_auth_cache.invalidate(user_id)
+        replica_state.cache_evicted_through = feed["last_change_id"]
+        if not feed["has_more"]:
+            break
+
+
+async def sync_loop() -> None:
+    """lifespan で起動するバックグラウンド同期ループ"""
+    while True:
+        # 同期中に届いた通知を取りこぼさないよう、同期の前にクリアする
+        _wakeup.clear()
+        for step in (sync_once, evict_changed_users):
+            try:
+                await step()
+            except Exception as e:  # 同期失敗はリクエスト処理に影響させない（次回リトライ）
+                replica_state.errors += 1
+                replica_state.last_error = str(e)
+                logger.warning("task_auths replica %s failed: %s", step.__name__, e)
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=TASK_AUTH_SYNC_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
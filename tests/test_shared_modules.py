@@ -0,0 +1,28 @@
+"""サービス間で共有しているモジュールのコピーが一致しているかの検査
+
+各サービスの Docker イメージは自分のディレクトリだけをビルドコンテキストにするため、
+共通のモジュールはサービスごとにコピーして置いている。どれか1つだけ直して他を直し忘れると
+このテストが失敗する（リポジトリのルートで `python -m pytest tests` を実行する）。
+"""
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# モジュール -> そのコピーを持つサービス
+SHARED_MODULES = {
+    "app/auth.py": ["user-service", "task-service", "record-service"],
+    "app/etag.py": ["task-service", "record-service"],
+    "app/fast_json.py": ["task-service", "record-service"],
+    "app/migrate.py": ["user-service", "task-service", "record-service"],
+}
+
+
+@pytest.mark.parametrize("module", sorted(SHARED_MODULES))
+def test_shared_module_copies_are_identical(module):
+    services = SHARED_MODULES[module]
+    reference = services[0]
+    expected = (ROOT / reference / module).read_bytes()
+    differ = [svc for svc in services[1:] if (ROOT / svc / module).read_bytes() != expected]
+    assert not differ, f"{module} differs from {reference}/{module} in: {', '.join(differ)}"
@@ -0,0 +1,48 @@
+import logging
+import os
+from typing import Dict, List
+
+import httpx
+
+from app.auth import INTERNAL_API_TOKEN
+
+logger = logging.getLogger(__name__)
+
+# task-service URL
+TASK_SVC_BASE = os.getenv("TASK_SVC_BASE", "http://task-service/v1")
+TASK_SVC_TIMEOUT = float(os.getenv("TASK_SVC_TIMEOUT", "2"))
+
+# lifespan で生成し、プロセス内の全リクエストで使い回す（ハンドラは同期なので同期クライアント）
+_clients: Dict[str, httpx.Client] = {}
+
+
+def open_clients() -> None:
+    _clients["task"] = httpx.Client(
+        base_url=TASK_SVC_BASE,
+        timeout=TASK_SVC_TIMEOUT,
+        headers={"x-internal-token": INTERNAL_API_TOKEN},
+    )
+
+
+def close_clients() -> None:
+    for client in _clients.values():
+        client.close()
+    _clients.clear()
+
+
+def invalidate_task_auth_cache(user_ids: List[int]) -> None:
+    """task-service の権限キャッシュから指定ユーザー分を破棄させる
+
+    応答後のバックグラウンドタスクとして呼ぶ。届くのはベース URL の先の1インスタンスだけで、
+    他のワーカー・インスタンスは task_auth_changes の変更フィードを追って破棄する（task_auth_replica）。
+    通知に失敗しても task_auths の更新自体は成功させる。
+    """
+    client = _clients.get("task")
+    if client is None:
+        return
+    try:
+        resp = client.post("/internal/task_auth_cache/invalidate", json={"user_ids": user_ids})
+        if not resp.is_success:
+            logger.warning("task_auth cache invalidation failed: %s %s", resp.status_code, resp.text)
+    except httpx.RequestError as e:
+        logger.warning("task_auth cache invalidation failed: %s", e)
@@ -0,0 +1,50 @@
+import os
+
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import ConnectionPool
+
+# DB 設定（user-db）
+DB_HOST = os.getenv("DB_HOST", "climbly-user-db")
+DB_PORT = int(os.getenv("DB_PORT", "5432"))
+DB_NAME = os.getenv("DB_NAME", "user_db")
+DB_USER = os.getenv("DB_USER", "climbly")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "climbly")
+
+DB_CONNINFO = make_conninfo(
+    host=DB_HOST,
+    port=DB_PORT,
+    dbname=DB_NAME,
+    user=DB_USER,
+    password=DB_PASSWORD,
+)
+
+# コネクションプール設定
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))  # 接続取得の待ち時間上限（秒）
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))  # アイドル接続を閉じるまでの秒数
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "3600"))  # 接続を作り直すまでの秒数
+
+# 起動時(lifespan)に open、終了時に close する
+pool = ConnectionPool(
+    conninfo=DB_CONNINFO,
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    timeout=DB_POOL_TIMEOUT,
+    max_idle=DB_POOL_MAX_IDLE,
+    max_lifetime=DB_POOL_MAX_LIFETIME,
+    kwargs={"autocommit": True},
+    check=ConnectionPool.check_connection,  # 貸し出し前に死活確認
+    name="user_db",
+    open=False,
+)
+
+
+def get_conn():
+    """プールから接続を借りる。with ブロックを抜けると返却される"""
+    return pool.connection()
+
+
+def get_pool_stats() -> dict:
+    """プールの統計情報（接続数・待ち数・タイムアウト数など）"""
+    return pool.get_stats()
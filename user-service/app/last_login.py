@@ -0,0 +1,138 @@
+"""last_login_at の遅延・一括更新
+
+ログインのたびに users を UPDATE すると、朝のログイン集中時に users への書き込みが競合し、
+ログインの応答も UPDATE の分だけ遅くなる。ログイン時刻はメモリ上に user_id ごとに溜めておき、
+LAST_LOGIN_FLUSH_INTERVAL 秒ごとに `UPDATE ... FROM (VALUES ...)` でまとめて書き込む。
+終了時にも（プールを閉じる前に）残りを書き込む。書き込みに失敗した分はバッファに戻して次回リトライする。
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.db import get_conn
+
+LAST_LOGIN_FLUSH_INTERVAL = float(os.getenv("LAST_LOGIN_FLUSH_INTERVAL", "5"))  # 書き込み間隔（秒）
+LAST_LOGIN_FLUSH_BATCH_SIZE = 1000  # 1回の UPDATE に含める件数
+
+logger = logging.getLogger(__name__)
+
+
+def _update_sql(n: int) -> str:
+    values = ", ".join(["(%s::int, %s::timestamptz)"] * n)
+    # 遅れて書き込まれた古い時刻で新しい値を上書きしない
+    return f"""
+        UPDATE users AS u
+        SET last_login_at = v.last_login_at, updated_at = NOW()
+        FROM (VALUES {values}) AS v(user_id, last_login_at)
+        WHERE u.user_id = v.user_id
+          AND (u.last_login_at IS NULL OR u.last_login_at < v.last_login_at)
+    """
+
+
+class LastLoginBuffer:
+    """user_id -> 最新のログイン時刻 を溜め、まとめて users に書き込む"""
+
+    def __init__(self):
+        self._pending: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.last_flush_ms: Optional[float] = None
+        self._stop = asyncio.Event()
+
+    def record(self, user_id: int) -> None:
+        with self._lock:
+            self._pending[user_id] = datetime.now(timezone.utc)
+            self.recorded += 1
+
+    def pending(self, user_id: int) -> Optional[datetime]:
+        """まだ書き込んでいないログイン時刻（/v1/users/me の応答に反映する）"""
+        with self._lock:
+            return self._pending.get(user_id)
+
+    def _take(self) -> List[Tuple[int, datetime]]:
+        with self._lock:
+            items = list(self._pending.items())
+            self._pending.clear()
+        return items
+
+    def _restore(self, items: List[Tuple[int, datetime]]) -> None:
+        with self._lock:
+            for user_id, at in items:
+                current = self._pending.get(user_id)
+                if current is None or current < at:
+                    self._pending[user_id] = at
+
+    def flush(self) -> int:
+        """溜まっているログイン時刻を書き込み、件数を返す（同期処理。スレッドから呼ぶ）"""
+        items = self._take()
+        if not items:
+            return 0
+        started = time.perf_counter()
+        written = 0
+        try:
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    for i in range(0, len(items), LAST_LOGIN_FLUSH_BATCH_SIZE):
+                        batch = items[i:i + LAST_LOGIN_FLUSH_BATCH_SIZE]
+                        cur.execute(_update_sql(len(batch)), [v for item in batch for v in item])
+                        written += len(batch)
+        except Exception:
+            self._restore(items[written:])
+            raise
+        finally:
+            self.flushed_rows += written
+        self.flushes += 1
+        self.last_flush_ms = round((time.perf_counter() - started) * 1000, 1)
+        return written
+
+    async def flush_loop(self) -> None:
+        """lifespan で起動するバックグラウンドの書き込みループ
+
+        stop() されると残りを書き込んでから終わる。キャンセルでは止めない
+        （スレッドで実行中の UPDATE はキャンセルできず、プールを閉じた後まで走りうるため）。
+        """
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=LAST_LOGIN_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            await self._flush_logged()
+        # 書き込み中に stop() された場合、その間に溜まった分が残っている
+        await self._flush_logged()
+
+    async def _flush_logged(self) -> None:
+        try:
+            await asyncio.to_thread(self.flush)
+        except Exception as e:  # 書き込み失敗はログインに影響させない（次回リトライ）
+            self.errors += 1
+            self.last_error = str(e)
+            logger.warning("last_login_at flush failed: %s", e)
+
+    def stop(self) -> None:
+        """flush_loop に最後の書き込みをさせて終了させる（終了は flush_loop のタスクを await して待つ）"""
+        self._stop.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "flush_interval_s": LAST_LOGIN_FLUSH_INTERVAL,
+            "pending": pending,
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+
+last_login_buffer = LastLoginBuffer()
@@ -1,10 +1,12 @@
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
-import os
 from typing import Optional
 
-from fastapi import FastAPI, HTTPException, Depends
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError # joseはJWTの生成や検証のライブラリ
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from jose import jwt # joseはJWTの生成や検証のライブラリ
 from app.schemas import (
     RegisterReq,
     LoginReq,
@@ -13,41 +15,73 @@ from app.schemas import (
     TaskAuthIn,
     TaskAuthOut,
     TaskAuthUpdate,
+    TaskAuthCheckIn,
+    TaskAuthCheckOut,
 )
-import psycopg  # PythonからPostgreSQLに接続するためのドライバ
-from passlib.context import CryptContext # passlibはパスワードのハッシュ化のライブラリ
-
-# JWTの設定
-JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret")
-JWT_ALG = "HS256"
-JWT_EXPIRE_DAYS = int(os.getenv("JWT_EXPIRE_DAYS", "7")) # JWTの有効期限
+from app.auth import (
+    JWT_ALG,
+    JWT_EXPIRE_DAYS,
+    JWT_SECRET,
+    get_current_user_id,
+    require_internal_token,
+    token_cache,
+)
+from app.clients import open_clients, close_clients, invalidate_task_auth_cache
+from app.db import get_conn, get_pool_stats, pool
+from app.last_login import last_login_buffer
+from app.migrate import RUN_MIGRATIONS, apply_migrations
+from app.password_hasher import PasswordHasherBusy, password_hasher
+from psycopg.errors import UniqueViolation
+from psycopg_pool import PoolTimeout
+
+# 権限の強さ（required_role 以上の権限を持つかの判定に使う）
+ROLE_LEVELS = {"read": 1, "write": 2, "admin": 3}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 未適用のマイグレーションを適用してから接続を開く
+    if RUN_MIGRATIONS:
+        apply_migrations()
+    # DBコネクションプールと task-service 用クライアントはプロセス内で1つだけ開き、終了時に閉じる
+    pool.open()
+    open_clients()
+    # bcrypt は API とは別のプロセスプールで計算する
+    password_hasher.start()
+    # last_login_at はまとめて書き込む
+    flush_task = asyncio.create_task(last_login_buffer.flush_loop())
+    try:
+        yield
+    finally:
+        # 実行中の書き込みと残りの書き込みが終わるのを待ってからプールを閉じる
+        last_login_buffer.stop()
+        await flush_task
+        password_hasher.shutdown()
+        close_clients()
+        pool.close()
 
-# DBの設定
-DB_HOST = os.getenv("DB_HOST", "climbly-user-db")
-DB_PORT = int(os.getenv("DB_PORT", "5432"))
-DB_NAME = os.getenv("DB_NAME", "user_db")
-DB_USER = os.getenv("DB_USER", "climbly")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "climbly")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-auth_scheme = HTTPBearer(auto_error=False)
+app = FastAPI(title="Climbly User Service", version="1.0.0", lifespan=lifespan)
 
-app = FastAPI(title="Climbly User Service", version="1.0.0")
 
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    # プールが枯渇して接続を取得できない場合は 503 を返す
+    return JSONResponse(status_code=503, content={"detail": {"message": "database busy"}})
 
 
-# Helpers
-def get_conn():
-    return psycopg.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        autocommit=True,
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    # ハッシュ計算の待ちが上限に達している場合は待たせずに 503 を返す
+    return JSONResponse(
+        status_code=503,
+        content={"detail": {"message": "too many authentication requests"}},
+        headers={"Retry-After": "1"},
     )
 
 
+
+# Helpers
 def create_access_token(user_id: int) -> str:
     now = datetime.now(timezone.utc)
     payload = {
@@ -59,34 +93,51 @@ def create_access_token(user_id: int) -> str:
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
 
 
-def decode_token(token: str) -> int:
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
-        sub = payload.get("sub")
-        if sub is None:
-            raise HTTPException(status_code=401, detail={"message": "invalid token"})
-        return int(sub)
-    except JWTError:
-        raise HTTPException(status_code=401, detail={"message": "invalid token"})
-
-
-async def get_current_user_id(
-    creds: Optional[HTTPAuthorizationCredentials] = Depends(auth_scheme),
-) -> int:
-    if creds is None or creds.scheme.lower() != "bearer":
-        raise HTTPException(status_code=401, detail={"message": "missing bearer token"})
-    return decode_token(creds.credentials)
-
-
 # Routes
 @app.get("/healthz")
 def healthz():
     return {"status": "ok"}
 
 
+@app.get("/metrics/db_pool")
+def db_pool_metrics():
+    return get_pool_stats()
+
+
+@app.get("/metrics/token_cache")
+def token_cache_metrics():
+    return token_cache.stats()
+
+
+@app.get("/metrics/password_hasher")
+def password_hasher_metrics():
+    return password_hasher.stats()
+
+
+@app.get("/metrics/last_login")
+def last_login_metrics():
+    return last_login_buffer.stats()
+
+
 @app.post("/v1/auth/register", response_model=TokenOut)
-def register(req: RegisterReq):
-    hashed = pwd_context.hash(req.password)
+async def register(req: RegisterReq):
+    # ハッシュ計算はプロセスプール、DB アクセスはスレッドプールで行う（イベントループはどちらも待つだけ）
+    hashed = await password_hasher.hash(req.password)
+    row = await run_in_threadpool(_insert_user, req, hashed)
+    token = create_access_token(row[0])
+    user = UserOut(
+        user_id=row[0],
+        username=row[1],
+        email=row[2],
+        is_active=row[3],
+        last_login_at=row[4],
+        created_at=row[5],
+        updated_at=row[6],
+    )
+    return TokenOut(token=token, user=user)
+
+
+def _insert_user(req: RegisterReq, hashed: str):
     with get_conn() as conn:
         with conn.cursor() as cur:
             # Check uniqueness
@@ -105,40 +156,20 @@ def register(req: RegisterReq):
                 """,
                 (req.username, hashed, req.email),
             )
-            row = cur.fetchone()
-    token = create_access_token(row[0])
-    user = UserOut(
-        user_id=row[0],
-        username=row[1],
-        email=row[2],
-        is_active=row[3],
-        last_login_at=row[4],
-        created_at=row[5],
-        updated_at=row[6],
-    )
-    return TokenOut(token=token, user=user)
+            return cur.fetchone()
 
 
 @app.post("/v1/auth/login", response_model=TokenOut)
-def login(req: LoginReq):
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT user_id, username, email, password, is_active, last_login_at, created_at, updated_at
-                FROM users
-                WHERE username=%s OR email=%s
-                """,
-                (req.username_or_email, req.username_or_email),
-            )
-            row = cur.fetchone()
-            if row is None:
-                raise HTTPException(status_code=400, detail={"message": "invalid credentials"})
-            user_id, username, email, hashed, is_active, last_login_at, created_at, updated_at = row
-            if not pwd_context.verify(req.password, hashed):
-                raise HTTPException(status_code=400, detail={"message": "invalid credentials"})
-            # update last_login_at
-            cur.execute("UPDATE users SET last_login_at=NOW(), updated_at=NOW() WHERE user_id=%s", (user_id,))
+async def login(req: LoginReq):
+    row = await run_in_threadpool(_find_login_user, req.username_or_email)
+    if row is None:
+        raise HTTPException(status_code=400, detail={"message": "invalid credentials"})
+    user_id, username, email, hashed, is_active, last_login_at, created_at, updated_at = row
+    # bcrypt の検証中は DB 接続もスレッドも握らない
+    if not await password_hasher.verify(req.password, hashed):
+        raise HTTPException(status_code=400, detail={"message": "invalid credentials"})
+    # last_login_at の更新はバッファに積むだけ（書き込みはバックグラウンドでまとめて行う）
+    last_login_buffer.record(user_id)
     token = create_access_token(user_id)
     return TokenOut(
         token=token,
@@ -154,6 +185,26 @@ def login(req: LoginReq):
     )
 
 
+_LOGIN_USER_COLUMNS = "user_id, username, email, password, is_active, last_login_at, created_at, updated_at"
+
+
+def _find_login_user(username_or_email: str):
+    # username / email それぞれの一意インデックスで引く（OR だと BitmapOr になる）。
+    # 1回の問い合わせで username の一致を優先し、見つかった時点で打ち切る
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                (SELECT {_LOGIN_USER_COLUMNS} FROM users WHERE username=%s)
+                UNION ALL
+                (SELECT {_LOGIN_USER_COLUMNS} FROM users WHERE email=%s)
+                LIMIT 1
+                """,
+                (username_or_email, username_or_email),
+            )
+            return cur.fetchone()
+
+
 @app.post("/v1/auth/logout")
 def logout():
     # JWTの無効化はサーバ側では行わない（v1）。クライアント破棄。
@@ -175,12 +226,14 @@ def me(current_user_id: int = Depends(get_current_user_id)):
             row = cur.fetchone()
             if row is None:
                 raise HTTPException(status_code=404, detail={"message": "user not found"})
+            # まだ書き込んでいないログイン時刻があればそちらを返す
+            last_login_at = last_login_buffer.pending(current_user_id) or row[4]
             return UserOut(
                 user_id=row[0],
                 username=row[1],
                 email=row[2],
                 is_active=row[3],
-                last_login_at=row[4],
+                last_login_at=last_login_at,
                 created_at=row[5],
                 updated_at=row[6],
             )
@@ -190,6 +243,7 @@ def me(current_user_id: int = Depends(get_current_user_id)):
 def update_task_auth(
     task_auth_id: int,
     req: TaskAuthUpdate,
+    background_tasks: BackgroundTasks,
     current_user_id: int = Depends(get_current_user_id),
 ):
     if req.task_user_auth not in ["read", "write", "admin"]:
@@ -223,6 +277,9 @@ def update_task_auth(
             if updated is None:
                 raise HTTPException(status_code=404, detail={"message": "task_auth not found"})
 
+            # task-service の権限キャッシュを破棄（応答後に通知し、DB 接続を握ったまま待たない）
+            background_tasks.add_task(invalidate_task_auth_cache, [target_user_id])
+
             return TaskAuthOut(
                 task_auth_id=updated[0],
                 task_id=updated[1],
@@ -235,7 +292,11 @@ def update_task_auth(
 
 
 @app.delete("/v1/task_auths/{task_auth_id}")
-def delete_task_auth(task_auth_id: int, current_user_id: int = Depends(get_current_user_id)):
+def delete_task_auth(
+    task_auth_id: int,
+    background_tasks: BackgroundTasks,
+    current_user_id: int = Depends(get_current_user_id),
+):
     with get_conn() as conn:
         row = _get_task_auth(conn, task_auth_id)
         if row is None:
@@ -257,6 +318,9 @@ def delete_task_auth(task_auth_id: int, current_user_id: int = Depends(get_curre
         with conn.cursor() as cur:
             cur.execute("DELETE FROM task_auths WHERE task_auth_id=%s", (task_auth_id,))
 
+        # task-service の権限キャッシュを破棄（応答後に通知し、DB 接続を握ったまま待たない）
+        background_tasks.add_task(invalidate_task_auth_cache, [target_user_id])
+
         return {"ok": True}
 
 
@@ -338,8 +402,33 @@ def get_task_auths(
             ]
 
 
+@app.post("/v1/task_auths/check", response_model=TaskAuthCheckOut)
+def check_task_auths(req: TaskAuthCheckIn, current_user_id: int = Depends(get_current_user_id)):
+    """複数タスクに対するログインユーザーの権限を1クエリでまとめて判定"""
+    task_ids = list(dict.fromkeys(req.task_ids))
+    if not task_ids:
+        return TaskAuthCheckOut(roles={}, denied=[])
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT task_id, task_user_auth FROM task_auths WHERE user_id=%s AND task_id = ANY(%s)",
+                (current_user_id, task_ids),
+            )
+            rows = cur.fetchall()
+
+    required_level = ROLE_LEVELS[req.required_role] if req.required_role else 0
+    roles = {r[0]: r[1] for r in rows if ROLE_LEVELS.get(r[1], 0) >= required_level}
+    denied = [tid for tid in task_ids if tid not in roles]
+    return TaskAuthCheckOut(roles=roles, denied=denied)
+
+
 @app.post("/v1/task_auths", response_model=TaskAuthOut)
-def create_task_auth(req: TaskAuthIn, current_user_id: int = Depends(get_current_user_id)):
+def create_task_auth(
+    req: TaskAuthIn,
+    background_tasks: BackgroundTasks,
+    current_user_id: int = Depends(get_current_user_id),
+):
     if req.task_user_auth not in ["read", "write", "admin"]:
         raise HTTPException(status_code=400, detail={"message": "task_user_auth must be read, write, or admin"})
 
@@ -364,16 +453,23 @@ def create_task_auth(req: TaskAuthIn, current_user_id: int = Depends(get_current
             if cur.fetchone() is not None:
                 raise HTTPException(status_code=409, detail={"message": "task_auth already exists"})
             
-            # task_auth作成
-            cur.execute(
-                """
-                INSERT INTO task_auths (task_id, user_id, task_user_auth, last_updated_user)
-                VALUES (%s, %s, %s, %s)
-                RETURNING task_auth_id, task_id, user_id, task_user_auth, last_updated_user, created_at, updated_at
-                """,
-                (req.task_id, req.user_id, req.task_user_auth, current_user_id),
-            )
+            # task_auth作成（同時作成で重複チェックをすり抜けた場合は一意制約で 409）
+            try:
+                cur.execute(
+                    """
+                    INSERT INTO task_auths (task_id, user_id, task_user_auth, last_updated_user)
+                    VALUES (%s, %s, %s, %s)
+                    RETURNING task_auth_id, task_id, user_id, task_user_auth, last_updated_user, created_at, updated_at
+                    """,
+                    (req.task_id, req.user_id, req.task_user_auth, current_user_id),
+                )
+            except UniqueViolation:
+                raise HTTPException(status_code=409, detail={"message": "task_auth already exists"})
             row = cur.fetchone()
+
+            # task-service の権限キャッシュを破棄（応答後に通知し、DB 接続を握ったまま待たない）
+            background_tasks.add_task(invalidate_task_auth_cache, [req.user_id])
+
             return TaskAuthOut(
                 task_auth_id=row[0],
                 task_id=row[1],
@@ -383,3 +479,65 @@ def create_task_auth(req: TaskAuthIn, current_user_id: int = Depends(get_current
                 created_at=row[5],
                 updated_at=row[6],
             )
+
+
+# Internal（task-service の task_auths レプリカ同期用。BFF からは公開しない）
+@app.get("/v1/internal/task_auth_changes", dependencies=[Depends(require_internal_token)])
+def list_task_auth_changes(
+    after: int = Query(default=0, ge=0),
+    limit: int = Query(default=1000, ge=1, le=5000),
+):
+    """change_id が after より大きい task_auths の変更を古い順に返す（変更フィード）"""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT change_id, op, task_auth_id, task_id, user_id, task_user_auth "
+                "FROM task_auth_changes WHERE change_id > %s ORDER BY change_id ASC LIMIT %s",
+                (after, limit),
+            )
+            rows = cur.fetchall()
+    return {
+        "changes": [
+            {
+                "change_id": r[0],
+                "op": r[1],
+                "task_auth_id": r[2],
+                "task_id": r[3],
+                "user_id": r[4],
+                "task_user_auth": r[5],
+            }
+            for r in rows
+        ],
+        "last_change_id": rows[-1][0] if rows else after,
+        "has_more": len(rows) == limit,
+    }
+
+
+@app.get("/v1/internal/task_auths/snapshot", dependencies=[Depends(require_internal_token)])
+def get_task_auths_snapshot(
+    after_id: int = Query(default=0, ge=0),
+    limit: int = Query(default=5000, ge=1, le=20000),
+):
+    """task_auths の全件を task_auth_id 順にページングして返す（レプリカの再同期用）
+
+    change_id は行を読む前に取得するため、読み手はこの位置から変更フィードを追えば取りこぼさない。
+    """
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COALESCE(MAX(change_id), 0) FROM task_auth_changes")
+            change_id = cur.fetchone()[0]
+            cur.execute(
+                "SELECT task_auth_id, task_id, user_id, task_user_auth FROM task_auths "
+                "WHERE task_auth_id > %s ORDER BY task_auth_id ASC LIMIT %s",
+                (after_id, limit),
+            )
+            rows = cur.fetchall()
+    return {
+        "rows": [
+            {"task_auth_id": r[0], "task_id": r[1], "user_id": r[2], "task_user_auth": r[3]}
+            for r in rows
+        ],
+        "last_task_auth_id": rows[-1][0] if rows else after_id,
+        "change_id": change_id,
+        "has_more": len(rows) == limit,
+    }
@@ -0,0 +1,33 @@
+-- 001: task_auths の変更フィード（task-service のレプリカ同期用）
+
+-- task_auths の変更履歴（アウトボックス）。task-service のレプリカ同期に使う
+CREATE TABLE IF NOT EXISTS task_auth_changes (
+  change_id BIGSERIAL PRIMARY KEY,
+  op VARCHAR(8) NOT NULL, -- upsert/delete
+  task_auth_id INTEGER NOT NULL,
+  task_id INTEGER NOT NULL,
+  user_id INTEGER NOT NULL,
+  task_user_auth VARCHAR(16) NULL, -- delete の場合は NULL
+  changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- task_auths への変更を同一トランザクション内で task_auth_changes に記録する
+-- advisory lock でコミット順と change_id の順序を一致させる（読み手が番号の飛びを取りこぼさないため）
+CREATE OR REPLACE FUNCTION record_task_auth_change() RETURNS trigger AS $$
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext('task_auth_changes'));
+  IF TG_OP = 'DELETE' THEN
+    INSERT INTO task_auth_changes (op, task_auth_id, task_id, user_id)
+    VALUES ('delete', OLD.task_auth_id, OLD.task_id, OLD.user_id);
+    RETURN OLD;
+  END IF;
+  INSERT INTO task_auth_changes (op, task_auth_id, task_id, user_id, task_user_auth)
+  VALUES ('upsert', NEW.task_auth_id, NEW.task_id, NEW.user_id, NEW.task_user_auth);
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_task_auth_changes ON task_auths;
+CREATE TRIGGER trg_task_auth_changes
+  AFTER INSERT OR UPDATE OR DELETE ON task_auths
+  FOR EACH ROW EXECUTE FUNCTION record_task_auth_change();
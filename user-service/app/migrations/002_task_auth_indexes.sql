@@ -0,0 +1,15 @@
+-- 002: task_auths の検索用インデックスと一意制約
+
+-- (task_id, user_id) の重複は API でも弾いているが、同時作成の競合に備えて DB で保証する
+-- 既存の重複は最も新しい task_auth_id を残して削除
+DELETE FROM task_auths a
+USING task_auths b
+WHERE a.task_id = b.task_id
+  AND a.user_id = b.user_id
+  AND a.task_auth_id < b.task_auth_id;
+
+-- task_id 単体 / (task_id, user_id) の検索（一覧・管理者判定・一括チェック）
+CREATE UNIQUE INDEX IF NOT EXISTS uq_task_auths_task_id_user_id ON task_auths(task_id, user_id);
+
+-- user_id からの権限一覧（GET /v1/task_auths・スナップショット）
+CREATE INDEX IF NOT EXISTS idx_task_auths_user_id_task_id ON task_auths(user_id, task_id);
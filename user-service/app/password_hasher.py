@@ -0,0 +1,130 @@
+"""パスワードハッシュ（bcrypt）の専用プロセスプール
+
+bcrypt はわざと遅い計算なので、API と同じスレッドプールで実行するとログインが集中したときに
+スレッドを使い切り、/v1/users/me などの無関係なエンドポイントまで待たされる。
+ハッシュ計算は専用のプロセスプール（PASSWORD_HASH_WORKERS プロセス）で行い、実行中＋待ちの件数が
+PASSWORD_HASH_MAX_PENDING に達したら待たせずに PasswordHasherBusy（→ 503）で断る。
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Deque, Optional, Tuple
+
+from passlib.context import CryptContext # passlibはパスワードのハッシュ化のライブラリ
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))  # ハッシュ計算用のプロセス数
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "8"))  # 実行中＋待ちの上限（待ち時間の上限 ≒ 上限 / プロセス数 × 1回の計算時間）
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_SAMPLES = 1000  # パーセンタイル計算に使う直近の計測数
+
+
+def _run(op: str, *args) -> Tuple[object, float, float]:
+    """ワーカープロセス側: (結果, 開始時刻(epoch), 計算時間) を返す"""
+    started_at = time.time()
+    t0 = time.perf_counter()
+    result = pwd_context.verify(*args) if op == "verify" else pwd_context.hash(*args)
+    return result, started_at, time.perf_counter() - t0
+
+
+def _warm_up() -> None:
+    """各ワーカープロセスの起動時に1回だけ実行する（ProcessPoolExecutor の initializer）
+
+    passlib / bcrypt バックエンドの読み込みと初期化を最小コストのハッシュで済ませ、最初のログインに持ち越さない。
+    """
+    pwd_context.handler("bcrypt").using(rounds=4).hash("warm-up")
+
+
+def _worker_pid() -> int:
+    return os.getpid()
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """bcrypt の hash / verify をプロセスプールで実行し、待ち時間と計算時間を集計する"""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.warm_workers = 0  # 起動時の準備を確認できたワーカー数
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._queue_waits: Deque[float] = deque(maxlen=_SAMPLES)
+        self._hash_times: Deque[float] = deque(maxlen=_SAMPLES)
+
+    def start(self) -> None:
+        # fork だと親プロセスのスレッド・接続の状態を引き継ぐので spawn で起動する
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up,
+        )
+        # ワーカーは submit 時に空きがなければ1つずつ起動される。起動には時間がかかるので、
+        # 続けてプロセス数だけ投げるとその場で全ワーカーが起動する（各ワーカーは initializer で準備済みになる）
+        pids = {future.result() for future in [self._executor.submit(_worker_pid) for _ in range(self.workers)]}
+        self.warm_workers = len(pids)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            # 待ちのジョブは捨て、実行中の1回分（数百ミリ秒）だけ待ってワーカーを終了させる
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._submit("verify", password, hashed)
+
+    async def _submit(self, op: str, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        self.pending += 1
+        enqueued_at = time.time()
+        try:
+            result, started_at, hash_time = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _run, op, *args
+            )
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        self._queue_waits.append(max(started_at - enqueued_at, 0.0))
+        self._hash_times.append(hash_time)
+        return result
+
+    @staticmethod
+    def _summary(samples: Deque[float]) -> dict:
+        if not samples:
+            return {"avg_ms": None, "p50_ms": None, "p95_ms": None, "max_ms": None}
+        ordered = sorted(samples)
+        return {
+            "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+            "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+            "p95_ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "warm_workers": self.warm_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait": self._summary(self._queue_waits),  # 直近 1000 件
+            "hash_time": self._summary(self._hash_times),
+        }
+
+
+password_hasher = PasswordHasher(workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING)
@@ -0,0 +1,98 @@
+"""ホットクエリの実行計画チェック
+
+大きめのダミーデータを投入した状態で各ホットクエリを EXPLAIN し、対象テーブルに Seq Scan が
+出ていれば失敗とする。投入したデータはトランザクションごとロールバックするので残らない。
+task_auths への投入でトリガが動くため task_auth_changes の change_id は消費される（飛び番は同期に影響しない）。
+マイグレーション適用後の DB に対して `python -m app.migrate --check-plans` で実行する。
+"""
+import os
+from typing import Dict, List
+
+import psycopg
+
+from app.db import DB_CONNINFO
+
+PLAN_CHECK_ROWS = int(os.getenv("PLAN_CHECK_ROWS", "50000"))  # 投入する task_auths の件数
+
+# 既存データと衝突しない ID 帯を明示して使う（ロールバックしてもシーケンスを消費しないため）
+_BASE = 1_000_000_000
+_USER_ID = _BASE + 1
+_TASK_ID = _BASE + 1
+
+CHECKED_TABLES = {"users", "task_auths"}
+
+# ユーザーは PLAN_CHECK_ROWS/100 人、1人あたり100タスクの権限を持つ
+SEED_SQL = [
+    """
+    INSERT INTO users (user_id, username, password, email)
+    SELECT %(base)s + g, 'plan_check_' || g, 'x', 'plan_check_' || g || '@example.com'
+    FROM generate_series(1, %(rows)s / 100) AS g
+    """,
+    """
+    INSERT INTO task_auths (task_auth_id, task_id, user_id, task_user_auth)
+    SELECT %(base)s + g, %(base)s + g, %(base)s + ((g - 1) / 100) + 1, 'admin'
+    FROM generate_series(1, %(rows)s) AS g
+    """,
+    "ANALYZE users",
+    "ANALYZE task_auths",
+]
+
+# name -> SQL（app/main.py の主要クエリと同じ形）
+HOT_QUERIES: Dict[str, str] = {
+    "task_auths_by_user": f"""
+        SELECT task_auth_id, task_id, user_id, task_user_auth, last_updated_user, created_at, updated_at
+        FROM task_auths WHERE user_id = {_USER_ID}
+    """,
+    "task_auths_by_task": f"""
+        SELECT task_auth_id, task_id, user_id, task_user_auth, last_updated_user, created_at, updated_at
+        FROM task_auths WHERE task_id = {_TASK_ID}
+    """,
+    "task_auth_by_task_and_user": f"""
+        SELECT task_user_auth FROM task_auths WHERE task_id = {_TASK_ID} AND user_id = {_USER_ID}
+    """,
+    "task_auths_check": f"""
+        SELECT task_id, task_user_auth FROM task_auths
+        WHERE user_id = {_USER_ID} AND task_id = ANY(ARRAY[{_TASK_ID}, {_TASK_ID + 1}])
+    """,
+    "login_by_username_or_email": """
+        (SELECT user_id, username, email, password, is_active, last_login_at, created_at, updated_at
+         FROM users WHERE username = 'plan_check_1@example.com')
+        UNION ALL
+        (SELECT user_id, username, email, password, is_active, last_login_at, created_at, updated_at
+         FROM users WHERE email = 'plan_check_1@example.com')
+        LIMIT 1
+    """,
+    "last_login_flush": f"""
+        UPDATE users AS u
+        SET last_login_at = v.last_login_at, updated_at = NOW()
+        FROM (VALUES ({_USER_ID}, now()), ({_USER_ID + 1}, now())) AS v(user_id, last_login_at)
+        WHERE u.user_id = v.user_id
+          AND (u.last_login_at IS NULL OR u.last_login_at < v.last_login_at)
+    """,
+}
+
+
+def _seq_scans(node: dict) -> List[str]:
+    found = []
+    if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in CHECKED_TABLES:
+        found.append(node["Relation Name"])
+    for child in node.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def check_plans() -> List[str]:
+    """Seq Scan になったクエリを "name: 理由" のリストで返す（空なら OK）"""
+    failures = []
+    with psycopg.connect(DB_CONNINFO) as conn:
+        with conn.transaction(force_rollback=True):
+            with conn.cursor() as cur:
+                for sql in SEED_SQL:
+                    cur.execute(sql, {"base": _BASE, "rows": PLAN_CHECK_ROWS} if "%(" in sql else None)
+                for name, query in HOT_QUERIES.items():
+                    cur.execute("EXPLAIN (FORMAT JSON) " + query)
+                    plan = cur.fetchone()[0][0]["Plan"]
+                    scans = _seq_scans(plan)
+                    if scans:
+                        failures.append(f"{name}: Seq Scan on {', '.join(sorted(set(scans)))}")
+    return failures
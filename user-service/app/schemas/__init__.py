@@ -1,3 +1,3 @@
 from .users import UserOut
 from .auth import RegisterReq, LoginReq, TokenOut
-from .task_auths import TaskAuthIn, TaskAuthOut, TaskAuthUpdate
+from .task_auths import TaskAuthIn, TaskAuthOut, TaskAuthUpdate, TaskAuthCheckIn, TaskAuthCheckOut
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class TaskAuthIn(BaseModel):
@@ -21,3 +21,13 @@ class TaskAuthOut(BaseModel):
 
 class TaskAuthUpdate(BaseModel):
     task_user_auth: str
+
+
+class TaskAuthCheckIn(BaseModel):
+    task_ids: List[int] = Field(max_length=1000)
+    required_role: Optional[str] = Field(default=None, pattern=r"^(read|write|admin)$")
+
+
+class TaskAuthCheckOut(BaseModel):
+    roles: Dict[int, str]  # 条件を満たす task_id -> task_user_auth
+    denied: List[int]  # 権限が無い（または required_role に満たない）task_id